@@ -97,6 +97,9 @@ setup(
     project_urls={
         'Source': 'https://github.com/tinigin/udiff',
     },
+    entry_points={
+        'console_scripts': ['udiff = udiff.cli:main'],
+    },
     cmdclass={
         'upload': UploadCommand,
     }
@@ -0,0 +1,299 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Tests for applying parsed diffs."""
+
+from __future__ import unicode_literals
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from udiff.apply import _groups
+from udiff.parser import UdiffParser
+
+
+SOURCE = ''.join('line %d\n' % number for number in range(1, 21))
+
+DIFF = \
+    'diff --git a/sample b/sample\n' + \
+    'index 0000001..0ddf2ba 100644\n' + \
+    '--- a/sample\n' + \
+    '+++ b/sample\n' + \
+    '@@ -2,3 +2,3 @@\n' + \
+    ' line 2\n' + \
+    '-line 3\n' + \
+    '+line three\n' + \
+    ' line 4\n' + \
+    '@@ -15,3 +15,4 @@\n' + \
+    ' line 15\n' + \
+    ' line 16\n' + \
+    '+line 16.5\n' + \
+    ' line 17\n'
+
+EXPECTED = SOURCE.replace('line 3\n', 'line three\n').replace('line 16\n', 'line 16\nline 16.5\n')
+
+
+class TestApply(unittest.TestCase):
+    """Tests for UdiffFile.apply."""
+
+    def test_apply(self):
+        result = UdiffParser.from_string(DIFF)[0].apply(SOURCE)
+        self.assertTrue(result.ok)
+        self.assertEqual(result.text, EXPECTED)
+        self.assertEqual(result.offsets, [0, 0])
+
+    def test_apply_with_offset(self):
+        result = UdiffParser.from_string(DIFF)[0].apply('header\nheader\n' + SOURCE)
+        self.assertTrue(result.ok)
+        self.assertEqual(result.text, 'header\nheader\n' + EXPECTED)
+        self.assertEqual(result.offsets, [2, 2])
+
+    def test_max_offset(self):
+        result = UdiffParser.from_string(DIFF)[0].apply('header\nheader\n' + SOURCE, max_offset=1)
+        self.assertFalse(result.ok)
+        self.assertEqual(len(result.rejects), 2)
+
+    def test_fuzz(self):
+        source = SOURCE.replace('line 2\n', 'line two\n')
+        file = UdiffParser.from_string(DIFF)[0]
+
+        result = file.apply(source)
+        self.assertEqual(len(result.rejects), 1)
+        self.assertEqual(result.rejects[0].header, '@@ -2,3 +2,3 @@')
+        # the other hunk is still applied
+        self.assertIn('line 16.5\n', result.text)
+
+        result = file.apply(source, fuzz=1)
+        self.assertTrue(result.ok)
+        self.assertEqual(result.text, EXPECTED.replace('line 2\n', 'line two\n'))
+
+    def test_no_newline_at_end_of_file(self):
+        diff = \
+            '--- a/sample\n' + \
+            '+++ b/sample\n' + \
+            '@@ -1,2 +1,2 @@\n' + \
+            ' a\n' + \
+            '-b\n' + \
+            '\\ No newline at end of file\n' + \
+            '+c\n'
+
+        result = UdiffParser.from_string(diff)[0].apply('a\nb')
+        self.assertEqual(result.text, 'a\nc\n')
+
+    def test_crlf_source(self):
+        result = UdiffParser.from_string(DIFF)[0].apply(SOURCE.replace('\n', '\r\n'))
+        self.assertEqual(result.text, EXPECTED.replace('\n', '\r\n'))
+
+    def test_binary_is_reported(self):
+        diff = \
+            'diff --git a/logo.png b/logo.png\n' + \
+            'index 322248b..56fc1f2 100644\n' + \
+            'Binary files a/logo.png and b/logo.png differ\n'
+
+        result = UdiffParser.from_string(diff)[0].apply('')
+        self.assertFalse(result.ok)
+        self.assertTrue(result.error)
+
+
+class TestApplyTo(unittest.TestCase):
+    """Tests for UdiffParser.apply_to."""
+
+    def setUp(self):
+        super(TestApplyTo, self).setUp()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        super(TestApplyTo, self).tearDown()
+
+    def write(self, name, text):
+        with io.open(os.path.join(self.directory, name), 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+
+    def read(self, name):
+        with io.open(os.path.join(self.directory, name), 'r', encoding='utf-8', newline='') as f:
+            return f.read()
+
+    def test_apply_to(self):
+        self.write('sample', SOURCE)
+        self.write('old.txt', 'a\nb\n')
+        self.write('gone.txt', 'x\n')
+        diff = DIFF + \
+            'diff --git a/old.txt b/new.txt\n' + \
+            'similarity index 50%\n' + \
+            'rename from old.txt\n' + \
+            'rename to new.txt\n' + \
+            '--- a/old.txt\n' + \
+            '+++ b/new.txt\n' + \
+            '@@ -1,2 +1,2 @@\n' + \
+            ' a\n' + \
+            '-b\n' + \
+            '+c\n' + \
+            'diff --git a/gone.txt b/gone.txt\n' + \
+            'deleted file mode 100644\n' + \
+            '--- a/gone.txt\n' + \
+            '+++ /dev/null\n' + \
+            '@@ -1 +0,0 @@\n' + \
+            '-x\n' + \
+            'diff --git a/docs/added.txt b/docs/added.txt\n' + \
+            'new file mode 100644\n' + \
+            '--- /dev/null\n' + \
+            '+++ b/docs/added.txt\n' + \
+            '@@ -0,0 +1 @@\n' + \
+            '+hello\n'
+
+        results = UdiffParser.from_string(diff).apply_to(self.directory, workers=2)
+
+        self.assertEqual([result.ok for result in results], [True] * 4)
+        self.assertEqual(self.read('sample'), EXPECTED)
+        self.assertEqual(self.read('new.txt'), 'a\nc\n')
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'old.txt')))
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'gone.txt')))
+        self.assertEqual(self.read(os.path.join('docs', 'added.txt')), 'hello\n')
+
+    def test_groups_joined_by_a_rename(self):
+        self.write('a.txt', 'a\n')
+        self.write('b.txt', 'b\n')
+        self.write('c.txt', 'c\n')
+        diff = \
+            'diff --git a/b.txt b/b.txt\n' + \
+            'deleted file mode 100644\n' + \
+            '--- a/b.txt\n' + \
+            '+++ /dev/null\n' + \
+            '@@ -1 +0,0 @@\n' + \
+            '-b\n' + \
+            'diff --git a/a.txt b/a.txt\n' + \
+            '--- a/a.txt\n' + \
+            '+++ b/a.txt\n' + \
+            '@@ -1 +1 @@\n' + \
+            '-a\n' + \
+            '+a2\n' + \
+            'diff --git a/c.txt b/c.txt\n' + \
+            '--- a/c.txt\n' + \
+            '+++ b/c.txt\n' + \
+            '@@ -1 +1 @@\n' + \
+            '-c\n' + \
+            '+c2\n' + \
+            'diff --git a/a.txt b/b.txt\n' + \
+            'similarity index 50%\n' + \
+            'rename from a.txt\n' + \
+            'rename to b.txt\n' + \
+            '--- a/a.txt\n' + \
+            '+++ b/b.txt\n' + \
+            '@@ -1 +1 @@\n' + \
+            '-a2\n' + \
+            '+b2\n'
+
+        parser = UdiffParser.from_string(diff)
+        # the rename touches the paths of the first two diffs, the three are applied in order
+        self.assertEqual([[file.path for file in group] for group in _groups(parser)],
+                         [['b.txt', 'a.txt', 'b.txt'], ['c.txt']])
+
+        results = parser.apply_to(self.directory, workers=2)
+        self.assertEqual([result.ok for result in results], [True] * 4)
+        self.assertEqual(self.read('b.txt'), 'b2\n')
+        self.assertEqual(self.read('c.txt'), 'c2\n')
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'a.txt')))
+
+    def test_plain_diff_new_and_deleted_files(self):
+        self.write('gone.txt', 'x\ny\n')
+        diff = \
+            '--- /dev/null\t2021-03-01 18:40:51.561243000 +0100\n' + \
+            '+++ b/added.txt\t2021-03-02 10:14:07.120304000 +0100\n' + \
+            '@@ -0,0 +1 @@\n' + \
+            '+hello\n' + \
+            '--- a/gone.txt\t2021-03-02 10:14:07.120304000 +0100\n' + \
+            '+++ /dev/null\t2021-03-01 18:40:51.561243000 +0100\n' + \
+            '@@ -1,2 +0,0 @@\n' + \
+            '-x\n' + \
+            '-y\n'
+
+        results = UdiffParser.from_string(diff).apply_to(self.directory)
+        self.assertEqual([result.ok for result in results], [True, True])
+        self.assertEqual(self.read('added.txt'), 'hello\n')
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'gone.txt')))
+
+    def test_diff_ruN_new_and_deleted_files(self):
+        # diff -ruN a b: both names are real paths, the missing side has the epoch as timestamp
+        self.write('gone.txt', 'x\ny\n')
+        self.write('keep.txt', 'k\n')
+        diff = \
+            'diff -ruN a/added.txt b/added.txt\n' + \
+            '--- a/added.txt\t1970-01-01 00:00:00.000000000 +0000\n' + \
+            '+++ b/added.txt\t2021-03-02 10:14:07.120304000 +0100\n' + \
+            '@@ -0,0 +1 @@\n' + \
+            '+hello\n' + \
+            'diff -ruN a/gone.txt b/gone.txt\n' + \
+            '--- a/gone.txt\t2021-03-02 10:14:07.120304000 +0100\n' + \
+            '+++ b/gone.txt\t1970-01-01 00:00:00.000000000 +0000\n' + \
+            '@@ -1,2 +0,0 @@\n' + \
+            '-x\n' + \
+            '-y\n' + \
+            'diff -ruN a/keep.txt b/keep.txt\n' + \
+            '--- a/keep.txt\t2021-03-02 10:14:07.120304000 +0100\n' + \
+            '+++ b/keep.txt\t2021-03-02 10:14:07.120304000 +0100\n' + \
+            '@@ -1 +1 @@\n' + \
+            '-k\n' + \
+            '+k2\n'
+
+        results = UdiffParser.from_string(diff).apply_to(self.directory)
+        self.assertEqual([result.ok for result in results], [True, True, True])
+        self.assertEqual(self.read('added.txt'), 'hello\n')
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'gone.txt')))
+        self.assertEqual(self.read('keep.txt'), 'k2\n')
+
+    def test_emptied_git_file_is_kept(self):
+        self.write('empty.txt', 'x\n')
+        diff = \
+            'diff --git a/empty.txt b/empty.txt\n' + \
+            'index 587be6b..e69de29 100644\n' + \
+            '--- a/empty.txt\n' + \
+            '+++ b/empty.txt\n' + \
+            '@@ -1 +0,0 @@\n' + \
+            '-x\n'
+
+        self.assertTrue(UdiffParser.from_string(diff).apply_to(self.directory)[0].ok)
+        self.assertEqual(self.read('empty.txt'), '')
+
+    def test_rejected_file_is_not_written(self):
+        self.write('sample', SOURCE.replace('line 3\n', 'line 3 changed\n'))
+
+        results = UdiffParser.from_string(DIFF).apply_to(self.directory)
+
+        self.assertEqual(len(results[0].rejects), 1)
+        self.assertEqual(self.read('sample'), SOURCE.replace('line 3\n', 'line 3 changed\n'))
+
+    def test_paths_outside_of_directory(self):
+        diff = DIFF.replace('a/sample', 'a/../sample').replace('b/sample', 'b/../sample')
+
+        results = UdiffParser.from_string(diff).apply_to(self.directory)
+        self.assertFalse(results[0].ok)
+        self.assertIn('outside', results[0].error)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,193 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Tests for the command line interface."""
+
+from __future__ import unicode_literals
+
+import gzip
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from udiff.cli import main
+from udiff.parser import UdiffParser
+
+
+DIFF = \
+    'diff --git a/src/core/init.js b/src/core/init.js\n' + \
+    'index e49196a..50f310c 100644\n' + \
+    '--- a/src/core/init.js\n' + \
+    '+++ b/src/core/init.js\n' + \
+    '@@ -101,3 +101,3 @@ var rootjQuery,\n' + \
+    '     } else if ( jQuery.isFunction( selector ) ) {\n' + \
+    '-      return typeof rootjQuery.ready !== "undefined" ?\n' + \
+    '+      return rootjQuery.ready !== undefined ?\n' + \
+    '         rootjQuery.ready( selector ) :\n' + \
+    'diff --git a/src/event.js b/src/event.js\n' + \
+    'deleted file mode 100644\n' + \
+    'index 7336f4d..0000000\n' + \
+    '--- a/src/event.js\n' + \
+    '+++ /dev/null\n' + \
+    '@@ -1,2 +0,0 @@\n' + \
+    '-var a;\n' + \
+    '-var b;\n' + \
+    'diff --git a/logo.png b/logo.png\n' + \
+    'index 322248b..56fc1f2 100644\n' + \
+    'Binary files a/logo.png and b/logo.png differ\n'
+
+LOG = \
+    'commit 8f7e6d5c4b3a29180f7e6d5c4b3a29180f7e6d5c\n' + \
+    'Author: A U Thor <author@example.com>\n' + \
+    'Date:   Mon Apr 3 10:00:00 2023 +0200\n' + \
+    '\n' + \
+    '    Second\n' + \
+    '\n' + \
+    '    - the body looks like a removed line\n' + \
+    '\n' + \
+    'diff --git a/app.py b/app.py\n' + \
+    '--- a/app.py\n' + \
+    '+++ b/app.py\n' + \
+    '@@ -1 +1 @@\n' + \
+    '-x = 1\n' + \
+    '+x = 2\n' + \
+    '\n' + \
+    'commit 1a2b3c4d5e6f70819a2b3c4d5e6f70819a2b3c4d\n' + \
+    'Author: A U Thor <author@example.com>\n' + \
+    'Date:   Sun Apr 2 10:00:00 2023 +0200\n' + \
+    '\n' + \
+    '    First\n' + \
+    '\n' + \
+    'diff --git a/app.py b/app.py\n' + \
+    '--- a/app.py\n' + \
+    '+++ b/app.py\n' + \
+    '@@ -1,2 +1,2 @@\n' + \
+    ' import os\n' + \
+    '-x = 0\n' + \
+    '+x = 1\n'
+
+
+class TestCli(unittest.TestCase):
+    """Tests for the udiff command."""
+
+    def setUp(self):
+        super(TestCli, self).setUp()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        super(TestCli, self).tearDown()
+
+    def write(self, name, data, opener=io.open):
+        path = os.path.join(self.directory, name)
+        with opener(path, 'wb') as f:
+            f.write(data.encode('utf-8'))
+
+        return path
+
+    def run_main(self, *args):
+        out = io.StringIO()
+        self.assertEqual(main(list(args), stdout=out), 0)
+        return out.getvalue()
+
+    def test_numstat(self):
+        path = self.write('changes.diff', DIFF)
+
+        self.assertEqual(self.run_main(path),
+                         '1\t1\tsrc/core/init.js\n' +
+                         '0\t2\tsrc/event.js\n' +
+                         '-\t-\tlogo.png\n')
+
+    def test_include_exclude(self):
+        path = self.write('changes.diff', DIFF)
+
+        self.assertEqual(self.run_main(path, '--include', 'src/*', '--exclude', '*/event.js'),
+                         '1\t1\tsrc/core/init.js\n')
+
+    def test_max_changes(self):
+        path = self.write('changes.diff', DIFF)
+
+        output = self.run_main(path, '--ndjson', '--max-changes', '1')
+        files = [json.loads(line) for line in output.splitlines()]
+        self.assertEqual([file['is_too_big'] for file in files if 'is_too_big' in file], [True])
+
+    def test_ndjson(self):
+        path = self.write('changes.diff', DIFF)
+
+        files = [json.loads(line) for line in self.run_main(path, '--ndjson').splitlines()]
+        self.assertEqual(len(files), 3)
+        self.assertEqual(files[1]['is_deleted'], True)
+        self.assertEqual(files[0]['blocks'][0]['header'], '@@ -101,3 +101,3 @@ var rootjQuery,')
+
+    def test_diff_output(self):
+        path = self.write('changes.diff', DIFF)
+
+        output = self.run_main(path, '--diff', '--include', 'src/*')
+        self.assertEqual(output, DIFF[:DIFF.index('diff --git a/logo.png')])
+
+    def test_gzip_input(self):
+        path = self.write('changes.diff.gz', DIFF, opener=gzip.open)
+
+        self.assertEqual(self.run_main(path, '--include', '*.png'), '-\t-\tlogo.png\n')
+
+    def test_git_log_input(self):
+        path = self.write('log.diff', LOG)
+
+        self.assertEqual(self.run_main(path), '1\t1\tapp.py\n1\t1\tapp.py\n')
+
+        files = [json.loads(line) for line in self.run_main(path, '--ndjson').splitlines()]
+        self.assertEqual([len(file['blocks'][0]['lines']) for file in files], [2, 3])
+        self.assertEqual([file['blocks'][0].get('malformed') for file in files], [None, None])
+
+    def test_stdin_is_left_open(self):
+        class Stdin(object):
+            buffer = io.BytesIO(DIFF.encode('utf-8'))
+
+        stdin = sys.stdin
+        sys.stdin = Stdin()
+        try:
+            self.assertEqual(self.run_main('-', '--include', '*.png'), '-\t-\tlogo.png\n')
+        finally:
+            sys.stdin = stdin
+
+        self.assertFalse(Stdin.buffer.closed)
+
+    def test_missing_file(self):
+        self.assertEqual(main([os.path.join(self.directory, 'missing.diff')], stdout=io.StringIO()), 1)
+
+    def test_files_are_yielded_while_reading(self):
+        def chunks():
+            yield DIFF
+            raise AssertionError('the first file must be yielded before reading further')
+
+        files = UdiffParser.iter_files(chunks())
+        self.assertEqual(next(files).path, 'src/core/init.js')
+
+
+if __name__ == '__main__':
+    unittest.main()
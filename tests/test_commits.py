@@ -0,0 +1,221 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+"""Tests for patch series."""
+
+from __future__ import unicode_literals
+
+import unittest
+
+from udiff.commits import iter_log, iter_log_commits, iter_mails, iter_series, parse_mail
+
+
+SERIES = \
+    'From 1111111111111111111111111111111111111111 Mon Sep 17 00:00:00 2001\n' + \
+    'From: =?UTF-8?q?J=C3=B6rg=20M=C3=BCller?= <jorg@example.com>\n' + \
+    'Date: Tue, 3 Oct 2023 10:00:00 +0200\n' + \
+    'Subject: [PATCH v2 1/2] Fix the parser for very long\n' + \
+    ' subjects\n' + \
+    '\n' + \
+    'The old check looked like:\n' + \
+    '\n' + \
+    'diff-like text that is not a diff\n' + \
+    '------------------------------\n' + \
+    '\n' + \
+    'Signed-off-by: Ann <ann@example.com>\n' + \
+    '---\n' + \
+    ' app.py | 2 +-\n' + \
+    ' 1 file changed, 1 insertion(+), 1 deletion(-)\n' + \
+    '\n' + \
+    'diff --git a/app.py b/app.py\n' + \
+    'index 1111111..2222222 100644\n' + \
+    '--- a/app.py\n' + \
+    '+++ b/app.py\n' + \
+    '@@ -1,2 +1,2 @@\n' + \
+    ' x = 1\n' + \
+    '-y = 2\n' + \
+    '+y = 3\n' + \
+    '-- \n' + \
+    '2.40.0\n' + \
+    '\n' + \
+    'From 2222222222222222222222222222222222222222 Mon Sep 17 00:00:00 2001\n' + \
+    'From: Ann <ann@example.com>\n' + \
+    'Date: Tue, 3 Oct 2023 11:00:00 +0200\n' + \
+    'Subject: [PATCH v2 2/2] Add docs\n' + \
+    '\n' + \
+    '---\n' + \
+    ' docs.md | 1 +\n' + \
+    '\n' + \
+    'diff --git a/docs.md b/docs.md\n' + \
+    'new file mode 100644\n' + \
+    'index 0000000..3333333\n' + \
+    '--- /dev/null\n' + \
+    '+++ b/docs.md\n' + \
+    '@@ -0,0 +1 @@\n' + \
+    '+------------\n' + \
+    '-- \n' + \
+    '2.40.0\n'
+
+LOG = \
+    'commit %s %s %s (HEAD -> master)\n' % ('a' * 40, 'b' * 40, 'c' * 40) + \
+    'Merge: bbbbbbb ccccccc\n' + \
+    'Author: Ann <ann@example.com>\n' + \
+    'Date:   Mon Oct 19 02:42:27 2026 +0000\n' + \
+    '\n' + \
+    '    Merge branch side\n' + \
+    '    \n' + \
+    '    --------\n' + \
+    '    diff --git a/not b/a diff\n' + \
+    '\n' + \
+    'diff --cc f\n' + \
+    'index 6dcce7d,7be73ce..6e5aa5d\n' + \
+    '--- a/f\n' + \
+    '+++ b/f\n' + \
+    '@@@ -1,2 -1,2 +1,2 @@@\n' + \
+    '  a\n' + \
+    '- b\n' + \
+    ' -B\n' + \
+    '++B2\n' + \
+    '\n' + \
+    'commit %s\n' % ('b' * 40) + \
+    'Author: Ann <ann@example.com>\n' + \
+    'Date:   Mon Oct 19 02:40:00 2026 +0000\n' + \
+    '\n' + \
+    '    Change c\n' + \
+    '\n' + \
+    'diff --git a/f b/f\n' + \
+    '--- a/f\n' + \
+    '+++ b/f\n' + \
+    '@@ -3 +3 @@\n' + \
+    '-c\n' + \
+    '+C\n' + \
+    '\n' + \
+    'commit %s\n' % ('d' * 40) + \
+    'Merge: bbbbbbb eeeeeee\n' + \
+    'Author: Ann <ann@example.com>\n' + \
+    'Date:   Mon Oct 19 02:30:00 2026 +0000\n' + \
+    '\n' + \
+    '    Merge without changes\n'
+
+
+class LogTest(unittest.TestCase):
+
+    def test_iter_log_commits(self):
+        commits = list(iter_log_commits(LOG))
+
+        merge, diff = commits[0]
+        self.assertEqual(merge.sha, 'a' * 40)
+        self.assertEqual(merge.parents, ['b' * 40, 'c' * 40])
+        self.assertEqual(merge.author, 'Ann <ann@example.com>')
+        self.assertEqual(merge.date, 'Mon Oct 19 02:42:27 2026 +0000')
+        self.assertEqual(merge.subject, 'Merge branch side')
+        self.assertEqual(merge.message, 'Merge branch side\n\n--------\ndiff --git a/not b/a diff')
+        self.assertTrue(diff.startswith('diff --cc f\n'))
+
+        self.assertIsNone(commits[1][0].parents)
+        self.assertEqual(commits[2][0].parents, ['bbbbbbb', 'eeeeeee'])
+
+    def test_iter_log(self):
+        for processes in (None, 2):
+            commits = list(iter_log(LOG.splitlines(True), processes=processes, chunksize=1))
+
+            self.assertEqual([commit.sha[0] for commit, parser in commits], ['a', 'b', 'd'])
+            self.assertEqual([len(parser) for commit, parser in commits], [1, 1, 0])
+            merge = commits[0][1][0]
+            self.assertTrue(merge.is_combined)
+            self.assertEqual([line.content for line in merge[0]], ['  a', '- b', ' -B', '++B2'])
+            self.assertEqual([line.content for line in commits[1][1][0][0]], ['-c', '+C'])
+
+
+    def test_iter_log_keeps_separators(self):
+        log = \
+            'commit %s\n' % ('e' * 40) + \
+            'Author: Ann <ann@example.com>\n' + \
+            'Date:   Mon Oct 19 02:50:00 2026 +0000\n' + \
+            '\n' + \
+            '    Drop the rule\n' + \
+            '\n' + \
+            'diff --git a/README.md b/README.md\n' + \
+            '--- a/README.md\n' + \
+            '+++ b/README.md\n' + \
+            '@@ -1,2 +1 @@\n' + \
+            ' Title\n' + \
+            '------------\n'
+
+        for processes in (None, 2):
+            commit, parser = next(iter_log(log, options={'patch_id': True}, processes=processes))
+            self.assertEqual(parser[0].deleted_lines, 1)
+            self.assertFalse(parser[0][0].malformed)
+
+
+class SeriesTest(unittest.TestCase):
+
+    def test_iter_mails(self):
+        mails = list(iter_mails('junk before the first email\n' + SERIES))
+
+        self.assertEqual(len(mails), 2)
+        self.assertTrue(mails[1].startswith('From 2222222'))
+
+    def test_parse_mail(self):
+        commit, parser = parse_mail(SERIES.split('\n\nFrom ')[0])
+
+        self.assertEqual(commit.sha, '1' * 40)
+        self.assertEqual(commit.author, 'J\xf6rg M\xfcller <jorg@example.com>')
+        self.assertEqual(commit.date, 'Tue, 3 Oct 2023 10:00:00 +0200')
+        self.assertEqual(commit.subject, 'Fix the parser for very long subjects')
+        self.assertEqual(commit.message.split('\n')[2:5], [
+            'The old check looked like:', '', 'diff-like text that is not a diff',
+        ])
+        self.assertEqual(len(parser), 1)
+        self.assertEqual([line.content for line in parser[0][0]], [' x = 1', '-y = 2', '+y = 3'])
+
+    def test_iter_series(self):
+        for processes in (None, 2):
+            series = list(iter_series(SERIES.splitlines(True), processes=processes, chunksize=1))
+
+            self.assertEqual([commit.subject for commit, parser in series], [
+                'Fix the parser for very long subjects', 'Add docs',
+            ])
+            docs = series[1][1][0]
+            self.assertTrue(docs.is_added_file)
+            self.assertEqual([line.content for line in docs[0]], ['+------------'])
+
+    def test_quoted_printable(self):
+        commit, parser = parse_mail(
+            'From: Ann <ann@example.com>\n' +
+            'Subject: =?UTF-8?q?[PATCH]=20Caf=C3=A9?=\n' +
+            'Content-Transfer-Encoding: quoted-printable\n' +
+            '\n' +
+            '---\n' +
+            '--- a/menu.txt\n' +
+            '+++ b/menu.txt\n' +
+            '@@ -1 +1 @@\n' +
+            '-cafe\n' +
+            '+caf=C3=A9\n'
+        )
+
+        self.assertEqual(commit.subject, 'Caf\xe9')
+        self.assertIsNone(commit.sha)
+        self.assertEqual(parser[0][0][1].content, '+caf\xe9')
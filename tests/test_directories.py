@@ -0,0 +1,95 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Tests for the directory statistics."""
+
+from __future__ import unicode_literals
+
+import unittest
+
+from udiff.directories import UdiffDirectoryTree
+from udiff.parser import UdiffParser
+
+
+DIFF = \
+    'diff --git a/src/api/views.py b/src/api/views.py\n' + \
+    '--- a/src/api/views.py\n' + \
+    '+++ b/src/api/views.py\n' + \
+    '@@ -1 +1,2 @@\n' + \
+    '-a\n' + \
+    '+b\n' + \
+    '+c\n' + \
+    'diff --git a/src/main.py b/src/main.py\n' + \
+    'new file mode 100644\n' + \
+    '--- /dev/null\n' + \
+    '+++ b/src/main.py\n' + \
+    '@@ -0,0 +1 @@\n' + \
+    '+main\n' + \
+    'diff --git a/docs/old.md b/docs/old.md\n' + \
+    'deleted file mode 100644\n' + \
+    '--- a/docs/old.md\n' + \
+    '+++ /dev/null\n' + \
+    '@@ -1,2 +0,0 @@\n' + \
+    '-x\n' + \
+    '-y\n' + \
+    'diff --git a/README b/README\n' + \
+    'similarity index 100%\n' + \
+    'rename from README\n' + \
+    'rename to README.md\n'
+
+
+class UdiffDirectoryTreeTest(unittest.TestCase):
+
+    def test_counts(self):
+        tree = UdiffParser(DIFF).directories()
+
+        self.assertEqual(tree.get('').object, {
+            'added_lines': 3, 'deleted_lines': 3, 'files': 4,
+            'statuses': {'added': 1, 'deleted': 1, 'modified': 1, 'renamed': 1},
+        })
+        self.assertEqual(tree.get('src/').object, {
+            'added_lines': 3, 'deleted_lines': 1, 'files': 2, 'statuses': {'added': 1, 'modified': 1},
+        })
+        self.assertEqual(tree.get('docs').statuses, {'deleted': 1})
+        self.assertEqual(tree.get('src/api').files, 1)
+        self.assertIsNone(tree.get('src/main.py'))
+        self.assertIsNone(tree.get('lib'))
+
+    def test_walk(self):
+        tree = UdiffParser(DIFF).directories()
+
+        self.assertEqual([path for path, node in tree.walk()], ['', 'docs', 'src', 'src/api'])
+        self.assertEqual([path for path, node in tree.walk(depth=1)], ['', 'docs', 'src'])
+        self.assertEqual([(path, node.added_lines) for path, node in tree.walk('src', depth=1)], [('src', 3), ('src/api', 2)])
+        self.assertEqual(list(tree.walk('lib')), [])
+
+    def test_incremental(self):
+        tree = UdiffDirectoryTree()
+        tree.add(UdiffParser.iter_files(DIFF, options={'stat_only': True}))
+        tree.add(UdiffParser(DIFF))
+        self.assertEqual(tree.get('src').added_lines, 6)
+
+        merged = UdiffDirectoryTree(UdiffParser(DIFF)).merge(UdiffParser(DIFF).directories())
+        self.assertEqual([(path, node.object) for path, node in merged.walk()],
+                         [(path, node.object) for path, node in tree.walk()])
@@ -0,0 +1,118 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Tests for the event driven parsing."""
+
+from __future__ import unicode_literals
+
+import unittest
+
+from udiff.handler import UdiffHandler
+from udiff.parser import UdiffParser
+
+
+DIFF = \
+    'diff --git a/secret.txt b/secret.txt\n' + \
+    'new file mode 100644\n' + \
+    'index 0000000..1111111\n' + \
+    '--- /dev/null\n' + \
+    '+++ b/secret.txt\n' + \
+    '@@ -0,0 +1,2 @@\n' + \
+    '+password=1\n' + \
+    '+user=2\n' + \
+    'diff --git a/code.py b/code.py\n' + \
+    '--- a/code.py\n' + \
+    '+++ b/code.py\n' + \
+    '@@ -3,2 +3,2 @@ def main():\n' + \
+    ' x\n' + \
+    '-y\n' + \
+    '+z\n'
+
+
+class Recorder(UdiffHandler):
+
+    def __init__(self, skip=None):
+        self.events = []
+        self.skip = skip
+
+    def on_file_start(self):
+        self.events.append('start')
+
+    def on_header(self, kind, match):
+        self.events.append((kind, match.group(1)))
+
+    def on_hunk(self, block):
+        self.events.append(('hunk', block.old_start_line, block.new_start_line))
+
+    def on_line(self, line_type, source_line_no, target_line_no, text):
+        self.events.append((line_type, source_line_no, target_line_no, text))
+        if self.skip and self.skip in text:
+            return self.SKIP_FILE
+
+    def on_file_end(self, file):
+        self.events.append(('end', file.path, file.added_lines, len(file[0])))
+
+
+class ParseEventsTest(unittest.TestCase):
+
+    def test_events(self):
+        handler = UdiffParser.parse_events(DIFF, Recorder())
+
+        self.assertEqual(handler.events, [
+            'start',
+            ('git_diff', 'a/secret.txt'),
+            ('new_file_mode', '100644'),
+            ('index', '0000000'),
+            ('old_file', '/dev/null'),
+            ('new_file', 'b/secret.txt'),
+            ('hunk', 0, 1),
+            ('+', None, 1, 'password=1'),
+            ('+', None, 2, 'user=2'),
+            ('end', 'secret.txt', 2, 0),
+            'start',
+            ('git_diff', 'a/code.py'),
+            ('old_file', 'a/code.py'),
+            ('new_file', 'b/code.py'),
+            ('hunk', 3, 3),
+            (' ', 3, 3, 'x'),
+            ('-', 4, None, 'y'),
+            ('+', None, 4, 'z'),
+            ('end', 'code.py', 1, 0),
+        ])
+
+    def test_skip_file(self):
+        handler = UdiffParser.parse_events(DIFF, Recorder(skip='password'))
+
+        self.assertEqual(handler.events[7:11], [('+', None, 1, 'password=1'), ('end', 'secret.txt', 1, 0), 'start',
+                                                ('git_diff', 'a/code.py')])
+
+    def test_build_lines(self):
+        handler = Recorder()
+        handler.build_lines = True
+        UdiffParser.parse_events(DIFF, handler)
+
+        self.assertEqual(handler.events[-1], ('end', 'code.py', 1, 3))
+
+    def test_defaults(self):
+        self.assertIs(UdiffParser.parse_events(DIFF, UdiffHandler()).__class__, UdiffHandler)
@@ -0,0 +1,85 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Tests for the import footprint of the package."""
+
+from __future__ import unicode_literals
+
+import os
+import subprocess
+import sys
+import unittest
+
+from udiff.parser import PY2
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative `import udiff` time in microseconds, about 50x what it takes on a laptop: it catches an eager import
+# of a heavy module or a compilation of all the regexes, not noise of a loaded machine.
+IMPORT_TIME_BUDGET = 100000
+
+
+def run_python(*args):
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+
+    process = subprocess.Popen((sys.executable,) + args, cwd=ROOT, env=env,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stdout, stderr = process.communicate()
+    return stdout.decode('utf-8'), stderr.decode('utf-8')
+
+
+class TestImport(unittest.TestCase):
+    """Tests for the import of the package."""
+
+    def test_regexes_are_not_compiled_on_import(self):
+        stdout, _ = run_python('-S', '-c', 'import sys, udiff.constants as c; '
+                                           'print("%s %s" % ("re" in sys.modules, "match" in vars(c.RE_INDEX)))')
+        self.assertEqual(stdout.split(), ['False', 'False'])
+
+    def test_debug_helper_is_not_imported(self):
+        stdout, _ = run_python('-c', 'import sys, udiff; '
+                                     'print("%s %s" % ("udiff.debug" in sys.modules, "pprint" in sys.modules))')
+        self.assertEqual(stdout.split(), ['False', 'False'])
+
+    @unittest.skipIf(PY2 or sys.version_info < (3, 7), '-X importtime needs python 3.7+')
+    @unittest.skipIf(os.environ.get('UDIFF_SKIP_TIMING'), 'UDIFF_SKIP_TIMING is set')
+    def test_import_time_budget(self):
+        # the first run writes the bytecode cache
+        run_python('-c', 'import udiff')
+
+        timings = []
+        for _ in range(3):
+            _, stderr = run_python('-X', 'importtime', '-c', 'import udiff')
+            for line in stderr.splitlines():
+                fields = [field.strip() for field in line.split('|')]
+                if len(fields) == 3 and fields[2] == 'udiff':
+                    timings.append(int(fields[1]))
+
+        self.assertTrue(timings)
+        self.assertLess(min(timings), IMPORT_TIME_BUDGET)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+"""Tests for the string pool."""
+
+from __future__ import unicode_literals
+
+import pickle
+import unittest
+
+from udiff.interning import UdiffInternPool
+from udiff.parser import UdiffParser
+
+
+def diff(path):
+    return \
+        '--- a/%s\n' % path + \
+        '+++ b/%s\n' % path + \
+        '@@ -1,2 +1,2 @@\n' + \
+        ' # Licensed under the MIT License\n' + \
+        '-import os\n' + \
+        '+import sys\n'
+
+
+class UdiffInternPoolTest(unittest.TestCase):
+
+    def test_intern(self):
+        pool = UdiffInternPool()
+        first = ''.join(['line', ' of text'])
+        second = ''.join(['line of', ' text'])
+
+        self.assertIs(pool.intern(first), first)
+        self.assertIs(pool.intern(second), first)
+        self.assertEqual((len(pool), pool.hits, pool.misses), (1, 1, 1))
+
+    def test_max_size(self):
+        pool = UdiffInternPool(max_size=2)
+        pool.intern('a')
+        pool.intern('b')
+        pool.intern('a')
+        pool.intern('c')
+
+        self.assertIn('a', pool)
+        self.assertNotIn('b', pool)
+        self.assertEqual(len(pool), 2)
+
+    def test_pickle(self):
+        pool = UdiffInternPool(max_size=10)
+        pool.intern('a')
+
+        copy = pickle.loads(pickle.dumps(pool))
+        self.assertIn('a', copy)
+        self.assertEqual(copy.intern('b'), 'b')
+
+
+class ParserInternTest(unittest.TestCase):
+
+    def test_parser(self):
+        parser = UdiffParser(diff('one.py') + diff('two.py'), options={'intern': True})
+
+        self.assertIs(parser[0][0][0].content, parser[1][0][0].content)
+        self.assertIs(parser[0][0][2].content, parser[1][0][2].content)
+        self.assertIsNone(parser.intern_pool)
+
+    def test_shared_pool(self):
+        pool = UdiffInternPool(max_size=1000)
+        first = UdiffParser(diff('one.py'), options={'intern': pool})
+        second = UdiffParser(diff('one.py'), options={'intern': pool, 'patch_id': True})
+
+        self.assertIs(first[0][0][1].content, second[0][0][1].content)
+        self.assertIs(first[0].new_name, second[0].new_name)
+        self.assertEqual(first[0].object['old_name'], 'one.py')
+
+    def test_not_interned(self):
+        first, second = UdiffParser(diff('one.py') + diff('two.py'))
+
+        self.assertIsNot(first[0][0].content, second[0][0].content)
@@ -0,0 +1,84 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Tests for the hunk interval index."""
+
+from __future__ import unicode_literals
+
+import unittest
+
+from udiff.parser import UdiffParser
+
+
+
+DIFF = \
+    '--- a/sample\n' + \
+    '+++ b/sample\n' + \
+    '@@ -2,3 +2,3 @@\n' + \
+    ' line 2\n' + \
+    '-line 3\n' + \
+    '+line three\n' + \
+    ' line 4\n' + \
+    '@@ -10,0 +11,2 @@\n' + \
+    '+line 10.1\n' + \
+    '+line 10.2\n' + \
+    '@@ -20,2 +22,0 @@\n' + \
+    '-line 20\n' + \
+    '-line 21\n'
+
+
+class UdiffHunkIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.file = UdiffParser(DIFF)[0]
+        self.index = self.file.hunk_index()
+
+    def test_new_side(self):
+        self.assertEqual(self.index.overlapping(1, 2), [self.file[0]])
+        self.assertEqual(self.index.overlapping(5, 10), [])
+        self.assertEqual(self.index.overlapping(4, 11), [self.file[0], self.file[1]])
+        self.assertTrue(self.index.touches(12, 12))
+        self.assertFalse(self.index.touches(13, 21))
+
+    def test_old_side(self):
+        self.assertEqual(self.index.overlapping(3, 3, side='old'), [self.file[0]])
+        self.assertEqual(self.index.overlapping(21, 30, side='old'), [self.file[2]])
+
+    def test_insertion_point(self):
+        # the lines are inserted between the old lines 10 and 11
+        self.assertEqual(self.index.overlapping(10, 11, side='old'), [self.file[1]])
+        self.assertEqual(self.index.overlapping(10, 10, side='old'), [])
+        self.assertEqual(self.index.overlapping(11, 15, side='old'), [])
+        # the lines are removed between the new lines 22 and 23
+        self.assertEqual(self.index.overlapping(22, 23), [self.file[2]])
+        self.assertEqual(self.index.overlapping(23, 30), [])
+
+    def test_overlapping_many(self):
+        ranges = [(20, 30), (1, 1), (3, 12), (5, 6)]
+        self.assertEqual(self.index.overlapping_many(ranges), [
+            [self.file[2]], [], [self.file[0], self.file[1]], [],
+        ])
+
+    def test_bad_side(self):
+        self.assertRaises(ValueError, self.index.overlapping, 1, 2, 'both')
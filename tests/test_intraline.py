@@ -0,0 +1,96 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Tests for the intraline changes."""
+
+from __future__ import unicode_literals
+
+import unittest
+
+from udiff.intraline import UdiffIntraline, diff_texts
+from udiff.parser import UdiffParser
+
+
+DIFF = \
+    '--- a/sample.js\n' + \
+    '+++ b/sample.js\n' + \
+    '@@ -1,6 +1,6 @@\n' + \
+    ' function foo() {\n' + \
+    '-  return bar(a, b);\n' + \
+    '-  var x = 1;\n' + \
+    '-  // removed\n' + \
+    '+  return baz(a, b);\n' + \
+    '+  totally different content here\n' + \
+    ' }\n' + \
+    '-var old;\n' + \
+    '+var young;\n'
+
+
+class TestIntraline(unittest.TestCase):
+    """Tests for the intraline engine."""
+
+    def test_word_diff(self):
+        self.assertEqual(diff_texts('foo(a, b)', 'foo(a, c, b)'), ([], [(7, 10)]))
+        self.assertEqual(diff_texts('return bar;', 'return baz;'), ([(7, 10)], [(7, 10)]))
+
+    def test_char_diff(self):
+        self.assertEqual(diff_texts('return bar;', 'return baz;', mode='char'), ([(9, 10)], [(9, 10)]))
+
+    def test_dissimilar_lines(self):
+        self.assertEqual(diff_texts('var x = 1;', 'totally different content here'), None)
+
+    def test_long_lines(self):
+        self.assertEqual(diff_texts('a' * 20, 'a' * 19 + 'b', max_line_length=10), None)
+
+    def test_pairs(self):
+        pairs = UdiffParser.from_string(DIFF)[0][0].intraline()
+
+        self.assertEqual([(pair.removed.source_line_no, pair.added.target_line_no) for pair in pairs],
+                         [(2, 2), (3, 3), (6, 5)])
+        self.assertEqual(pairs[0].removed_spans, [(9, 12)])
+        self.assertEqual(pairs[0].added_spans, [(9, 12)])
+        self.assertEqual(pairs[1].spans, None)
+        self.assertEqual(pairs[2].spans, ([(4, 7)], [(4, 9)]))
+
+    def test_lazy_and_cached(self):
+        intraline = UdiffIntraline(cache_size=2)
+        pairs = UdiffParser.from_string(DIFF)[0][0].intraline(intraline)
+        self.assertEqual(len(intraline.cache), 0)
+
+        pairs[0].spans
+        self.assertEqual(list(intraline.cache), [('  return bar(a, b);', '  return baz(a, b);')])
+
+        UdiffParser.from_string(DIFF)[0].intraline(intraline)
+        self.assertEqual(len(intraline.cache), 2)
+
+    def test_process_pool(self):
+        intraline = UdiffIntraline()
+        pairs = UdiffParser.from_string(DIFF)[0].intraline(intraline, processes=2)
+
+        self.assertEqual([pair.spans for pair in pairs],
+                         [([(9, 12)], [(9, 12)]), None, ([(4, 7)], [(4, 9)])])
+
+
+if __name__ == '__main__':
+    unittest.main()
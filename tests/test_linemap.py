@@ -0,0 +1,92 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Tests for the line number mapping."""
+
+from __future__ import unicode_literals
+
+import unittest
+
+from udiff.parser import UdiffParser
+
+
+DIFF = \
+    '--- a/sample\n' + \
+    '+++ b/sample\n' + \
+    '@@ -2,4 +2,3 @@\n' + \
+    ' line 2\n' + \
+    '-line 3\n' + \
+    '-line 4\n' + \
+    '+line four\n' + \
+    ' line 5\n' + \
+    '@@ -10,0 +10,2 @@\n' + \
+    '+line 10.1\n' + \
+    '+line 10.2\n'
+
+
+class TestLineMap(unittest.TestCase):
+    """Tests for UdiffFile.line_map."""
+
+    def setUp(self):
+        super(TestLineMap, self).setUp()
+        self.line_map = UdiffParser.from_string(DIFF)[0].line_map()
+
+    def test_old_to_new(self):
+        self.assertEqual([self.line_map.old_to_new(line_no) for line_no in range(1, 13)],
+                         [1, 2, None, None, 4, 5, 6, 7, 8, 9, 12, 13])
+
+    def test_new_to_old(self):
+        self.assertEqual([self.line_map.new_to_old(line_no) for line_no in range(1, 14)],
+                         [1, 2, None, 5, 6, 7, 8, 9, 10, None, None, 11, 12])
+
+    def test_out_of_range(self):
+        self.assertEqual(self.line_map.old_to_new(0), None)
+        self.assertEqual(self.line_map.old_to_new(4000), 4001)
+
+    def test_batch(self):
+        self.assertEqual(self.line_map.old_to_new_many([12, 3, 1, 4000, 5]), [13, None, 1, 4001, 4])
+        self.assertEqual(self.line_map.new_to_old_many([11, 4, 3]), [None, 5, None])
+
+    def test_ranges(self):
+        self.assertEqual(self.line_map.old_range_to_new(2, 11), [(2, 2), (4, 9), (12, 12)])
+        self.assertEqual(self.line_map.new_range_to_old(9, 12), [(10, 10), (11, 11)])
+
+    def test_combined_diff(self):
+        diff = \
+            'diff --cc describe.c\n' + \
+            'index fabadb8,cc95eb0..4866510\n' + \
+            '--- a/describe.c\n' + \
+            '+++ b/describe.c\n' + \
+            '@@@ -98,2 -98,2 +98,2 @@@\n' + \
+            '- static void describe(char *arg)\n' + \
+            ' -static void describe(struct commit *cmit, int last_one)\n' + \
+            '++static void describe(char *arg, int last_one)\n' + \
+            '  {\n'
+
+        with self.assertRaises(ValueError):
+            UdiffParser.from_string(diff)[0].line_map()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Tests for the moved code detection."""
+
+from __future__ import unicode_literals
+
+import unittest
+
+from udiff.parser import UdiffParser
+
+
+DIFF = \
+    'diff --git a/a.py b/a.py\n' + \
+    '--- a/a.py\n' + \
+    '+++ b/a.py\n' + \
+    '@@ -1,6 +1,2 @@\n' + \
+    ' import os\n' + \
+    '-def helper(path):\n' + \
+    '-    return os.path.join(path, "x")\n' + \
+    '-}\n' + \
+    '-x = 1\n' + \
+    ' y = 2\n' + \
+    'diff --git a/b.py b/b.py\n' + \
+    '--- a/b.py\n' + \
+    '+++ b/b.py\n' + \
+    '@@ -10,2 +10,6 @@\n' + \
+    ' import os\n' + \
+    '+}\n' + \
+    '+def helper(path):\n' + \
+    '+    return os.path.join(path, "x")\n' + \
+    '+x = 1\n' + \
+    ' z = 3\n'
+
+
+class MovedTest(unittest.TestCase):
+
+    def test_moved(self):
+        parser = UdiffParser(DIFF)
+        moves = parser.moved_blocks()
+
+        self.assertEqual(len(moves), 1)
+        move = moves[0]
+        self.assertEqual((move.source_file.path, move.source_start, move.source_end), ('a.py', 2, 3))
+        self.assertEqual((move.target_file.path, move.target_start, move.target_end), ('b.py', 12, 13))
+        self.assertEqual(len(move), 2)
+        self.assertEqual([line.moved for line in parser[0][0]], [None, 0, 0, None, None, None])
+        self.assertEqual([line.moved for line in parser[1][0]], [None, None, 0, 0, None, None])
+
+    def test_min_chars(self):
+        parser = UdiffParser(DIFF)
+        moves = parser.moved_blocks(min_chars=1)
+
+        # "}" has no alphanumeric character, it doesn't start a block
+        self.assertEqual([(move.source_start, move.target_start, len(move)) for move in moves], [(2, 12, 2), (5, 14, 1)])
+        self.assertEqual(parser.moved_blocks(min_chars=100), [])
+        self.assertIsNone(parser[1][0][4].moved)
+
+    def test_whitespace(self):
+        parser = UdiffParser(DIFF.replace('+    return', '+        return'))
+
+        self.assertEqual(len(parser.moved_blocks()), 0)
+        self.assertEqual(len(parser.moved_blocks(ignore_whitespace=True)), 1)
+
+    def test_object(self):
+        parser = UdiffParser(DIFF)
+        parser.moved_blocks()
+        self.assertEqual(parser[1][0].object['lines'][2]['moved'], 0)
@@ -27,11 +27,13 @@
 from __future__ import unicode_literals
 
 import codecs
+import io
 import os.path
 import unittest
 
 from udiff.parser import UdiffParser
 from udiff.parser import PY2
+from udiff.parser import whitespace_key
 from udiff.errors import UdiffParseError
 
 if not PY2:
@@ -297,6 +299,25 @@ class TestUdiffParser(unittest.TestCase):
         self.assertEqual(parser.getitem('describe.c').added_lines, 9)
         self.assertEqual(parser.getitem('describe.c').deleted_lines, 2)
 
+    def test_combined_index_and_mode(self):
+        # index <parent 1>,<parent 2>..<result>, and the same for the modes
+        diff = \
+            'diff --cc run.sh\n' + \
+            'mode 100644,100755..100755\n' + \
+            'index fabadb8,cc95eb0..4866510\n' + \
+            '--- a/run.sh\n' + \
+            '+++ b/run.sh\n' + \
+            '@@@ -1,1 -1,1 +1,1 @@@\n' + \
+            '- echo a\n' + \
+            ' -echo b\n' + \
+            '++echo c\n'
+
+        file = UdiffParser(diff)[0]
+        self.assertEqual(file.checksum_before, ['fabadb8', 'cc95eb0'])
+        self.assertEqual(file.checksum_after, '4866510')
+        self.assertEqual(file.old_mode, ['100644', '100755'])
+        self.assertEqual(file.new_mode, '100755')
+
     def test_copied_files(self):
         diff = \
             'diff --git a/index.js b/more-index.js\n' + \
@@ -771,7 +792,7 @@ Index: index.html
 
 ------------------------------------------------------------------------"""
 
-        parser = UdiffParser.from_string(diff)
+        parser = UdiffParser.from_string(diff, options={'strip_separators': True})
         self.assertEqual(len(parser), 2)
 
         self.assertEqual(parser.getitem('qwerty/index.html').added_lines, 2)
@@ -780,5 +801,330 @@ Index: index.html
         self.assertEqual(parser.getitem('audi/index.html').added_lines, 14)
         self.assertEqual(parser.getitem('audi/index.html').deleted_lines, 14)
 
+    def test_no_newline_at_end_of_file(self):
+        diff = \
+            'diff --git a/sample b/sample\n' + \
+            'index 0000001..0ddf2ba\n' + \
+            '--- a/sample\n' + \
+            '+++ b/sample\n' + \
+            '@@ -1 +1 @@\n' + \
+            '-test\n' + \
+            '\\ No newline at end of file\n' + \
+            '+test1r\n'
+
+        parser = UdiffParser.from_string(diff)
+        block = parser.getitem('sample')[0]
+        self.assertEqual(len(block), 2)
+        self.assertEqual(block[0].no_newline, True)
+        self.assertEqual(block[1].no_newline, False)
+
+    def test_separators_inside_lines_are_kept(self):
+        diff = \
+            'diff --git a/README.md b/README.md\n' + \
+            'index 0000001..0ddf2ba\n' + \
+            '--- a/README.md\n' + \
+            '+++ b/README.md\n' + \
+            '@@ -1,2 +1,3 @@\n' + \
+            ' Title\n' + \
+            '+==========\n' + \
+            ' # ---------- banner ----------\n'
+
+        parser = UdiffParser.from_string(diff)
+        block = parser.getitem('README.md')[0]
+        self.assertEqual(parser.getitem('README.md').added_lines, 1)
+        self.assertEqual(block[1].content, '+==========')
+        self.assertEqual(block[2].content, ' # ---------- banner ----------')
+
+    def test_strip_separators(self):
+        diff = \
+            '--- sample.js\n' + \
+            '+++ sample.js\n' + \
+            '@@ -1,2 +1 @@\n' + \
+            ' test\n' + \
+            '----------\n' + \
+            '------------------------------------------------------------------------\n'
+
+        parser = UdiffParser.from_string(diff)
+        self.assertEqual(parser.getitem('sample.js').deleted_lines, 2)
+        self.assertTrue(parser.getitem('sample.js')[0].malformed)
+
+        # the removed line is counted by the hunk header, only the banner after it is skipped
+        parser = UdiffParser.from_string(diff, options={'strip_separators': True})
+        self.assertEqual(parser.getitem('sample.js').deleted_lines, 1)
+        self.assertEqual(parser.getitem('sample.js')[0][1].content, '----------')
+        self.assertFalse(parser.getitem('sample.js')[0].malformed)
+
+    def test_form_feed_is_not_a_line_break(self):
+        diff = \
+            '--- sample.c\n' + \
+            '+++ sample.c\n' + \
+            '@@ -1 +1 @@\n' + \
+            '-int a;\x0c\n' + \
+            '+int b;\x0c\n'
+
+        parser = UdiffParser.from_string(diff)
+        self.assertEqual(len(parser.getitem('sample.c')[0]), 2)
+        self.assertEqual(parser.getitem('sample.c')[0][1].content, '+int b;\x0c')
+
+    def test_parse_iterable_of_lines(self):
+        diff = [
+            'diff --git a/sample b/sample\r\n',
+            'index 0000001..0ddf2ba\r\n',
+            '--- a/sample\r\n',
+            '+++ b/sample\r\n',
+            '@@ -1 +1 @@\r\n',
+            '-test\r\n',
+            '+test1r\r\n',
+        ]
+
+        parser = UdiffParser(iter(diff))
+        self.assertEqual(len(parser), 1)
+        self.assertEqual(parser.getitem('sample')[0][1].content, '+test1r')
+
+    def test_options_are_not_shared(self):
+        diff = \
+            '--- sample.js\n' + \
+            '+++ sample.js\n' + \
+            '@@ -1 +1 @@\n' + \
+            '-test\n' + \
+            '+test1r\n'
+
+        UdiffParser.from_string(diff, options={'diff_max_changes': 1})
+        parser = UdiffParser.from_string(diff)
+        self.assertEqual(parser.getitem('sample.js').is_too_big, False)
+        self.assertEqual(UdiffParser.options['diff_max_changes'], None)
+
+    def test_ignore_whitespace(self):
+        diff = \
+            '--- a/sample.py\n' + \
+            '+++ b/sample.py\n' + \
+            '@@ -1,5 +1,5 @@\n' + \
+            ' a\n' + \
+            '-if x:\n' + \
+            '-    y = 1\n' + \
+            '-z\n' + \
+            '+if x: \n' + \
+            '+        y=1\n' + \
+            '+Z\n' + \
+            ' end\n'
+
+        file = UdiffParser(diff, options={'ignore_whitespace': 'all'})[0]
+        self.assertEqual((file.added_lines, file.deleted_lines), (3, 3))
+        self.assertEqual((file.added_lines_ignoring_whitespace, file.deleted_lines_ignoring_whitespace), (1, 1))
+        self.assertEqual(len(file[0]), 8)
+
+        file = UdiffParser(diff, options={'ignore_whitespace': 'change'})[0]
+        self.assertEqual((file.added_lines_ignoring_whitespace, file.deleted_lines_ignoring_whitespace), (2, 2))
+
+        file = UdiffParser(diff, options={'ignore_whitespace': 'all', 'stat_only': True})[0]
+        self.assertEqual((file.added_lines_ignoring_whitespace, file.deleted_lines_ignoring_whitespace), (1, 1))
+
+        self.assertIsNone(UdiffParser(diff)[0].added_lines_ignoring_whitespace)
+
+    def test_ignore_whitespace_unknown_mode(self):
+        diff = \
+            '--- a/sample.py\n' + \
+            '+++ b/sample.py\n' + \
+            '@@ -1 +1 @@\n' + \
+            ' a\n'
+
+        with self.assertRaises(ValueError):
+            UdiffParser(diff, options={'ignore_whitespace': 'al'})
+        with self.assertRaises(ValueError):
+            whitespace_key('a  b', 'al')
+
+    def test_drop_whitespace_changes(self):
+        diff = \
+            '--- a/sample.py\n' + \
+            '+++ b/sample.py\n' + \
+            '@@ -1,4 +1,4 @@\n' + \
+            '-if x:\n' + \
+            '-    y = 1\n' + \
+            '-z\n' + \
+            '+if  x:\n' + \
+            '+  y = 1\n' + \
+            '+Z\n' + \
+            ' end\n'
+
+        parser = UdiffParser(diff, options={'ignore_whitespace': 'change', 'drop_whitespace_changes': True})
+        self.assertEqual([(line.content, line.source_line_no, line.target_line_no) for line in parser[0][0]], [
+            (' if  x:', 1, 1),
+            ('   y = 1', 2, 2),
+            ('-z', 3, None),
+            ('+Z', None, 3),
+            (' end', 4, 4),
+        ])
+
+    def test_whitespace_changes_keep_order(self):
+        diff = \
+            '--- a/sample.py\n' + \
+            '+++ b/sample.py\n' + \
+            '@@ -1,2 +1,2 @@\n' + \
+            '-alpha\n' + \
+            '-beta\n' + \
+            '+beta\n' + \
+            '+alpha\n'
+
+        file = UdiffParser(diff, options={'ignore_whitespace': 'all'})[0]
+        self.assertEqual((file.added_lines_ignoring_whitespace, file.deleted_lines_ignoring_whitespace), (1, 1))
+
+        parser = UdiffParser(diff, options={'ignore_whitespace': 'all', 'drop_whitespace_changes': True})
+        self.assertEqual([(line.content, line.source_line_no, line.target_line_no) for line in parser[0][0]], [
+            ('-alpha', 1, None),
+            (' beta', 2, 1),
+            ('+alpha', None, 2),
+        ])
+        self.assertEqual(parser[0].apply('alpha\nbeta\n').text, 'beta\nalpha\n')
+
+    def test_drop_whitespace_changes_after_added_lines(self):
+        diff = \
+            '--- a/sample.py\n' + \
+            '+++ b/sample.py\n' + \
+            '@@ -1,2 +1,3 @@\n' + \
+            '-y\n' + \
+            '-z\n' + \
+            '+x\n' + \
+            '+y\n' + \
+            '+z  \n'
+
+        parser = UdiffParser(diff, options={'ignore_whitespace': 'change', 'drop_whitespace_changes': True})
+        self.assertEqual([(line.content, line.source_line_no, line.target_line_no) for line in parser[0][0]], [
+            ('+x', None, 1),
+            (' y', 1, 2),
+            (' z  ', 2, 3),
+        ])
+
+        # written back, the hunk applies to a text with the whitespace of the context lines
+        out = io.StringIO()
+        parser.write(out)
+        self.assertEqual(UdiffParser(out.getvalue())[0].apply('y\nz  \n').text, 'x\ny\nz  \n')
+
+    def test_per_line_options_read_counted_hunks(self):
+        from udiff.handler import UdiffHandler
+        from udiff.scanner import UdiffScanner
+
+        class Handler(UdiffHandler):
+            def __init__(self):
+                self.events = []
+
+            def on_line(self, *args):
+                self.events.append(args)
+                if len(self.events) == 3:
+                    return self.SKIP_FILE
+
+        diff = \
+            '--- a/sample.py\n' + \
+            '+++ b/sample.py\n' + \
+            '@@ -1,4 +1,4 @@\n' + \
+            ' a\n' + \
+            '-b = 1\n' + \
+            '-c\n' + \
+            '+b  =  1\n' + \
+            '+token = 1234\n' + \
+            ' d\n' + \
+            '--- a/other.py\n' + \
+            '+++ b/other.py\n' + \
+            '@@ -1 +1 @@\n' + \
+            '-x\n' + \
+            '+y\n'
+
+        # diff_max_changes makes the parser read the hunks line by line
+        by_line = {'diff_max_changes': 100}
+        for options in ({'patch_id': True, 'patch_id_context': True}, {'scanner': UdiffScanner({'n': r'\d{4}'})},
+                        {'ignore_whitespace': 'all', 'drop_whitespace_changes': True}):
+            files = [file.object for file in UdiffParser(diff, options=options)]
+            self.assertEqual(files, [file.object for file in UdiffParser(diff, options=dict(options, **by_line))])
+
+        self.assertEqual(UdiffParser(diff, options={'scanner': UdiffScanner({'n': r'\d{4}'})})[0].scan_matches,
+                         [(3, 'n')])
+        self.assertEqual(UdiffParser.parse_events(diff, Handler()).events,
+                         UdiffParser.parse_events(diff, Handler(), options=by_line).events)
+        self.assertEqual(len(UdiffParser.parse_events(diff, Handler()).events), 5)
+
+    def test_file_headers_inside_hunk(self):
+        diff = \
+            '--- a/notes.md\n' + \
+            '+++ b/notes.md\n' + \
+            '@@ -1,3 +1,3 @@\n' + \
+            ' # Notes\n' + \
+            '--- old\n' + \
+            '+++ new\n' + \
+            ' end\n' + \
+            '--- a/other.md\n' + \
+            '+++ b/other.md\n' + \
+            '@@ -1 +1 @@\n' + \
+            '-a\n' + \
+            '+b\n'
+
+        for options in (None, {'stat_only': True}, {'patch_id': True}):
+            parser = UdiffParser(diff, options=options)
+            self.assertEqual([file.path for file in parser], ['notes.md', 'other.md'])
+            self.assertEqual((parser[0].added_lines, parser[0].deleted_lines), (1, 1))
+
+        self.assertEqual([line.content for line in UdiffParser(diff)[0][0]], [' # Notes', '--- old', '+++ new', ' end'])
+
+    def test_malformed_hunk_counts(self):
+        diff = \
+            '--- a/sample.js\n' + \
+            '+++ b/sample.js\n' + \
+            '@@ -1,3 +1,3 @@\n' + \
+            ' a\n' + \
+            '-b\n' + \
+            '+B\n' + \
+            '@@ -10 +10 @@\n' + \
+            '-x\n' + \
+            '+y\n' + \
+            '+z\n'
+
+        parser = UdiffParser(diff)
+        self.assertEqual([block.malformed for block in parser[0]], [True, True])
+        self.assertEqual([line.content for line in parser[0][1]], ['-x', '+y', '+z'])
+        self.assertEqual(parser[0][1][2].target_line_no, 11)
+        self.assertEqual((parser[0].added_lines, parser[0].deleted_lines), (3, 2))
+        self.assertNotIn('malformed', UdiffParser(diff.replace('-1,3 +1,3', '-1,2 +1,2'))[0][0].object)
+
+    def test_malformed_hunk_first_line(self):
+        # the first line of the body doesn't fit the counts
+        diff = '--- a/x\n+++ b/x\n@@ -1,1 +1,0 @@\n+++ x\n'
+
+        for options in ({}, {'ignore_whitespace': 'all'}):
+            parser = UdiffParser(diff, options=options)
+            self.assertTrue(parser[0][0].malformed)
+            self.assertEqual([line.content for line in parser[0][0]], ['+++ x'])
+            self.assertEqual((parser[0].added_lines, parser[0].deleted_lines), (1, 0))
+
+    def test_empty_context_lines(self):
+        diff = \
+            '--- a/sample.py\n' + \
+            '+++ b/sample.py\n' + \
+            '@@ -1,3 +1,3 @@\n' + \
+            ' a\n' + \
+            '\n' + \
+            '-b\n' + \
+            '+c\n'
+
+        block = UdiffParser(diff)[0][0]
+        self.assertFalse(block.malformed)
+        self.assertEqual([(line.content, line.source_line_no) for line in block], [
+            (' a', 1), (' ', 2), ('-b', 3), ('+c', None),
+        ])
+
+
+    def test_line_hash(self):
+        diff = \
+            '--- a/sample.py\n' + \
+            '+++ b/sample.py\n' + \
+            '@@ -1,2 +1,2 @@\n' + \
+            ' a\n' + \
+            '-b\n' + \
+            '+c\n'
+
+        first, second = UdiffParser(diff)[0][0], UdiffParser(diff)[0][0]
+        self.assertEqual(set(first), set(second))
+        self.assertEqual(len(set(first) | set(second)), 3)
+        self.assertEqual({first[1]: 'removed'}[second[1]], 'removed')
+        self.assertFalse(first[1] != second[1])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,126 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Tests for the patch ids."""
+
+from __future__ import unicode_literals
+
+import unittest
+
+from udiff.parser import UdiffParser
+from udiff.patchid import iter_patch_ids
+
+
+OPTIONS = {'patch_id': True}
+
+DIFF = \
+    'diff --git a/f.py b/f.py\n' + \
+    '--- a/f.py\n' + \
+    '+++ b/f.py\n' + \
+    '@@ -1,3 +1,3 @@\n' + \
+    ' a\n' + \
+    '-b = 1\n' + \
+    '+b = 2\n' + \
+    ' c\n' + \
+    'diff --git a/g.py b/g.py\n' + \
+    '--- a/g.py\n' + \
+    '+++ b/g.py\n' + \
+    '@@ -10 +10,2 @@\n' + \
+    ' x\n' + \
+    '+y\n'
+
+# the same changes, elsewhere, with other whitespace and the files in another order
+MOVED = \
+    'diff --git a/g.py b/g.py\n' + \
+    '--- a/g.py\n' + \
+    '+++ b/g.py\n' + \
+    '@@ -20 +20,2 @@\n' + \
+    ' z\n' + \
+    '+y\n' + \
+    'diff --git a/f.py b/f.py\n' + \
+    '--- a/f.py\n' + \
+    '+++ b/f.py\n' + \
+    '@@ -5,2 +5,2 @@\n' + \
+    '-b=1\n' + \
+    '+b  =  2\n' + \
+    ' d\n'
+
+
+class PatchIdTest(unittest.TestCase):
+
+    def test_stable(self):
+        parser = UdiffParser(DIFF, options=OPTIONS)
+        moved = UdiffParser(MOVED, options=OPTIONS)
+
+        self.assertEqual(len(parser.patch_id), 40)
+        self.assertEqual(parser[0].patch_id, moved[1].patch_id)
+        self.assertEqual(parser.patch_id, moved.patch_id)
+
+    def test_context(self):
+        options = dict(OPTIONS, patch_id_context=True)
+        self.assertNotEqual(UdiffParser(DIFF, options=options).patch_id, UdiffParser(MOVED, options=options).patch_id)
+
+    def test_different(self):
+        other = UdiffParser(DIFF.replace('+y', '+w'), options=OPTIONS)
+        parser = UdiffParser(DIFF, options=OPTIONS)
+
+        self.assertEqual(parser[0].patch_id, other[0].patch_id)
+        self.assertNotEqual(parser.patch_id, other.patch_id)
+        self.assertNotEqual(parser[0].patch_id, UdiffParser(DIFF.replace('f.py', 'h.py'), options=OPTIONS)[0].patch_id)
+
+    def test_disabled(self):
+        parser = UdiffParser(DIFF)
+        self.assertIsNone(parser[0].patch_id)
+        self.assertIsNone(parser.patch_id)
+
+    def test_stat_only(self):
+        parser = UdiffParser(DIFF, options={'stat_only': True, 'patch_id': True})
+
+        self.assertEqual([(file.added_lines, file.deleted_lines) for file in parser], [(1, 1), (1, 0)])
+        self.assertEqual([len(block) for file in parser for block in file], [0, 0])
+        self.assertEqual(parser.patch_id, UdiffParser(DIFF, options=OPTIONS).patch_id)
+
+    def test_git_log(self):
+        log = \
+            'commit 1111111111111111111111111111111111111111\n' + \
+            'Author: A <a@example.com>\n' + \
+            '\n' + \
+            '    First\n' + \
+            '\n' + \
+            DIFF + \
+            'commit 2222222222222222222222222222222222222222\n' + \
+            'Merge: 1111111 3333333\n' + \
+            '\n' + \
+            '    Merge without diff\n' + \
+            'commit 3333333333333333333333333333333333333333\n' + \
+            '\n' + \
+            '    Backport\n' + \
+            '\n' + \
+            MOVED
+
+        patch_ids = list(iter_patch_ids(log))
+        self.assertEqual([sha[0] for sha, patch_id in patch_ids], ['1', '2', '3'])
+        self.assertEqual(patch_ids[0][1], patch_ids[2][1])
+        self.assertIsNone(patch_ids[1][1])
+        self.assertEqual(list(iter_patch_ids(log.splitlines(True), processes=2, chunksize=1)), patch_ids)
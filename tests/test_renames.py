@@ -0,0 +1,124 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Tests for the rename detection."""
+
+from __future__ import unicode_literals
+
+import os
+import subprocess
+import sys
+import unittest
+
+from udiff.parser import UdiffParser
+
+
+def deleted(name, lines):
+    return '--- a/%s\n+++ /dev/null\n@@ -1,%d +0,0 @@\n' % (name, len(lines)) + ''.join('-%s\n' % line for line in lines)
+
+
+def added(name, lines):
+    return '--- /dev/null\n+++ b/%s\n@@ -0,0 +1,%d @@\n' % (name, len(lines)) + ''.join('+%s\n' % line for line in lines)
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LINES = ['line %d' % number for number in range(10)]
+CHANGED = LINES[:5] + ['changed'] + LINES[6:]
+
+
+class FindRenamesTest(unittest.TestCase):
+
+    def test_rename(self):
+        parser = UdiffParser(deleted('old/a.py', LINES) + added('other.py', ['x', 'y']) + added('new/a.py', CHANGED))
+        parser.find_renames()
+
+        self.assertEqual([(file.old_name, file.new_name) for file in parser],
+                         [('/dev/null', 'other.py'), ('old/a.py', 'new/a.py')])
+
+        renamed = parser[1]
+        self.assertTrue(renamed.is_rename)
+        self.assertFalse(renamed.is_copy)
+        self.assertEqual(renamed.unchanged_percentage, 90)
+        self.assertEqual((renamed.added_lines, renamed.deleted_lines), (1, 1))
+        self.assertEqual([block.header for block in renamed], ['@@ -3,7 +3,7 @@'])
+
+    def test_threshold(self):
+        half = LINES[:5] + ['other %d' % number for number in range(5)]
+        diff = deleted('a.py', LINES) + added('b.py', half)
+
+        self.assertEqual(len(UdiffParser(diff).find_renames(threshold=60)), 2)
+        self.assertEqual(UdiffParser(diff).find_renames(threshold=50)[0].unchanged_percentage, 50)
+
+    def test_best_match(self):
+        diff = deleted('src/a.py', LINES) + added('x/b.py', CHANGED) + added('y/a.py', CHANGED) + added('z/c.py', LINES)
+        parser = UdiffParser(diff).find_renames()
+
+        # the same content first, then the same base name
+        self.assertEqual([(file.old_name, file.is_rename) for file in parser],
+                         [('/dev/null', False), ('/dev/null', False), ('src/a.py', True)])
+
+    def test_copies(self):
+        diff = deleted('src/a.py', LINES) + added('y/a.py', CHANGED) + added('z/c.py', LINES)
+        parser = UdiffParser(diff).find_renames(copies=True)
+
+        self.assertEqual([(file.old_name, file.new_name, file.is_rename, file.is_copy) for file in parser],
+                         [('src/a.py', 'y/a.py', False, True), ('src/a.py', 'z/c.py', True, False)])
+        self.assertEqual(len(parser[1]), 0)
+
+    def test_diff_ruN(self):
+        # diff -ruN a b: no /dev/null, the missing files have the epoch as timestamp
+        diff = \
+            'diff -ruN a/new/a.py b/new/a.py\n' + \
+            '--- a/new/a.py\t1970-01-01 00:00:00.000000000 +0000\n' + \
+            '+++ b/new/a.py\t2021-03-02 10:14:07.120304000 +0100\n' + \
+            '@@ -0,0 +1,10 @@\n' + \
+            ''.join('+%s\n' % line for line in CHANGED) + \
+            'diff -ruN a/old/a.py b/old/a.py\n' + \
+            '--- a/old/a.py\t2021-03-01 18:40:51.561243000 +0100\n' + \
+            '+++ b/old/a.py\t1970-01-01 00:00:00.000000000 +0000\n' + \
+            '@@ -1,10 +0,0 @@\n' + \
+            ''.join('-%s\n' % line for line in LINES)
+
+        parser = UdiffParser(diff).find_renames()
+        self.assertEqual([(file.old_name, file.new_name, file.is_rename) for file in parser],
+                         [('old/a.py', 'new/a.py', True)])
+        self.assertEqual((parser[0].added_lines, parser[0].deleted_lines), (1, 1))
+
+        # a file changed at its start isn't one sided
+        self.assertEqual(len(UdiffParser(diff.replace('@@ -0,0 +1,10 @@', '@@ -1,0 +1,10 @@')).find_renames()), 2)
+
+    def test_sketches_are_the_same_in_every_process(self):
+        script = 'from udiff.renames import _sketch; print(_sketch(["line %d" % n for n in range(20)], 8, 2))'
+        sketches = set()
+        for seed in ('1', '2'):
+            env = dict(os.environ, PYTHONHASHSEED=seed)
+            sketches.add(subprocess.check_output([sys.executable, '-c', script], cwd=ROOT, env=env))
+
+        self.assertEqual(len(sketches), 1)
+
+    def test_write(self):
+        parser = UdiffParser(deleted('a.py', LINES) + added('b.py', CHANGED)).find_renames()
+        self.assertEqual(str(parser[0][0].header), '@@ -3,7 +3,7 @@')
+        self.assertEqual(parser[0][0][3].content, '-line 5')
@@ -0,0 +1,135 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+"""Tests for the trigram index."""
+
+from __future__ import unicode_literals
+
+import os
+import re
+import shutil
+import tempfile
+import unittest
+
+from udiff.parser import UdiffParser
+from udiff.search import UdiffSearchHit, UdiffTrigramIndex, decode_postings, encode_postings, trigrams
+
+
+FIRST = \
+    '--- a/app.py\n' + \
+    '+++ b/app.py\n' + \
+    '@@ -1,3 +1,3 @@\n' + \
+    ' import os\n' + \
+    '-result = eval(data)\n' + \
+    '+result = json.loads(data)\n' + \
+    ' print(result)\n'
+
+SECOND = \
+    '--- a/tool.py\n' + \
+    '+++ b/tool.py\n' + \
+    '@@ -10,2 +10,3 @@\n' + \
+    ' def run(command):\n' + \
+    '+    os.system(command)\n' + \
+    '+    return EVAL(command)\n'
+
+
+class TrigramsTest(unittest.TestCase):
+
+    def test_trigrams(self):
+        self.assertEqual(trigrams('Eval('), set(['eva', 'val', 'al(']))
+        self.assertEqual(trigrams('ab'), set())
+
+    def test_postings(self):
+        line_ids = [0, 3, 4, 1000, 70000]
+        self.assertEqual(decode_postings(encode_postings(line_ids)), line_ids)
+
+
+class UdiffTrigramIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        super(UdiffTrigramIndexTest, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'index')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        super(UdiffTrigramIndexTest, self).tearDown()
+
+    def test_search(self):
+        with UdiffTrigramIndex(self.path) as index:
+            index.add('first', UdiffParser(FIRST))
+            index.add('second', UdiffParser(SECOND))
+
+        index = UdiffTrigramIndex(self.path)
+        self.assertEqual(len(index), 4)
+        self.assertEqual(list(index.search(r'eval\(')), [
+            UdiffSearchHit('first', 'app.py', '-', 2, 'result = eval(data)'),
+        ])
+        self.assertEqual([hit.line_no for hit in index.search(re.compile(r'eval\(', re.IGNORECASE))], [2, 12])
+        self.assertEqual([hit.diff_id for hit in index.search(r'os\.\w+\(')], ['second'])
+        self.assertEqual([hit.text for hit in index.search(r'result', line_types='+')], ['result = json.loads(data)'])
+        self.assertEqual([hit.line_no for hit in index.search(r'command', diff_ids=['first'])], [])
+        self.assertEqual(list(index.search(r'missing')), [])
+        index.close()
+
+    def test_short_pattern(self):
+        with UdiffTrigramIndex(self.path) as index:
+            index.add(1, UdiffParser(FIRST))
+
+            self.assertEqual(list(index.search(r'\w+\(')), [])
+
+        with UdiffTrigramIndex(self.path) as index:
+            self.assertEqual([hit.line_type for hit in index.search(r'\w+\(')], ['-', '+'])
+
+    def test_repeat_counts(self):
+        token = 'QUJD' * 30
+        with UdiffTrigramIndex(self.path) as index:
+            index.add(1, UdiffParser('--- a/.env\n+++ b/.env\n@@ -0,0 +1 @@\n+token=%s\n' % token))
+
+        with UdiffTrigramIndex(self.path) as index:
+            # no '100' or '120' in the line, the counts aren't looked up as text
+            self.assertEqual([hit.text for hit in index.search(r'\w{100}')], ['token=' + token])
+            self.assertEqual([hit.line_no for hit in index.search(r'token=[A-Za-z0-9+/]{120}')], [1])
+
+    def test_append(self):
+        with UdiffTrigramIndex(self.path) as index:
+            index.add('first', UdiffParser(FIRST))
+
+        with UdiffTrigramIndex(self.path, buffer_lines=1) as index:
+            index.add('second', UdiffParser(SECOND))
+            self.assertEqual(len(index.segments), 2)
+            self.assertEqual([hit.diff_id for hit in index.search('data')], ['first', 'first'])
+            self.assertEqual([hit.diff_id for hit in index.search('command')], ['second', 'second'])
+
+    def test_unfinished_segment(self):
+        with UdiffTrigramIndex(self.path) as index:
+            index.add('first', UdiffParser(FIRST))
+
+        # a writer stopped before writing the terms table
+        with open(os.path.join(self.path, 'segment-000002.lines'), 'wb') as f:
+            f.write(b'["second"\n')
+
+        with UdiffTrigramIndex(self.path) as index:
+            self.assertEqual([hit.diff_id for hit in index.search('data')], ['first', 'first'])
@@ -0,0 +1,253 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Tests for the diff series operations."""
+
+from __future__ import unicode_literals
+
+import unittest
+
+import io
+
+from udiff.parser import UdiffParser
+from udiff.series import compose, interdiff
+
+
+def write(parser):
+    out = io.StringIO()
+    parser.write(out)
+    return out.getvalue()
+
+
+FIRST = \
+    'diff --git a/old.py b/new.py\n' + \
+    'similarity index 90%\n' + \
+    'rename from old.py\n' + \
+    'rename to new.py\n' + \
+    '--- a/old.py\n' + \
+    '+++ b/new.py\n' + \
+    '@@ -1,3 +1,4 @@\n' + \
+    ' one\n' + \
+    '+one and a half\n' + \
+    ' two\n' + \
+    ' three\n' + \
+    'diff --git a/other.py b/other.py\n' + \
+    '--- a/other.py\n' + \
+    '+++ b/other.py\n' + \
+    '@@ -1 +1 @@\n' + \
+    '-a\n' + \
+    '+b\n'
+
+SECOND = \
+    'diff --git a/new.py b/new.py\n' + \
+    '--- a/new.py\n' + \
+    '+++ b/new.py\n' + \
+    '@@ -3,3 +3,3 @@\n' + \
+    ' two\n' + \
+    '-three\n' + \
+    '+THREE\n' + \
+    ' four\n' + \
+    'diff --git a/other.py b/other.py\n' + \
+    '--- a/other.py\n' + \
+    '+++ b/other.py\n' + \
+    '@@ -1 +1 @@\n' + \
+    '-b\n' + \
+    '+a\n' + \
+    'diff --git a/added.py b/added.py\n' + \
+    'new file mode 100644\n' + \
+    '--- /dev/null\n' + \
+    '+++ b/added.py\n' + \
+    '@@ -0,0 +1 @@\n' + \
+    '+new\n'
+
+
+class ComposeTest(unittest.TestCase):
+
+    def test_compose(self):
+        result = compose(UdiffParser(FIRST), UdiffParser(SECOND))
+
+        # other.py is back to its original content
+        self.assertEqual([file.path for file in result], ['new.py', 'added.py'])
+        self.assertEqual(write(result), (
+            'diff --git a/old.py b/new.py\n'
+            'rename from old.py\n'
+            'rename to new.py\n'
+            '--- a/old.py\n'
+            '+++ b/new.py\n'
+            '@@ -1,4 +1,5 @@\n'
+            ' one\n'
+            '+one and a half\n'
+            ' two\n'
+            '-three\n'
+            '+THREE\n'
+            ' four\n'
+            'diff --git a/added.py b/added.py\n'
+            'new file mode 100644\n'
+            '--- /dev/null\n'
+            '+++ b/added.py\n'
+            '@@ -0,0 +1 @@\n'
+            '+new\n'
+        ))
+
+        renamed = result[0]
+        self.assertTrue(renamed.is_rename)
+        self.assertEqual((renamed.added_lines, renamed.deleted_lines), (2, 1))
+        self.assertEqual([(line.source_line_no, line.target_line_no) for line in renamed[0]],
+                         [(1, 1), (None, 2), (2, 3), (3, None), (None, 4), (4, 5)])
+
+    def test_renumbering(self):
+        first = UdiffParser(
+            '--- a/f\n'
+            '+++ b/f\n'
+            '@@ -10,0 +11,2 @@\n'
+            '+x\n'
+            '+y\n'
+        )
+        second = UdiffParser(
+            '--- a/f\n'
+            '+++ b/f\n'
+            '@@ -50 +50 @@\n'
+            '-old\n'
+            '+new\n'
+        )
+        result = compose(first, second, context=0)
+        self.assertEqual([block.header for block in result[0]], ['@@ -10,0 +11,2 @@', '@@ -48 +50 @@'])
+
+    def test_created_then_deleted(self):
+        first = UdiffParser('--- /dev/null\n+++ b/f\n@@ -0,0 +1 @@\n+x\n')
+        second = UdiffParser('--- a/f\n+++ /dev/null\n@@ -1 +0,0 @@\n-x\n')
+        self.assertEqual(len(compose(first, second)), 0)
+
+    def test_mismatch(self):
+        second = UdiffParser('--- a/other.py\n+++ b/other.py\n@@ -1 +1 @@\n-c\n+d\n')
+        self.assertRaises(ValueError, compose, UdiffParser(FIRST), second)
+
+    def test_single(self):
+        parser = UdiffParser(FIRST)
+        self.assertIs(compose(parser), parser)
+        self.assertEqual(len(compose()), 0)
+
+
+REVISION_1 = \
+    'diff --git a/f.py b/f.py\n' + \
+    '--- a/f.py\n' + \
+    '+++ b/f.py\n' + \
+    '@@ -1,3 +1,3 @@\n' + \
+    ' a\n' + \
+    '-b\n' + \
+    '+B\n' + \
+    ' c\n' + \
+    '@@ -20,3 +20,3 @@\n' + \
+    ' x\n' + \
+    '-y\n' + \
+    '+Y\n' + \
+    ' z\n' + \
+    'diff --git a/same.py b/same.py\n' + \
+    '--- a/same.py\n' + \
+    '+++ b/same.py\n' + \
+    '@@ -1 +1 @@\n' + \
+    '-1\n' + \
+    '+2\n' + \
+    'diff --git a/dropped.py b/dropped.py\n' + \
+    '--- a/dropped.py\n' + \
+    '+++ b/dropped.py\n' + \
+    '@@ -5 +5,2 @@\n' + \
+    ' p\n' + \
+    '+q\n'
+
+REVISION_2 = \
+    'diff --git a/f.py b/f.py\n' + \
+    '--- a/f.py\n' + \
+    '+++ b/f.py\n' + \
+    '@@ -1,3 +1,3 @@\n' + \
+    ' a\n' + \
+    '-b\n' + \
+    '+B\n' + \
+    ' c\n' + \
+    '@@ -20,3 +20,3 @@\n' + \
+    ' x\n' + \
+    '-y\n' + \
+    '+Y2\n' + \
+    ' z\n' + \
+    'diff --git a/same.py b/same.py\n' + \
+    '--- a/same.py\n' + \
+    '+++ b/same.py\n' + \
+    '@@ -1 +1 @@\n' + \
+    '-1\n' + \
+    '+2\n'
+
+
+class InterdiffTest(unittest.TestCase):
+
+    def test_interdiff(self):
+        result = interdiff(UdiffParser(REVISION_1), UdiffParser(REVISION_2))
+
+        self.assertEqual(write(result), (
+            'diff --git a/f.py b/f.py\n'
+            '--- a/f.py\n'
+            '+++ b/f.py\n'
+            '@@ -20,3 +20,3 @@\n'
+            ' x\n'
+            '-Y\n'
+            '+Y2\n'
+            ' z\n'
+            'diff --git a/dropped.py b/dropped.py\n'
+            '--- a/dropped.py\n'
+            '+++ b/dropped.py\n'
+            '@@ -5,2 +5 @@\n'
+            ' p\n'
+            '-q\n'
+        ))
+
+    def test_identical(self):
+        self.assertEqual(len(interdiff(UdiffParser(REVISION_1), UdiffParser(REVISION_1))), 0)
+
+    def test_added_file_and_rename(self):
+        old = UdiffParser('diff --git a/f.py b/f.py\n--- a/f.py\n+++ b/f.py\n@@ -1 +1 @@\n-a\n+b\n')
+        new = UdiffParser(
+            'diff --git a/f.py b/g.py\n'
+            'rename from f.py\n'
+            'rename to g.py\n'
+            '--- a/f.py\n'
+            '+++ b/g.py\n'
+            '@@ -1 +1 @@\n'
+            '-a\n'
+            '+b\n'
+            'diff --git a/h.py b/h.py\n'
+            'new file mode 100644\n'
+            '--- /dev/null\n'
+            '+++ b/h.py\n'
+            '@@ -0,0 +1 @@\n'
+            '+h\n'
+        )
+        result = interdiff(old, new)
+
+        self.assertEqual([(file.old_name, file.new_name) for file in result], [('f.py', 'g.py'), ('/dev/null', 'h.py')])
+        self.assertTrue(result[0].is_rename)
+        self.assertEqual(len(result[0]), 0)
+        self.assertIs(result[1], new[1])
+
+    def test_different_bases(self):
+        new = UdiffParser('--- a/same.py\n+++ b/same.py\n@@ -1 +1 @@\n-0\n+2\n')
+        self.assertRaises(ValueError, interdiff, UdiffParser(REVISION_1), new)
@@ -0,0 +1,116 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+"""Tests for loading diffs into SQLite."""
+
+from __future__ import unicode_literals
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from udiff.commits import UdiffCommit
+from udiff.parser import UdiffParser
+from udiff.sqlite import load_diffs
+
+
+DIFF = \
+    'diff --git a/src/app.py b/src/app.py\n' + \
+    '--- a/src/app.py\n' + \
+    '+++ b/src/app.py\n' + \
+    '@@ -1,2 +1,2 @@ def main():\n' + \
+    ' a\n' + \
+    '-b\n' + \
+    '+c\n' + \
+    '@@ -10 +10,2 @@\n' + \
+    ' x\n' + \
+    '+y\n' + \
+    'diff --git a/docs.md b/docs.md\n' + \
+    'new file mode 100644\n' + \
+    '--- /dev/null\n' + \
+    '+++ b/docs.md\n' + \
+    '@@ -0,0 +1 @@\n' + \
+    '+# Docs\n'
+
+
+class LoadDiffsTest(unittest.TestCase):
+
+    def setUp(self):
+        super(LoadDiffsTest, self).setUp()
+        self.conn = sqlite3.connect(':memory:')
+
+    def tearDown(self):
+        self.conn.close()
+        super(LoadDiffsTest, self).tearDown()
+
+    def rows(self, query):
+        return self.conn.execute(query).fetchall()
+
+    def test_to_sqlite(self):
+        self.assertEqual(UdiffParser(DIFF).to_sqlite(self.conn, diff_id='first'), 1)
+        self.assertEqual(UdiffParser(DIFF).to_sqlite(self.conn, diff_id='second', lines=True), 2)
+
+        self.assertEqual(self.rows('SELECT id, diff_id, files, added_lines, deleted_lines FROM diffs'), [
+            (1, 'first', 2, 3, 1), (2, 'second', 2, 3, 1),
+        ])
+        self.assertEqual(self.rows('SELECT diff, position, path, status, added_lines FROM files WHERE diff = 2'), [
+            (2, 0, 'src/app.py', 'modified', 2), (2, 1, 'docs.md', 'added', 1),
+        ])
+        self.assertEqual(self.rows('SELECT file, header, old_start_line, new_start_line, added, removed FROM hunks'
+                                   ' WHERE file = 3'), [
+            (3, '@@ -1,2 +1,2 @@ def main():', 1, 1, 1, 1), (3, '@@ -10 +10,2 @@', 10, 10, 1, 0),
+        ])
+        self.assertEqual(self.rows('SELECT COUNT(*) FROM lines'), [(6, )])
+        self.assertEqual(self.rows('SELECT line_type, source_line_no, target_line_no, content FROM lines'
+                                   ' WHERE hunk = 5 ORDER BY position'), [(' ', 10, 10, ' x'), ('+', None, 11, '+y')])
+
+    def test_commits(self):
+        commits = [
+            (UdiffCommit(sha='a' * 40, author='Ann <ann@example.com>', date='Mon Oct 19 02:42:27 2026 +0000',
+                         subject='Change'), UdiffParser(DIFF, options={'stat_only': True})),
+            (UdiffCommit(sha='b' * 40, author='Bob <bob@example.com>', date='not a date'), UdiffParser('')),
+        ]
+
+        self.assertEqual(load_diffs(self.conn, iter(commits), batch_size=1), 2)
+        self.assertEqual(self.rows("SELECT author, strftime('%Y-%m', timestamp, 'unixepoch'), subject FROM diffs"), [
+            ('Ann <ann@example.com>', '2026-10', 'Change'), ('Bob <bob@example.com>', None, ''),
+        ])
+        self.assertEqual(self.rows('SELECT COUNT(*) FROM files'), [(2, )])
+        self.assertEqual(self.rows('SELECT COUNT(*) FROM lines'), [(0, )])
+
+        indexes = [row[0] for row in self.rows("SELECT name FROM sqlite_master WHERE type = 'index'")]
+        self.assertIn('files_path', indexes)
+
+    def test_wal(self):
+        directory = tempfile.mkdtemp()
+        try:
+            conn = sqlite3.connect(os.path.join(directory, 'diffs.db'))
+            UdiffParser(DIFF).to_sqlite(conn, diff_id='first')
+            self.assertEqual(conn.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+            conn.close()
+        finally:
+            shutil.rmtree(directory)
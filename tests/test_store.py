@@ -0,0 +1,175 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+"""Tests for the diff corpus store."""
+
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from udiff.parser import UdiffParser
+from udiff.scanner import UdiffScanner
+from udiff.store import INDEX_NAME, UdiffCorpusStore
+
+
+def change(path, old, new):
+    return \
+        'diff --git a/%s b/%s\n' % (path, path) + \
+        '--- a/%s\n' % path + \
+        '+++ b/%s\n' % path + \
+        '@@ -1 +1 @@\n' + \
+        '-%s\n' % old + \
+        '+%s\n' % new
+
+
+RENAME = \
+    'diff --git a/old.py b/new.py\n' + \
+    'similarity index 90%\n' + \
+    'rename from old.py\n' + \
+    'rename to new.py\n' + \
+    '--- a/old.py\n' + \
+    '+++ b/new.py\n' + \
+    '@@ -1 +1 @@\n' + \
+    '-x = 1\n' + \
+    '+x = 2\n'
+
+
+class UdiffCorpusStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        super(UdiffCorpusStoreTest, self).setUp()
+        self.directory = os.path.join(tempfile.mkdtemp(), 'store')
+
+    def tearDown(self):
+        shutil.rmtree(os.path.dirname(self.directory))
+        super(UdiffCorpusStoreTest, self).tearDown()
+
+    def segments(self):
+        return sorted(name for name in os.listdir(self.directory) if name.startswith('segment-'))
+
+    def history(self, store, path):
+        return [(diff_id, file[0][1].content) for diff_id, file in store.history(path)]
+
+    def test_history(self):
+        with UdiffCorpusStore(self.directory) as store:
+            store.add('a', UdiffParser(change('app.py', 'v0', 'v1') + change('lib.py', 'l0', 'l1')))
+            store.add('b', UdiffParser(change('app.py', 'v1', 'v2')))
+            store.add('c', UdiffParser(RENAME))
+
+            self.assertEqual(self.history(store, 'app.py'), [('a', '+v1'), ('b', '+v2')])
+
+        with UdiffCorpusStore(self.directory) as store:
+            self.assertEqual(len(store), 3)
+            self.assertIn('b', store)
+            self.assertEqual(self.history(store, 'app.py'), [('a', '+v1'), ('b', '+v2')])
+            self.assertEqual(store.paths_like(), ['app.py', 'lib.py', 'new.py'])
+            self.assertEqual([file.path for file in store.diff('a')], ['app.py', 'lib.py'])
+            renamed = store.diff('c')[0]
+            self.assertTrue(renamed.is_rename)
+            self.assertEqual((renamed.old_name, renamed.new_name), ('old.py', 'new.py'))
+            self.assertRaises(ValueError, store.add, 'a', UdiffParser(RENAME))
+
+    def test_crash(self):
+        store = UdiffCorpusStore(self.directory)
+        store.add('a', UdiffParser(change('app.py', 'v0', 'v1')))
+        store.flush()
+        # a crash while the next diff and its index entry were written
+        store.add('b', UdiffParser(change('app.py', 'v1', 'v2')))
+        store.active.write(b'UDR1\x10\x00')
+        store.active.flush()
+        store.index.write(b'["+", "b", [["app.py"')
+        store.index.flush()
+
+        store = UdiffCorpusStore(self.directory)
+        self.assertEqual(self.history(store, 'app.py'), [('a', '+v1')])
+        store.add('c', UdiffParser(change('app.py', 'v1', 'v3')))
+        store.close()
+
+        with UdiffCorpusStore(self.directory) as store:
+            self.assertEqual(self.history(store, 'app.py'), [('a', '+v1'), ('c', '+v3')])
+
+    def test_compact(self):
+        with UdiffCorpusStore(self.directory, segment_size=1) as store:
+            for number in range(5):
+                store.add(number, UdiffParser(change('app.py', 'v%d' % number, 'v%d' % (number + 1))))
+
+            store.remove(1)
+            store.remove(3)
+            self.assertEqual(len(self.segments()), 5)
+
+            store.compact(background=True).join()
+            self.assertEqual([diff_id for diff_id, file in store.history('app.py')], [0, 2, 4])
+            store.add(5, UdiffParser(change('app.py', 'v5', 'v6')))
+
+        with UdiffCorpusStore(self.directory) as store:
+            self.assertEqual(self.history(store, 'app.py'), [(0, '+v1'), (2, '+v3'), (4, '+v5'), (5, '+v6')])
+            self.assertFalse(os.path.exists(os.path.join(self.directory, INDEX_NAME + '.tmp')))
+            self.assertEqual(len(self.segments()), 4)
+
+    def test_round_trip(self):
+        separator = '--- a/notes.md\n+++ b/notes.md\n@@ -1,2 +1 @@\n title\n------------\n'
+        binary = 'Binary files a/logo.png and b/logo.png differ\n'
+        too_big = change('big.txt', 'x' * 100, 'y')
+
+        with UdiffCorpusStore(self.directory) as store:
+            store.add('a', UdiffParser(separator, options={'strip_separators': False}))
+            store.add('b', UdiffParser(binary))
+            store.add('c', UdiffParser(too_big, options={'diff_max_line_length': 50}))
+
+        with UdiffCorpusStore(self.directory) as store:
+            file = store.diff('a')[0]
+            self.assertEqual((file.added_lines, file.deleted_lines), (0, 1))
+            self.assertEqual(file[0][1].content, '------------')
+            self.assertFalse(file[0].malformed)
+
+            file = store.diff('b')[0]
+            self.assertTrue(file.is_binary)
+            self.assertEqual(file.path, 'logo.png')
+
+            file = store.diff('c')[0]
+            self.assertTrue(file.is_too_big)
+            self.assertEqual(file.path, 'big.txt')
+
+    def test_stat_only_round_trip(self):
+        diff = change('app.py', 'x = 1', 'x  =  2') + change('lib.py', 'import os', 'import sys')
+        options = {'stat_only': True, 'patch_id': True, 'ignore_whitespace': 'all', 'scanner': UdiffScanner({'sys': 'sys'})}
+        parser = UdiffParser(diff, options=options)
+
+        with UdiffCorpusStore(self.directory) as store:
+            store.add('a', parser)
+            store.add('b', UdiffParser(diff))
+
+        with UdiffCorpusStore(self.directory) as store:
+            files = store.diff('a')
+            self.assertEqual([file.object for file in files], [file.object for file in parser])
+            self.assertEqual(files[1].scan_matches, [(1, 'sys')])
+            self.assertEqual((files[0].added_lines, files[0].deleted_lines), (1, 1))
+
+            file = store.diff('b')[0]
+            self.assertIsNone(file.patch_id)
+            self.assertEqual(file[0][1].content, '+x  =  2')
@@ -0,0 +1,185 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+"""Tests for reading compressed diffs."""
+
+from __future__ import unicode_literals
+
+import bz2
+import gc
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+import zlib
+
+from udiff.parser import UdiffParser
+from udiff.streams import decompress, iter_background, iter_text
+
+try:
+    import lzma
+except ImportError:
+    lzma = None
+
+
+DIFF = ''.join(
+    'diff --git a/file%d.py b/file%d.py\n' % (number, number) +
+    '--- a/file%d.py\n' % number +
+    '+++ b/file%d.py\n' % number +
+    '@@ -1,2 +1,2 @@\n' +
+    ' x = 1\n' +
+    '-y = %d\n' % number +
+    '+y = %d\n' % (number + 1)
+    for number in range(200)
+)
+
+
+class IterBackgroundTest(unittest.TestCase):
+
+    def test_items(self):
+        self.assertEqual(list(iter_background(range(100), max_items=4)), list(range(100)))
+
+    def test_error(self):
+        def failing():
+            yield 1
+            raise IOError('truncated')
+
+        items = iter_background(failing())
+        self.assertEqual(next(items), 1)
+        self.assertRaises(IOError, next, items)
+
+    def test_close(self):
+        items = iter_background(iter(int, 1), max_items=2)
+        self.assertEqual(next(items), 0)
+        items.close()
+
+
+class CompressedFilenameTest(unittest.TestCase):
+
+    def setUp(self):
+        super(CompressedFilenameTest, self).setUp()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        super(CompressedFilenameTest, self).tearDown()
+
+    def write(self, name, open_function):
+        path = os.path.join(self.directory, name)
+        with open_function(path, 'wb') as f:
+            f.write(DIFF.encode('utf-8'))
+
+        return path
+
+    def check(self, path):
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+
+            for background in (False, True):
+                parser = UdiffParser.from_filename(path, background=background)
+                self.assertEqual(len(parser), 200)
+                self.assertEqual(parser[199][0][2].content, '+y = 200')
+
+                paths = [file.path for file in UdiffParser.iter_filename(path, background=background)]
+                self.assertEqual(paths[:2], ['file0.py', 'file1.py'])
+
+            gc.collect()
+
+        # the compressed file under the decompressing reader is closed too
+        self.assertEqual([str(warning.message) for warning in caught if 'unclosed' in str(warning.message)], [])
+
+    def test_plain(self):
+        self.check(self.write('change.patch', open))
+
+    def test_gzip(self):
+        self.check(self.write('change.patch.gz', gzip.open))
+
+    def test_bz2(self):
+        self.check(self.write('change.patch.bz2', bz2.BZ2File))
+
+    @unittest.skipIf(lzma is None, 'no lzma module')
+    def test_xz(self):
+        self.check(self.write('change.patch.xz', lzma.open))
+
+
+def gzip_compress(data):
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+class Pipe(object):
+    """A pipe returning a few bytes at a time."""
+
+    def __init__(self, data, size=1):
+        self.data = data
+        self.size = size
+        self.closed = False
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = len(self.data)
+
+        data, self.data = self.data[:min(size, self.size)], self.data[min(size, self.size):]
+        return data
+
+    def close(self):
+        self.closed = True
+
+
+class DecompressTest(unittest.TestCase):
+
+    def check(self, data, expected=DIFF):
+        for size in (1, 5, 4096):
+            pipe = Pipe(data, size)
+            stream = decompress(pipe)
+            self.assertEqual(''.join(iter_text(stream)), expected)
+
+            stream.close()
+            self.assertTrue(pipe.closed)
+
+    def test_plain(self):
+        self.check(DIFF.encode('utf-8'))
+        self.check(b'', '')
+        self.check(b'BZ', 'BZ')
+
+    def test_gzip(self):
+        self.check(gzip_compress(DIFF.encode('utf-8')))
+
+    def test_gzip_members(self):
+        data = DIFF.encode('utf-8')
+        self.check(gzip_compress(data[:1000]) + gzip_compress(data[1000:]))
+
+    def test_bz2(self):
+        self.check(bz2.compress(DIFF.encode('utf-8')))
+
+    def test_bz2_streams(self):
+        data = DIFF.encode('utf-8')
+        self.check(bz2.compress(data[:1000]) + bz2.compress(data[1000:]))
+
+    @unittest.skipIf(lzma is None, 'no lzma module')
+    def test_xz(self):
+        self.check(lzma.compress(DIFF.encode('utf-8')))
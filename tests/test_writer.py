@@ -0,0 +1,170 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Tests for writing parsed diffs back as text."""
+
+from __future__ import unicode_literals
+
+import io
+import unittest
+
+from udiff.parser import UdiffParser
+
+
+DIFF = \
+    'diff --git a/src/core/init.js b/src/core/init.js\n' + \
+    'index e49196a..50f310c 100644\n' + \
+    '--- a/src/core/init.js\n' + \
+    '+++ b/src/core/init.js\n' + \
+    '@@ -101,4 +101,4 @@ var rootjQuery,\n' + \
+    '     } else if ( jQuery.isFunction( selector ) ) {\n' + \
+    '-      return typeof rootjQuery.ready !== "undefined" ?\n' + \
+    '-        rootjQuery.ready( selector ) :\n' + \
+    '+      return rootjQuery.ready !== undefined ?\n' + \
+    '+        rootjQuery.ready( selector ) : null\n' + \
+    '         // Execute immediately if ready is not present\n' + \
+    '@@ -120 +120,2 @@\n' + \
+    ' }\n' + \
+    '+return jQuery;\n' + \
+    '\\ No newline at end of file\n' + \
+    'diff --git a/src/test-bar.js b/src/test-baz.js\n' + \
+    'similarity index 98%\n' + \
+    'rename from src/test-bar.js\n' + \
+    'rename to src/test-baz.js\n' + \
+    'index e01513b..f14a870 100644\n' + \
+    '--- a/src/test-bar.js\n' + \
+    '+++ b/src/test-baz.js\n' + \
+    '@@ -1,2 +1,2 @@\n' + \
+    ' function foo() {\n' + \
+    '-var bar = "Whoops!";\n' + \
+    '+var baz = "Whoops!";\n' + \
+    'diff --git a/src/event.js b/src/event.js\n' + \
+    'deleted file mode 100644\n' + \
+    'index 7336f4d..0000000\n' + \
+    '--- a/src/event.js\n' + \
+    '+++ /dev/null\n' + \
+    '@@ -1,2 +0,0 @@\n' + \
+    '-var a;\n' + \
+    '-var b;\n'
+
+INVERTED_DIFF = \
+    'diff --git a/src/core/init.js b/src/core/init.js\n' + \
+    'index 50f310c..e49196a 100644\n' + \
+    '--- a/src/core/init.js\n' + \
+    '+++ b/src/core/init.js\n' + \
+    '@@ -101,4 +101,4 @@ var rootjQuery,\n' + \
+    '     } else if ( jQuery.isFunction( selector ) ) {\n' + \
+    '-      return rootjQuery.ready !== undefined ?\n' + \
+    '-        rootjQuery.ready( selector ) : null\n' + \
+    '+      return typeof rootjQuery.ready !== "undefined" ?\n' + \
+    '+        rootjQuery.ready( selector ) :\n' + \
+    '         // Execute immediately if ready is not present\n' + \
+    '@@ -120,2 +120 @@\n' + \
+    ' }\n' + \
+    '-return jQuery;\n' + \
+    '\\ No newline at end of file\n' + \
+    'diff --git a/src/test-baz.js b/src/test-bar.js\n' + \
+    'similarity index 98%\n' + \
+    'rename from src/test-baz.js\n' + \
+    'rename to src/test-bar.js\n' + \
+    'index f14a870..e01513b 100644\n' + \
+    '--- a/src/test-baz.js\n' + \
+    '+++ b/src/test-bar.js\n' + \
+    '@@ -1,2 +1,2 @@\n' + \
+    ' function foo() {\n' + \
+    '-var baz = "Whoops!";\n' + \
+    '+var bar = "Whoops!";\n' + \
+    'diff --git a/src/event.js b/src/event.js\n' + \
+    'new file mode 100644\n' + \
+    'index 0000000..7336f4d\n' + \
+    '--- /dev/null\n' + \
+    '+++ b/src/event.js\n' + \
+    '@@ -0,0 +1,2 @@\n' + \
+    '+var a;\n' + \
+    '+var b;\n'
+
+
+def to_text(item, *args):
+    out = io.StringIO()
+    item.write(out, *args)
+    return out.getvalue()
+
+
+class TestWriter(unittest.TestCase):
+    """Tests for the unified diff writer."""
+
+    def test_round_trip(self):
+        self.assertEqual(to_text(UdiffParser.from_string(DIFF)), DIFF)
+
+    def test_counts_are_recomputed(self):
+        parser = UdiffParser.from_string(DIFF)
+        del parser[0][0][1]
+
+        text = to_text(parser[0])
+        self.assertIn('@@ -101,3 +101,4 @@ var rootjQuery,\n', text)
+
+    def test_write_block(self):
+        block = UdiffParser.from_string(DIFF).getitem('test-baz.js')[0]
+
+        self.assertEqual(to_text(block),
+                         '@@ -1,2 +1,2 @@\n function foo() {\n-var bar = "Whoops!";\n+var baz = "Whoops!";\n')
+
+    def test_invert(self):
+        parser = UdiffParser.from_string(DIFF).invert()
+
+        self.assertEqual(to_text(parser), INVERTED_DIFF)
+        self.assertEqual(parser.getitem('event.js').is_new, True)
+        self.assertEqual(parser.getitem('event.js').added_lines, 2)
+        self.assertEqual(parser.getitem('init.js')[0][1].source_line_no, 102)
+
+    def test_invert_twice(self):
+        self.assertEqual(to_text(UdiffParser.from_string(DIFF).invert().invert()), DIFF)
+
+    def test_invert_and_apply(self):
+        source = 'a\nb\nc\n'
+        diff = \
+            '--- a/sample\n' + \
+            '+++ b/sample\n' + \
+            '@@ -1,3 +1,3 @@\n' + \
+            ' a\n' + \
+            '-b\n' + \
+            '+B\n' + \
+            ' c\n'
+
+        file = UdiffParser.from_string(diff)[0]
+        target = file.apply(source).text
+        self.assertEqual(file.invert().apply(target).text, source)
+
+    def test_streaming_filter(self):
+        out = io.StringIO()
+        for file in UdiffParser.iter_files(io.StringIO(DIFF)):
+            if file.path.startswith('src/test'):
+                file.invert().write(out)
+
+        self.assertEqual(out.getvalue(), INVERTED_DIFF[INVERTED_DIFF.index('diff --git a/src/test-baz.js'):
+                                                       INVERTED_DIFF.index('diff --git a/src/event.js')])
+
+
+if __name__ == '__main__':
+    unittest.main()
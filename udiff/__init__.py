@@ -35,5 +35,6 @@ from udiff.parser import (
     UdiffParser,
     UdiffParseError,
 )
+from udiff.series import compose, interdiff
 
 VERSION = __version__.__version__
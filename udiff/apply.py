@@ -0,0 +1,342 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Applying parsed diffs to file contents and directory trees."""
+
+from __future__ import unicode_literals
+
+import io
+import os
+from bisect import bisect_left
+
+from udiff.constants import DEFAULT_ENCODING
+from udiff.files import is_added_file, is_deleted_file
+from udiff.parser import DEV_NULL
+from udiff.writer import is_hunk
+
+
+class UdiffApplyResult(object):
+    """The outcome of applying a file diff."""
+
+    def __init__(self, file, text=None, rejects=None, offsets=None, error=None):
+        super(UdiffApplyResult, self).__init__()
+        self.file = file
+        self.text = text
+        self.rejects = rejects or []
+        self.offsets = offsets or []
+        self.error = error
+
+    def __repr__(self):
+        return '<UdiffApplyResult: %s, %s>' % (
+            self.file.path,
+            self.error or ('%d rejected' % len(self.rejects) if self.rejects else 'applied')
+        )
+
+    @property
+    def ok(self):
+        return not self.error and not self.rejects
+
+
+class _LineIndex(object):
+    """Positions of every line of a text, to find where a hunk moved without scanning the text."""
+
+    def __init__(self, lines):
+        self.lines = lines
+        self._positions = None
+
+    def positions(self, line):
+        if self._positions is None:
+            self._positions = {}
+            for position, value in enumerate(self.lines):
+                self._positions.setdefault(value, []).append(position)
+
+        return self._positions.get(line, [])
+
+    def matches(self, old_lines, position):
+        end = position + len(old_lines)
+        return 0 <= position and end <= len(self.lines) and self.lines[position:end] == old_lines
+
+    def find(self, old_lines, expected, lower_bound, max_offset=None):
+        """Return the position of `old_lines` closest to `expected`, not before `lower_bound`."""
+        if self.matches(old_lines, expected) and expected >= lower_bound:
+            return expected
+
+        candidates = self.positions(old_lines[0])
+        start = bisect_left(candidates, max(lower_bound, expected - max_offset if max_offset is not None else 0))
+        after = bisect_left(candidates, expected)
+        before = after - 1
+        after = max(after, start)
+
+        # walk the candidates outwards from the expected position, nearest first
+        while before >= start or after < len(candidates):
+            before_distance = expected - candidates[before] if before >= start else None
+            after_distance = candidates[after] - expected if after < len(candidates) else None
+
+            if after_distance is None or (before_distance is not None and before_distance <= after_distance):
+                position, distance = candidates[before], before_distance
+                before -= 1
+            else:
+                position, distance = candidates[after], after_distance
+                after += 1
+
+            if max_offset is not None and distance > max_offset:
+                break
+
+            if self.matches(old_lines, position):
+                return position
+
+        return None
+
+
+def _split_text(text):
+    eol = '\r\n' if '\r\n' in text[:4096] else '\n'
+    lines = text.split(eol) if text else []
+    ends_with_newline = bool(lines) and lines[-1] == ''
+    if ends_with_newline:
+        lines.pop()
+
+    return lines, eol, ends_with_newline
+
+
+def _hunk_sides(block):
+    old_lines = []
+    new_lines = []
+    for line in block:
+        content = line.content[1:]
+        if not line.is_added:
+            old_lines.append(content)
+        if not line.is_removed:
+            new_lines.append(content)
+
+    return old_lines, new_lines
+
+
+def _leading_context(block):
+    count = 0
+    for line in block:
+        if not line.is_context:
+            break
+        count += 1
+
+    return count
+
+
+def _new_side_ends_with_newline(block):
+    for line in reversed(block):
+        if not line.is_removed:
+            return not line.no_newline
+
+    return True
+
+
+def apply_file(file, source_text, fuzz=0, max_offset=None):
+    """Apply the hunks of a UdiffFile to `source_text`, see UdiffFile.apply."""
+    if file.is_binary:
+        return UdiffApplyResult(file, error='binary diffs can not be applied')
+
+    if file.is_too_big:
+        return UdiffApplyResult(file, error='the diff was too big to be parsed')
+
+    if file.is_combined:
+        return UdiffApplyResult(file, error='combined diffs can not be applied')
+
+    lines, eol, ends_with_newline = _split_text(source_text or '')
+    index = _LineIndex(lines)
+
+    result = []
+    rejects = []
+    offsets = []
+    copied = 0  # lines of the source already copied to the result
+    delta = 0  # how far the previous hunks were found from their expected position
+
+    for block in file:
+        if not is_hunk(block):
+            continue
+
+        old_lines, new_lines = _hunk_sides(block)
+        leading = _leading_context(block)
+        trailing = len(old_lines) and _leading_context(reversed(block))
+
+        position = None
+        for level in range(fuzz + 1):
+            # fuzz ignores up to `level` context lines at both ends of the hunk
+            head = min(level, leading)
+            tail = min(level, trailing)
+            old = old_lines[head:len(old_lines) - tail]
+            new = new_lines[head:len(new_lines) - tail]
+
+            if not old_lines:
+                # pure insertion, after line `old_start_line`
+                expected = (block.old_start_line or 0) + delta
+                if copied <= expected <= len(lines):
+                    position = expected
+                break
+
+            if not old:
+                break
+
+            expected = max((block.old_start_line or 1) - 1, 0) + head + delta
+            position = index.find(old, expected, copied, max_offset)
+            if position is not None:
+                break
+
+        if position is None:
+            rejects.append(block)
+            continue
+
+        if old_lines:
+            delta = position - head - max((block.old_start_line or 1) - 1, 0)
+            offsets.append(delta)
+
+        result.extend(lines[copied:position])
+        result.extend(new)
+        copied = position + len(old)
+
+        if copied == len(lines):
+            ends_with_newline = _new_side_ends_with_newline(block)
+
+    result.extend(lines[copied:])
+
+    text = eol.join(result)
+    if result and ends_with_newline:
+        text += eol
+
+    return UdiffApplyResult(file, text=text, rejects=rejects, offsets=offsets)
+
+
+def _resolve(directory, name):
+    path = os.path.normpath(os.path.join(directory, name))
+    if os.path.relpath(path, directory).split(os.sep)[0] == os.pardir:
+        raise ValueError('%s is outside of %s' % (name, directory))
+
+    return path
+
+
+def _apply_files(files, directory, fuzz, max_offset, encoding):
+    results = []
+
+    for file in files:
+        try:
+            source = _resolve(directory, file.old_name if (file.is_rename or file.is_copy) else file.path)
+            target = _resolve(directory, file.path)
+        except ValueError as e:
+            results.append(UdiffApplyResult(file, error='%s' % e))
+            continue
+
+        source_text = ''
+        if not is_added_file(file):
+            try:
+                with io.open(source, 'r', encoding=encoding, newline='') as f:
+                    source_text = f.read()
+            except (IOError, OSError) as e:
+                results.append(UdiffApplyResult(file, error='%s' % e))
+                continue
+
+        result = apply_file(file, source_text, fuzz, max_offset)
+        results.append(result)
+
+        # a file is only written when every hunk applied
+        if not result.ok:
+            continue
+
+        if is_deleted_file(file):
+            os.remove(source)
+            continue
+
+        parent = os.path.dirname(target)
+        if parent and not os.path.isdir(parent):
+            try:
+                os.makedirs(parent)
+            except OSError:
+                # created by another worker meanwhile
+                if not os.path.isdir(parent):
+                    raise
+
+        with io.open(target, 'w', encoding=encoding, newline='') as f:
+            f.write(result.text)
+
+        if file.is_rename and source != target:
+            os.remove(source)
+
+    return results
+
+
+def _groups(files):
+    # the diffs touching the same paths, in order: a diff touching the paths of two groups joins them
+    parent = {}
+
+    def find(name):
+        root = parent.setdefault(name, name)
+        while parent[root] != root:
+            root = parent[root]
+
+        while name != root:
+            parent[name], name = root, parent[name]
+
+        return root
+
+    names = [list(set(name for name in (file.old_name, file.new_name, file.path) if name and name != DEV_NULL))
+             for file in files]
+    for file_names in names:
+        for name in file_names[1:]:
+            parent[find(name)] = find(file_names[0])
+
+    groups = {}
+    ordered = []
+    for file, file_names in zip(files, names):
+        key = find(file_names[0]) if file_names else id(file)
+        if key not in groups:
+            groups[key] = []
+            ordered.append(groups[key])
+
+        groups[key].append(file)
+
+    return ordered
+
+
+def apply_to_directory(files, directory, fuzz=0, max_offset=None, workers=None, encoding=DEFAULT_ENCODING):
+    """Apply UdiffFiles to the tree under `directory`, see UdiffParser.apply_to."""
+    groups = _groups(files)
+
+    def apply_group(group):
+        return _apply_files(group, directory, fuzz, max_offset, encoding)
+
+    if workers == 1 or len(groups) < 2:
+        grouped_results = [apply_group(group) for group in groups]
+    else:
+        from multiprocessing.pool import ThreadPool
+
+        pool = ThreadPool(workers)
+        try:
+            grouped_results = pool.map(apply_group, groups)
+        finally:
+            pool.close()
+            pool.join()
+
+    results = {}
+    for group, group_results in zip(groups, grouped_results):
+        for file, result in zip(group, group_results):
+            results[id(file)] = result
+
+    return [results[id(file)] for file in files]
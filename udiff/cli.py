@@ -0,0 +1,182 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Command line interface, run as `udiff` or `python -m udiff`."""
+
+from __future__ import unicode_literals
+
+import argparse
+import errno
+import fnmatch
+import json
+import os
+import sys
+from itertools import chain
+
+from udiff import __version__
+from udiff.constants import DEFAULT_ENCODING
+from udiff.errors import UdiffParseError
+from udiff.parser import PY2, UdiffParser
+from udiff.streams import iter_diff_text
+from udiff.writer import write_file
+
+
+def build_argument_parser():
+    parser = argparse.ArgumentParser(
+        prog='udiff',
+        description='Read a unified diff from a file (possibly gzip, bz2 or xz compressed) '
+                    'or stdin and print it file by file.'
+    )
+    parser.add_argument('path', nargs='?', default='-', help='diff file to read, stdin when omitted or -')
+
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument('--numstat', dest='output', action='store_const', const='numstat',
+                        help='print "added<TAB>deleted<TAB>path" per file (default)')
+    output.add_argument('--ndjson', dest='output', action='store_const', const='ndjson',
+                        help='print one JSON object per file')
+    output.add_argument('--diff', dest='output', action='store_const', const='diff',
+                        help='print the selected files as a unified diff')
+
+    parser.add_argument('--include', action='append', default=[], metavar='GLOB',
+                        help='only keep files whose old or new path matches, can be repeated')
+    parser.add_argument('--exclude', action='append', default=[], metavar='GLOB',
+                        help='skip files whose old or new path matches, can be repeated')
+    parser.add_argument('--max-changes', type=int, metavar='N',
+                        help='number of changed lines after which a file diff is deemed as too big')
+    parser.add_argument('--encoding', default=DEFAULT_ENCODING, help='encoding of the diff, default %(default)s')
+    parser.add_argument('--errors', default='replace',
+                        help='how to handle encoding errors, default %(default)s')
+    parser.add_argument('--version', action='version', version='%(prog)s ' + __version__.__version__)
+
+    return parser
+
+
+def matches_any(file, patterns):
+    for name in (file.old_name, file.new_name):
+        if name and any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns):
+            return True
+
+    return False
+
+
+def select_files(files, include=None, exclude=None):
+    """Filter an iterable of UdiffFile on their paths."""
+    for file in files:
+        if include and not matches_any(file, include):
+            continue
+
+        if exclude and matches_any(file, exclude):
+            continue
+
+        yield file
+
+
+def iter_input_files(chunks, options=None):
+    """Yield the UdiffFile instances of a diff given by chunks, or of every commit of a `git log -p` output."""
+    from udiff.commits import RE_LOG_COMMIT, iter_log_commits
+
+    # the first line tells a log from a diff, a pipe may give it in several chunks
+    head = []
+    for chunk in chunks:
+        head.append(chunk)
+        if '\n' in chunk:
+            break
+
+    content = chain(head, chunks)
+    if not RE_LOG_COMMIT.match(''.join(head).split('\n', 1)[0].rstrip('\r')):
+        for file in UdiffParser.iter_files(content, options=options):
+            yield file
+
+        return
+
+    # the commit messages aren't part of the diffs, every diff is parsed as `iter_log` does
+    options = dict(options or {})
+    options.setdefault('strip_separators', False)
+    for commit, diff in iter_log_commits(content):
+        for file in UdiffParser.iter_files(diff, options=options):
+            yield file
+
+
+def format_numstat(file):
+    path = file.path
+    if (file.is_rename or file.is_copy) and file.old_name != file.new_name:
+        path = '%s => %s' % (file.old_name, file.new_name)
+
+    if file.is_binary:
+        return '-\t-\t%s\n' % path
+
+    return '%d\t%d\t%s\n' % (file.added_lines, file.deleted_lines, path)
+
+
+def format_ndjson(file):
+    return json.dumps(file.object, sort_keys=True) + '\n'
+
+
+def _text_stdout(encoding):
+    if PY2:
+        import codecs
+        return codecs.getwriter(encoding)(sys.stdout)
+
+    return sys.stdout
+
+
+def main(argv=None, stdout=None):
+    args = build_argument_parser().parse_args(argv)
+    out = stdout or _text_stdout(args.encoding)
+
+    options = {}
+    if args.max_changes is not None:
+        options['diff_max_changes'] = args.max_changes
+    if args.output not in ('ndjson', 'diff'):
+        # numstat only needs the counts
+        options['stat_only'] = True
+
+    try:
+        files = iter_input_files(iter_diff_text(args.path, args.encoding, args.errors), options=options)
+
+        for file in select_files(files, args.include, args.exclude):
+            if args.output == 'ndjson':
+                out.write(format_ndjson(file))
+            elif args.output == 'diff':
+                write_file(file, out)
+            else:
+                out.write(format_numstat(file))
+
+            # print every file as soon as it is parsed, for pipelines
+            out.flush()
+
+    except (IOError, OSError) as e:
+        if e.errno != errno.EPIPE:
+            sys.stderr.write('udiff: %s\n' % e)
+            return 1
+
+        # the reader went away (`udiff ... | head`), don't fail again when python flushes stdout on exit
+        if stdout is None:
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+
+    except UdiffParseError as e:
+        sys.stderr.write('udiff: %s\n' % e)
+        return 1
+
+    return 0
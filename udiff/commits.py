@@ -0,0 +1,315 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+"""Commits: the metadata and the diff of every commit of a `git log -p` output or of `git format-patch` emails.
+
+Only the diff of every commit goes to the parser, so commit messages holding
+`diff` lines, `---` separators or rows of dashes don't end up in the files.
+"""
+
+from __future__ import unicode_literals
+
+from collections import deque
+
+from udiff.constants import LazyRegex
+from udiff.parser import UdiffParser
+
+
+# "From <sha> Mon Sep 17 00:00:00 2001" from format-patch, "From <sender> <asctime>" in any mbox
+RE_MBOX_FROM = LazyRegex(r'^From \S+ +\w{3} \w{3} +\d+ \d+:\d+:\d+ \d{4}')
+RE_SHA = LazyRegex(r'^[0-9a-f]{40}$')
+# "commit <sha> [<parent sha>...] [(<refs>)]", parents with --parents, refs with --decorate
+RE_LOG_COMMIT = LazyRegex(r'^commit ([0-9a-f]{7,64})((?: [0-9a-f]{7,64})*)(?: \(.*\))?$')
+LOG_MESSAGE_INDENT = '    '
+RE_SUBJECT_PREFIX = LazyRegex(r'^(\s*\[[^\]]*\])+\s*')
+# the end of a commit message in an email, as `git am` sees it
+MESSAGE_END_PREFIXES = ('diff -', 'Index: ')
+MESSAGE_SEPARATOR = '---'
+SIGNATURE_SEPARATOR = '-- '
+
+
+class UdiffCommit(object):
+    """The metadata of a commit: sha, parents, author, date, subject and message (the subject included)."""
+
+    sha = None
+    parents = None
+    author = None
+    date = None
+    subject = ''
+    message = ''
+
+    def __init__(self, sha=None, author=None, date=None, subject='', message='', parents=None):
+        super(UdiffCommit, self).__init__()
+        self.sha = sha
+        self.parents = parents
+        self.author = author
+        self.date = date
+        self.subject = subject
+        self.message = message
+
+    def __repr__(self):
+        return str('<UdiffCommit: %s %s>') % (self.sha, self.subject.encode('ascii', 'replace').decode('ascii'))
+
+    @property
+    def object(self):
+        return self.__dict__
+
+
+def _header_value(value):
+    # RFC 2047 encoded words, "=?UTF-8?q?J=C3=B6rg?=" for instance
+    if '=?' not in value:
+        return value
+
+    from email.header import decode_header, make_header
+    return '%s' % make_header(decode_header(value))
+
+
+def _body_lines(lines, encoding):
+    # the body of an email sent quoted-printable or base64, `git send-email` does it for non ascii patches
+    if encoding not in ('quoted-printable', 'base64'):
+        return lines
+
+    import base64
+    import quopri
+
+    data = '\n'.join(lines).encode('latin-1', 'replace')
+    data = quopri.decodestring(data) if encoding == 'quoted-printable' else base64.b64decode(data)
+    return data.decode('utf-8', 'replace').splitlines()
+
+
+def parse_mail(text, options=None):
+    """Return the (UdiffCommit, UdiffParser) of one email of a patch series."""
+    lines = text.split('\n')
+    index = 0
+    sha = None
+    if RE_MBOX_FROM.match(lines[0]):
+        sha = lines[0].split()[1]
+        sha = sha if RE_SHA.match(sha) else None
+        index = 1
+
+    headers = {}
+    name = None
+    for index in range(index, len(lines) + 1):
+        line = lines[index] if index < len(lines) else ''
+        if not line:
+            break
+
+        if line[0] in ' \t' and name is not None:
+            # a folded header
+            headers[name] += ' ' + line.strip()
+        elif ':' in line:
+            name, value = line.split(':', 1)
+            name = name.strip().lower()
+            headers[name] = value.strip()
+
+    lines = _body_lines(lines[index + 1:], headers.get('content-transfer-encoding', '').lower())
+
+    end = 0
+    for end, line in enumerate(lines):
+        if line.rstrip() == MESSAGE_SEPARATOR or line.startswith(MESSAGE_END_PREFIXES):
+            break
+    else:
+        end = len(lines)
+
+    message, lines = lines[:end], lines[end:]
+    # the diff stat the parser skips, the diff, then the signature `git format-patch` adds
+    if SIGNATURE_SEPARATOR in lines:
+        del lines[len(lines) - lines[::-1].index(SIGNATURE_SEPARATOR) - 1:]
+
+    subject = RE_SUBJECT_PREFIX.sub('', _header_value(headers.get('subject', '')))
+    body = '\n'.join(message).strip('\n')
+    commit = UdiffCommit(
+        sha=sha,
+        author=_header_value(headers.get('from', '')) or None,
+        date=headers.get('date'),
+        subject=subject,
+        message=subject + '\n\n' + body if body else subject,
+    )
+
+    options = dict(options or {})
+    options.setdefault('strip_separators', False)
+    return commit, UdiffParser('\n'.join(lines) + '\n', options=options)
+
+
+def _parse_mails(arguments):
+    texts, options = arguments
+    return [parse_mail(text, options) for text in texts]
+
+
+def _parse_diffs(arguments):
+    commits, options = arguments
+    options = dict(options or {})
+    options.setdefault('strip_separators', False)
+    return [(commit, UdiffParser(diff, options=options)) for commit, diff in commits]
+
+
+def iter_mails(content, encoding=None):
+    """Yield the text of every email of an mbox, `content` is a string or an iterable of string chunks."""
+    lines = []
+    for line in UdiffParser([], options={'encoding': encoding})._scan(content):
+        if RE_MBOX_FROM.match(line) and lines:
+            yield '\n'.join(lines)
+            lines = []
+
+        if lines or RE_MBOX_FROM.match(line):
+            lines.append(line)
+
+    if lines:
+        yield '\n'.join(lines)
+
+
+def pool_map(function, batches, processes):
+    """Yield the results of `function` for every item of `batches` computed by a pool of processes, in order.
+
+    Only a few batches per process are sent ahead, so memory stays bounded
+    whatever the number of batches.
+    """
+    from multiprocessing import Pool
+
+    pool = Pool(processes)
+    try:
+        pending = deque()
+        for batch in batches:
+            pending.append(pool.apply_async(function, (batch, )))
+            if len(pending) >= 2 * processes:
+                yield pending.popleft().get()
+
+        while pending:
+            yield pending.popleft().get()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def _batches(items, size, options):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch, options
+            batch = []
+
+    if batch:
+        yield batch, options
+
+
+def iter_series(content, options=None, processes=None, encoding=None, chunksize=16):
+    """Yield the (UdiffCommit, UdiffParser) of every email of a `git format-patch` series or mbox, in order.
+
+    `content` is a string or an iterable of string chunks (an open mbox
+    file). When `processes` is given the emails are parsed by a pool of
+    processes, `chunksize` emails at a time. Multipart emails aren't
+    supported, patches have to be inline.
+    """
+    mails = iter_mails(content, encoding)
+
+    if not processes:
+        for text in mails:
+            yield parse_mail(text, options)
+
+        return
+
+    for results in pool_map(_parse_mails, _batches(mails, chunksize, options), processes):
+        for result in results:
+            yield result
+
+
+def _log_commit(lines):
+    # the header lines, then the message indented by 4 spaces, then the diff
+    match = RE_LOG_COMMIT.match(lines[0])
+    commit = UdiffCommit(sha=match.group(1), parents=match.group(2).split() or None)
+
+    index = 1
+    for index in range(1, len(lines) + 1):
+        line = lines[index] if index < len(lines) else ''
+        if not line:
+            break
+
+        name, _, value = line.partition(':')
+        if name == 'Author':
+            commit.author = value.strip()
+        elif name in ('Date', 'AuthorDate'):
+            commit.date = value.strip()
+        elif name == 'Merge' and commit.parents is None:
+            # abbreviated shas, without --parents
+            commit.parents = value.split()
+
+    # the message ends at the first line that isn't indented, the diff, a diff stat or notes
+    message = []
+    for index in range(index + 1, len(lines) + 1):
+        line = lines[index] if index < len(lines) else None
+        if line is None or line and not line.startswith(LOG_MESSAGE_INDENT):
+            break
+
+        message.append(line[len(LOG_MESSAGE_INDENT):])
+
+    commit.message = '\n'.join(message).strip('\n')
+    commit.subject = commit.message.split('\n', 1)[0]
+    return commit, '\n'.join(lines[index:]) + '\n'
+
+
+def iter_log_commits(content, encoding=None):
+    """Yield the (UdiffCommit, diff text) of every commit of a `git log -p` or `git show` output.
+
+    `content` is a string or an iterable of string chunks (the stdout of
+    git), only one commit is in memory at a time.
+    """
+    lines = []
+    for line in UdiffParser([], options={'encoding': encoding})._scan(content):
+        if line.startswith('commit ') and RE_LOG_COMMIT.match(line):
+            if lines:
+                yield _log_commit(lines)
+
+            lines = [line]
+
+        elif lines:
+            lines.append(line)
+
+    if lines:
+        yield _log_commit(lines)
+
+
+def iter_log(content, options=None, processes=None, encoding=None, chunksize=16):
+    """Yield the (UdiffCommit, UdiffParser) of every commit of a `git log -p` output, in order.
+
+    Merges shown with `--cc` or `-c` give combined diffs, merges without a
+    diff an empty parser. When `processes` is given the diffs are parsed by a
+    pool of processes, `chunksize` commits at a time, memory stays bounded.
+    The parsed diffs are pickled back to this process, `stat_only` keeps
+    that cheap when the lines aren't needed.
+    """
+    commits = iter_log_commits(content, encoding)
+    options = dict(options or {})
+    options.setdefault('strip_separators', False)
+
+    if not processes:
+        for commit, diff in commits:
+            yield commit, UdiffParser(diff, options=options)
+
+        return
+
+    for results in pool_map(_parse_diffs, _batches(commits, chunksize, options), processes):
+        for result in results:
+            yield result
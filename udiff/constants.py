@@ -26,7 +26,40 @@
 
 from __future__ import unicode_literals
 
-import re
+
+class LazyRegex(object):
+    """A regex compiled on first use.
+
+    Compiling every pattern at import time is a large share of the runtime of
+    short lived tools, so `re` is imported and the pattern compiled only when
+    one of its methods is needed for the first time.
+    """
+
+    def __init__(self, pattern, flags=0):
+        self.pattern = pattern
+        self.flags = flags
+
+    def __repr__(self):
+        return '<LazyRegex: %r>' % self.pattern
+
+    def __getattr__(self, name):
+        if name in ('pattern', 'flags') or name.startswith('__'):
+            raise AttributeError(name)
+
+        compiled = self.compile()
+        return getattr(compiled, name)
+
+    def compile(self):
+        """Compile the pattern and bind its methods directly on the instance."""
+        compiled = self.__dict__.get('_compiled')
+        if compiled is None:
+            import re
+
+            compiled = self.__dict__['_compiled'] = re.compile(self.pattern, self.flags)
+            for name in ('match', 'search', 'finditer', 'findall', 'sub', 'split'):
+                self.__dict__[name] = getattr(compiled, name)
+
+        return compiled
 
 
 BASE_DIFF_FILENAME_PREFIXES = ['a/', 'b/', 'i/', 'w/', 'c/', 'o/']
@@ -60,33 +93,40 @@ OLD_FILE_NAME_HEADER = '--- '
 NEW_FILE_NAME_HEADER = '+++ '
 HUNK_HEADER_PREFIX = '@@'
 
-RE_GIT_DIFF_START = re.compile(r'^diff --git "?(.+)"? "?(.+)"?')
+RE_GIT_DIFF_START = LazyRegex(r'^diff --git "?(.+)"? "?(.+)"?')
+
+RE_LINE = LazyRegex(r'([^\r\n]*)(\r\n?|\n|$)')
+RE_SEPARATOR_LINE = LazyRegex(r'^(?:-{10,}|={10,})$')
 
-RE_HUNK_HEADER_V1 = re.compile(r'^@@ -(\d+)(?:,\d+)? \+(\d+)(?:,\d+)? @@.*')
-RE_HUNK_HEADER_V2 = re.compile(r'@@@ -(\d+)(?:,\d+)? -(\d+)(?:,\d+)? \+(\d+)(?:,\d+)? @@@.*')
+RE_FILENAME = LazyRegex(r'^"?(.+?)"?$')
+RE_FILENAME_TIMESTAMP = LazyRegex(r'\s+\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(?:\.\d+)? [+-]\d{4}.*$')
 
-RE_OLD_MODE = re.compile(r'^old mode (\d{6})')
-RE_NEW_MODE = re.compile(r'^new mode (\d{6})')
-RE_DELETED_FILE_MODE = re.compile(r'^deleted file mode (\d{6})')
-RE_NEW_FILE_MODE = re.compile(r'^new file mode (\d{6})')
+# the line counts are optional, 1 when missing
+RE_HUNK_HEADER_V1 = LazyRegex(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@.*')
+RE_HUNK_HEADER_V2 = LazyRegex(r'@@@ -(\d+)(?:,(\d+))? -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@@.*')
 
-RE_COPY_FROM = re.compile(r'^copy from "?(.+)"?')
-RE_COPY_TO = re.compile(r'^copy to "?(.+)"?')
+RE_OLD_MODE = LazyRegex(r'^old mode (\d{6})')
+RE_NEW_MODE = LazyRegex(r'^new mode (\d{6})')
+RE_DELETED_FILE_MODE = LazyRegex(r'^deleted file mode (\d{6})')
+RE_NEW_FILE_MODE = LazyRegex(r'^new file mode (\d{6})')
 
-RE_RENAME_FROM = re.compile(r'^rename from "?(.+)"?')
-RE_RENAME_TO = re.compile(r'^rename to "?(.+)"?')
+RE_COPY_FROM = LazyRegex(r'^copy from "?(.+)"?')
+RE_COPY_TO = LazyRegex(r'^copy to "?(.+)"?')
 
-RE_SIMILARITY_INDEX = re.compile(r'^similarity index (\d+)%')
-RE_DISSIMILARITY_INDEX = re.compile(r'^dissimilarity index (\d+)%')
-RE_INDEX = re.compile(r'^index ([\da-z]+)\.\.([\da-z]+)\s*(\d{6})?')
+RE_RENAME_FROM = LazyRegex(r'^rename from "?(.+)"?')
+RE_RENAME_TO = LazyRegex(r'^rename to "?(.+)"?')
 
-RE_BINARY_FILES = re.compile(r'^Binary files (.*) and (.*) differ')
-RE_BINARY_DIFF = re.compile(r'^GIT binary patch')
+RE_SIMILARITY_INDEX = LazyRegex(r'^similarity index (\d+)%')
+RE_DISSIMILARITY_INDEX = LazyRegex(r'^dissimilarity index (\d+)%')
+RE_INDEX = LazyRegex(r'^index ([\da-z]+)\.\.([\da-z]+)\s*(\d{6})?')
 
-RE_COMBINED_INDEX = re.compile(r'^index ([\da-z]+),([\da-z]+)\.\.([\da-z]+)')
-RE_COMBINED_MODE = re.compile(r'^mode (\d{6}),(\d{6})\.\.(\d{6})')
-RE_COMBINED_NEW_FILE = re.compile(r'^new file mode (\d{6})')
-RE_COMBINED_DELETED_FILE = re.compile(r'^deleted file mode (\d{6}),(\d{6})')
+RE_BINARY_FILES = LazyRegex(r'^Binary files (.*) and (.*) differ')
+RE_BINARY_DIFF = LazyRegex(r'^GIT binary patch')
+
+RE_COMBINED_INDEX = LazyRegex(r'^index ([\da-z]+),([\da-z]+)\.\.([\da-z]+)')
+RE_COMBINED_MODE = LazyRegex(r'^mode (\d{6}),(\d{6})\.\.(\d{6})')
+RE_COMBINED_NEW_FILE = LazyRegex(r'^new file mode (\d{6})')
+RE_COMBINED_DELETED_FILE = LazyRegex(r'^deleted file mode (\d{6}),(\d{6})')
 
 DEFAULT_ENCODING = 'UTF-8'
 
@@ -97,19 +137,9 @@ LINE_TYPE_EMPTY = ''
 LINE_TYPE_NO_NEWLINE = '\\'
 LINE_VALUE_NO_NEWLINE = ' No newline at end of file'
 
+# returned by a UdiffHandler method to ignore the rest of the file diff
+SKIP_FILE = 'skip_file'
 
-def d(*vars):
-    """ Debug object """
-
-    import pprint
-    import types
-    import sys
-
-    pp = pprint.PrettyPrinter(indent=2)
-    for var in vars:
-        if type(var) == types.MethodType:
-            var = dir(var)
-
-        pp.pprint(var)
-
-    sys.exit(1)
+# ignore_whitespace option values, as `diff -w` and `diff -b`
+IGNORE_WHITESPACE_ALL = 'all'
+IGNORE_WHITESPACE_CHANGE = 'change'
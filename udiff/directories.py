@@ -0,0 +1,159 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Diff statistics rolled up by directory."""
+
+from __future__ import unicode_literals
+
+from udiff.parser import DEV_NULL, make_str
+
+
+STATUS_ADDED = 'added'
+STATUS_DELETED = 'deleted'
+STATUS_MODIFIED = 'modified'
+STATUS_RENAMED = 'renamed'
+STATUS_COPIED = 'copied'
+
+
+def file_status(file):
+    """Return the STATUS_* of a file diff."""
+    if file.is_new or file.old_name == DEV_NULL:
+        return STATUS_ADDED
+    if file.is_deleted or file.new_name == DEV_NULL:
+        return STATUS_DELETED
+    if file.is_rename:
+        return STATUS_RENAMED
+    if file.is_copy:
+        return STATUS_COPIED
+
+    return STATUS_MODIFIED
+
+
+def _split(path):
+    return [part for part in (path or '').split('/') if part]
+
+
+class UdiffDirectory(object):
+    """The statistics of the files changed under a directory, subdirectories included."""
+
+    def __init__(self):
+        super(UdiffDirectory, self).__init__()
+        self.children = {}
+        self.added_lines = 0
+        self.deleted_lines = 0
+        self.files = 0
+        self.statuses = {}
+
+    def __repr__(self):
+        return make_str('<UdiffDirectory: %d files, added %d, deleted %d>') % (
+            self.files, self.added_lines, self.deleted_lines)
+
+    @property
+    def object(self):
+        return {
+            'added_lines': self.added_lines,
+            'deleted_lines': self.deleted_lines,
+            'files': self.files,
+            'statuses': dict(self.statuses),
+        }
+
+    def _count(self, added_lines, deleted_lines, files, statuses):
+        self.added_lines += added_lines
+        self.deleted_lines += deleted_lines
+        self.files += files
+        for status, count in statuses.items():
+            self.statuses[status] = self.statuses.get(status, 0) + count
+
+
+class UdiffDirectoryTree(object):
+    """Path prefix tree of diff statistics, files are counted in every directory above them.
+
+    Only directories are kept, the memory depends on the number of distinct
+    directories, not on the number of files or diffs added.
+    """
+
+    def __init__(self, files=()):
+        super(UdiffDirectoryTree, self).__init__()
+        self.root = UdiffDirectory()
+        self.add(files)
+
+    def __repr__(self):
+        return make_str('<UdiffDirectoryTree: %r>') % self.root
+
+    def add(self, files):
+        """Count file diffs, a UdiffParser or UdiffParser.iter_files() for instance."""
+        for file in files:
+            self.add_file(file)
+
+        return self
+
+    def add_file(self, file):
+        """Count a file diff in the directories of its path, the new one unless it is deleted."""
+        statuses = {file_status(file): 1}
+        node = self.root
+        node._count(file.added_lines, file.deleted_lines, 1, statuses)
+
+        for name in _split(file.path)[:-1]:
+            node = node.children.setdefault(name, UdiffDirectory())
+            node._count(file.added_lines, file.deleted_lines, 1, statuses)
+
+    def merge(self, other):
+        """Add the counts of another tree, built from other diffs (by another process for instance)."""
+        pending = [(self.root, other.root)]
+        while pending:
+            node, other_node = pending.pop()
+            node._count(other_node.added_lines, other_node.deleted_lines, other_node.files, other_node.statuses)
+
+            for name, other_child in other_node.children.items():
+                pending.append((node.children.setdefault(name, UdiffDirectory()), other_child))
+
+        return self
+
+    def get(self, prefix=''):
+        """Return the UdiffDirectory of a directory path ('' for all files), None when no file changed under it."""
+        node = self.root
+        for name in _split(prefix):
+            node = node.children.get(name)
+            if node is None:
+                return None
+
+        return node
+
+    def walk(self, prefix='', depth=None):
+        """Yield the (path, UdiffDirectory) of `prefix` and of its subdirectories, down to `depth` levels below it.
+
+        Directories are sorted by path, parents before their subdirectories.
+        """
+        node = self.get(prefix)
+        if node is None:
+            return
+
+        pending = [('/'.join(_split(prefix)), node, 0)]
+        while pending:
+            path, node, level = pending.pop()
+            yield path, node
+
+            if depth is None or level < depth:
+                for name in sorted(node.children, reverse=True):
+                    pending.append((path + '/' + name if path else name, node.children[name], level + 1))
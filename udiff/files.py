@@ -0,0 +1,141 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Helpers on the UdiffFile instances built from other diffs, shared by series, renames and apply."""
+
+from __future__ import unicode_literals
+
+from udiff.constants import LINE_TYPE_ADDED, LINE_TYPE_CONTEXT, LINE_TYPE_REMOVED
+from udiff.parser import DEV_NULL, UdiffBlock, UdiffFile, UdiffLine
+from udiff.writer import hunk_header
+
+
+def path_before(file):
+    """Return the path of the file before the change, None for an added file."""
+    if file.is_new or not file.old_name or file.old_name == DEV_NULL:
+        return None
+
+    return file.old_name
+
+
+def path_after(file):
+    """Return the path of the file after the change, None for a deleted file."""
+    if file.is_deleted or not file.new_name or file.new_name == DEV_NULL:
+        return None
+
+    return file.new_name
+
+
+def _one_sided(file, line_type):
+    # without git headers (`diff -ruN` has no /dev/null name either), a missing file
+    # only has @@ -0,0 +1,N @@ or @@ -1,N +0,0 @@ hunks
+    if file.checksum_before is not None:
+        return False
+
+    start = 'old_start_line' if line_type == LINE_TYPE_ADDED else 'new_start_line'
+    return bool(file) and all(
+        getattr(block, start) == 0 and block and all(line.line_type == line_type for line in block) for block in file
+    )
+
+
+def is_added_file(file):
+    """Whether the diff creates the file: git headers, a /dev/null old name or hunks only adding lines to nothing."""
+    if path_after(file) is None:
+        return False
+
+    return path_before(file) is None or _one_sided(file, LINE_TYPE_ADDED)
+
+
+def is_deleted_file(file):
+    """Whether the diff deletes the file: git headers, a /dev/null new name or hunks only removing all its lines."""
+    if path_before(file) is None:
+        return False
+
+    return path_after(file) is None or _one_sided(file, LINE_TYPE_REMOVED)
+
+
+def set_attribute(file, name, value):
+    """Set an attribute of a UdiffFile unless it has the default value, UdiffFile.object only has the ones set."""
+    if value != getattr(UdiffFile, name):
+        setattr(file, name, value)
+
+
+def cut_hunks(ops, context):
+    """Cut numbered lines into hunks keeping up to `context` known context lines around the changes.
+
+    `ops` are (line_type, text, count, no_newline) edit operations, a context
+    operation with an unknown (None) text stands for `count` unchanged lines
+    that can't be shown.
+    """
+    runs = [[]]
+    old_line = new_line = 1
+
+    for line_type, text, count, no_newline in ops:
+        if text is None:
+            # unknown lines can't be shown, they end the hunk
+            runs.append([])
+            old_line += count
+            new_line += count
+            continue
+
+        runs[-1].append((line_type, text, no_newline, old_line, new_line))
+        if line_type != LINE_TYPE_ADDED:
+            old_line += 1
+        if line_type != LINE_TYPE_REMOVED:
+            new_line += 1
+
+    for run in runs:
+        changes = [index for index, line in enumerate(run) if line[0] != LINE_TYPE_CONTEXT]
+        groups = []
+        for index in changes:
+            if groups and index - groups[-1][1] <= 2 * context + 1:
+                groups[-1][1] = index
+            else:
+                groups.append([index, index])
+
+        for start, end in groups:
+            yield run[max(start - context, 0):end + context + 1]
+
+
+def make_block(lines):
+    """Return the UdiffBlock of numbered lines cut by cut_hunks, with its header."""
+    line_type, text, no_newline, old_line, new_line = lines[0]
+    has_old = any(line[0] != LINE_TYPE_ADDED for line in lines)
+    has_new = any(line[0] != LINE_TYPE_REMOVED for line in lines)
+
+    # "@@ -10,0" is an insertion after the line 10
+    block = UdiffBlock(old_start_line=old_line if has_old else old_line - 1,
+                       new_start_line=new_line if has_new else new_line - 1)
+
+    for line_type, text, no_newline, old_line, new_line in lines:
+        block.append(UdiffLine(
+            content=line_type + text,
+            line_type=line_type,
+            source_line_no=old_line if line_type != LINE_TYPE_ADDED else None,
+            target_line_no=new_line if line_type != LINE_TYPE_REMOVED else None,
+            no_newline=no_newline,
+        ))
+
+    block.header = hunk_header(block)
+    return block
@@ -0,0 +1,66 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Event driven parsing, see UdiffParser.parse_events."""
+
+from __future__ import unicode_literals
+
+from udiff.constants import SKIP_FILE
+
+
+class UdiffHandler(object):
+    """Receives the parts of a diff as the parser meets them, override the methods you need.
+
+    Any method but `on_file_end` may return SKIP_FILE to ignore the rest of
+    the current file diff, its `on_file_end` is still called.
+    """
+
+    SKIP_FILE = SKIP_FILE
+
+    # give the UdiffFile passed to on_file_end its blocks and lines
+    build_lines = False
+
+    def on_file_start(self):
+        """A file diff starts, its names are not known yet."""
+
+    def on_header(self, kind, match):
+        """A header line of the current file, `match` is the match object of its regex.
+
+        `kind` is 'git_diff' (diff --git a/... b/...), 'old_file' (--- a/...),
+        'new_file' (+++ b/...) or a git extended header: 'old_mode',
+        'new_mode', 'deleted_file_mode', 'new_file_mode', 'copy_from',
+        'copy_to', 'rename_from', 'rename_to', 'similarity_index',
+        'dissimilarity_index', 'index', 'binary_files', 'binary_diff',
+        'combined_index', 'combined_mode', 'combined_new_file' or
+        'combined_deleted_file'.
+        """
+
+    def on_hunk(self, block):
+        """A hunk starts, `block` is an empty UdiffBlock with its header and start lines."""
+
+    def on_line(self, line_type, source_line_no, target_line_no, text):
+        """A diff line, `text` is its content without the +/-/space marker."""
+
+    def on_file_end(self, file):
+        """The UdiffFile diff is complete, `file` is None when the lines since on_file_start were not a file diff."""
@@ -0,0 +1,102 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+"""A pool of strings to share the line contents and paths repeated across files and diffs.
+
+Vendored code, license headers and generated files repeat the same lines in
+many diffs; with a pool every parsed line holding the same text points at
+the same string.
+"""
+
+from __future__ import unicode_literals
+
+import threading
+from collections import OrderedDict
+
+
+class UdiffInternPool(object):
+    """Strings seen by parsers, each one kept once.
+
+    Without `max_size` the pool keeps every string, for the lifetime of a
+    parser for instance. With `max_size` it keeps the most recently used
+    ones, to be shared by the parsers of a long-lived process:
+
+    >>> pool = UdiffInternPool(max_size=100000)
+    >>> parser = UdiffParser(diff, options={'intern': pool})
+    """
+
+    def __init__(self, max_size=None):
+        super(UdiffInternPool, self).__init__()
+        self.max_size = max_size
+        self.strings = {} if max_size is None else OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.strings)
+
+    def __contains__(self, text):
+        return text in self.strings
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def intern(self, text):
+        """Return the string of the pool equal to `text`, adding `text` when there is none."""
+        if self.max_size is None:
+            value = self.strings.setdefault(text, text)
+            if value is text:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+            return value
+
+        with self.lock:
+            value = self.strings.pop(text, None)
+            if value is None:
+                value = text
+                self.misses += 1
+                if len(self.strings) >= self.max_size:
+                    # the least recently used string
+                    self.strings.popitem(last=False)
+            else:
+                self.hits += 1
+
+            self.strings[value] = value
+            return value
+
+    def clear(self):
+        """Forget the strings of the pool, the parsed lines keep theirs."""
+        with self.lock:
+            self.strings.clear()
+            self.hits = self.misses = 0
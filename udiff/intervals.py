@@ -0,0 +1,143 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Interval index of the hunks of a file diff, for line range overlap queries."""
+
+from __future__ import unicode_literals
+
+from bisect import bisect_right
+
+from udiff.writer import is_hunk
+
+
+SIDE_OLD = 'old'
+SIDE_NEW = 'new'
+
+
+class _SideIndex(object):
+    """Sorted, non overlapping [start, end) intervals of the hunks on one side.
+
+    A hunk without any line on that side (a pure insertion or deletion)
+    is the point between its start line and the next one, it only overlaps
+    ranges containing both of these lines.
+    """
+
+    def __init__(self, intervals):
+        self.starts = [start for start, end in intervals]
+        self.ends = [end for start, end in intervals]
+
+    def _first(self, start):
+        # first hunk ending after `start`, the ends are sorted as the hunks don't overlap
+        return bisect_right(self.ends, start)
+
+    def _scan(self, index, start, end, blocks, result):
+        while index < len(self.starts) and self.starts[index] < end + 1:
+            hunk_start, hunk_end = self.starts[index], self.ends[index]
+            if (hunk_start < hunk_end and hunk_end > start) or (hunk_start == hunk_end and start < hunk_start < end):
+                result.append(blocks[index])
+            index += 1
+
+        return result
+
+    def overlapping(self, start, end, blocks):
+        return self._scan(self._first(start), start, end, blocks, [])
+
+    def overlapping_many(self, ranges, blocks):
+        results = [None] * len(ranges)
+        index = 0
+
+        # merge join: the queries are walked by start, the first candidate hunk only moves forward
+        for position in sorted(range(len(ranges)), key=lambda position: ranges[position][0]):
+            start, end = ranges[position]
+            while index < len(self.ends) and self.ends[index] <= start:
+                index += 1
+
+            results[position] = self._scan(index, start, end, blocks, [])
+
+        return results
+
+
+class UdiffHunkIndex(object):
+    """Finds the hunks of a file touching line ranges, on the old or the new side.
+
+    Ranges are (first, last) line numbers, both included.
+    """
+
+    def __init__(self, file):
+        super(UdiffHunkIndex, self).__init__()
+        if file.is_combined:
+            raise ValueError('combined diffs can not be indexed')
+
+        self.blocks = []
+        old_intervals = []
+        new_intervals = []
+
+        for block in file:
+            if not is_hunk(block):
+                continue
+
+            old_count = sum(1 for line in block if not line.is_added)
+            new_count = sum(1 for line in block if not line.is_removed)
+
+            self.blocks.append(block)
+            old_intervals.append(self._interval(block.old_start_line or 0, old_count))
+            new_intervals.append(self._interval(block.new_start_line or 0, new_count))
+
+        self.sides = {
+            SIDE_OLD: _SideIndex(old_intervals),
+            SIDE_NEW: _SideIndex(new_intervals),
+        }
+
+    @staticmethod
+    def _interval(start, count):
+        if not count:
+            # "@@ -10,0 ..." is between the lines 10 and 11
+            return start + 0.5, start + 0.5
+
+        return start, start + count
+
+    def __repr__(self):
+        return '<UdiffHunkIndex: %d hunks>' % len(self.blocks)
+
+    def _side(self, side):
+        try:
+            return self.sides[side]
+        except KeyError:
+            raise ValueError('side must be %r or %r' % (SIDE_OLD, SIDE_NEW))
+
+    def overlapping(self, first, last, side=SIDE_NEW):
+        """Return the blocks touching the lines first..last."""
+        return self._side(side).overlapping(first, last, self.blocks)
+
+    def touches(self, first, last, side=SIDE_NEW):
+        """Whether any hunk touches the lines first..last."""
+        return bool(self.overlapping(first, last, side))
+
+    def overlapping_many(self, ranges, side=SIDE_NEW):
+        """Return the blocks touching each of the (first, last) ranges, in the order of `ranges`.
+
+        The ranges are sorted once and merged with the hunks, sorted input
+        (as coverage reports usually are) costs a single linear pass.
+        """
+        return self._side(side).overlapping_many(list(ranges), self.blocks)
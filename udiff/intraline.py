@@ -0,0 +1,268 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Word and character level changes between paired removed and added lines."""
+
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+
+from udiff.constants import LazyRegex
+
+
+INTRALINE_MODE_WORD = 'word'
+INTRALINE_MODE_CHAR = 'char'
+
+RE_WORD_TOKENS = LazyRegex(r'(?u)\w+|\s+|[^\w\s]')
+
+
+def _tokenize(text, mode):
+    if mode == INTRALINE_MODE_CHAR:
+        return list(text)
+
+    return RE_WORD_TOKENS.findall(text)
+
+
+def _merge_spans(spans):
+    merged = []
+    for start, end in spans:
+        if merged and merged[-1][1] == start:
+            merged[-1] = (merged[-1][0], end)
+        elif start != end:
+            merged.append((start, end))
+
+    return merged
+
+
+def diff_texts(old, new, mode=INTRALINE_MODE_WORD, max_line_length=1000, min_similarity=0.3):
+    """Return the changed (start, end) spans of `old` and `new`, or None when they are too different to compare.
+
+    Lines longer than `max_line_length` or with a similarity ratio below
+    `min_similarity` are not compared, they are better shown as fully changed.
+    """
+    if len(old) > max_line_length or len(new) > max_line_length:
+        return None
+
+    old_tokens = _tokenize(old, mode)
+    new_tokens = _tokenize(new, mode)
+
+    # most edits touch the middle of a line, the common ends are skipped cheaply
+    prefix = 0
+    limit = min(len(old_tokens), len(new_tokens))
+    while prefix < limit and old_tokens[prefix] == new_tokens[prefix]:
+        prefix += 1
+
+    suffix = 0
+    limit -= prefix
+    while suffix < limit and old_tokens[-1 - suffix] == new_tokens[-1 - suffix]:
+        suffix += 1
+
+    old_middle = old_tokens[prefix:len(old_tokens) - suffix]
+    new_middle = new_tokens[prefix:len(new_tokens) - suffix]
+
+    old_offset = sum(len(token) for token in old_tokens[:prefix])
+    new_offset = old_offset
+
+    if not old_middle or not new_middle:
+        old_end = old_offset + sum(len(token) for token in old_middle)
+        new_end = new_offset + sum(len(token) for token in new_middle)
+        return _merge_spans([(old_offset, old_end)]), _merge_spans([(new_offset, new_end)])
+
+    from difflib import SequenceMatcher
+
+    matcher = SequenceMatcher(None, old_middle, new_middle, autojunk=False)
+    if min_similarity:
+        # upper bound of the similarity of the whole token lists, cheap to compute
+        matching = 2 * (prefix + suffix) + matcher.quick_ratio() * (len(old_middle) + len(new_middle))
+        if matching < min_similarity * (len(old_tokens) + len(new_tokens)):
+            return None
+
+    old_positions = [old_offset]
+    for token in old_middle:
+        old_positions.append(old_positions[-1] + len(token))
+
+    new_positions = [new_offset]
+    for token in new_middle:
+        new_positions.append(new_positions[-1] + len(token))
+
+    old_spans = []
+    new_spans = []
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag == 'equal':
+            continue
+
+        old_spans.append((old_positions[old_start], old_positions[old_end]))
+        new_spans.append((new_positions[new_start], new_positions[new_end]))
+
+    if min_similarity:
+        unchanged = sum(len(token) for token in old_tokens) - sum(end - start for start, end in old_spans)
+        if 2.0 * unchanged / ((len(old) + len(new)) or 1) < min_similarity:
+            return None
+
+    return _merge_spans(old_spans), _merge_spans(new_spans)
+
+
+def _diff_texts_star(arguments):
+    return diff_texts(*arguments)
+
+
+def pair_lines(block):
+    """Yield (removed line, added line) pairs of a block.
+
+    In each run of changed lines the n-th removed line is paired with the n-th
+    added line, extra lines of either side are left alone.
+    """
+    removed = []
+    added = []
+
+    for line in list(block) + [None]:
+        if line is not None and line.is_removed and not added:
+            removed.append(line)
+        elif line is not None and line.is_added:
+            added.append(line)
+        else:
+            for pair in zip(removed, added):
+                yield pair
+
+            removed = [line] if line is not None and line.is_removed else []
+            added = []
+
+
+class UdiffLinePair(object):
+    """A removed line and the added line replacing it, with their changes computed on first access."""
+
+    def __init__(self, removed, added, intraline):
+        super(UdiffLinePair, self).__init__()
+        self.removed = removed
+        self.added = added
+        self.intraline = intraline
+        self._spans = False
+
+    def __repr__(self):
+        return '<UdiffLinePair: %s -> %s>' % (self.removed.source_line_no, self.added.target_line_no)
+
+    @property
+    def spans(self):
+        """(removed spans, added spans) in the line texts without the +/- marker, None for unrelated lines."""
+        if self._spans is False:
+            self._spans = self.intraline.diff(self.removed.content[1:], self.added.content[1:])
+
+        return self._spans
+
+    @property
+    def removed_spans(self):
+        return self.spans[0] if self.spans else None
+
+    @property
+    def added_spans(self):
+        return self.spans[1] if self.spans else None
+
+
+class UdiffIntraline(object):
+    """Computes and caches the changes inside modified lines.
+
+    `mode` is 'word' or 'char', see diff_texts for `max_line_length` and
+    `min_similarity`. Results are cached by line texts, the `cache_size` most
+    recent ones are kept.
+    """
+
+    def __init__(self, mode=INTRALINE_MODE_WORD, max_line_length=1000, min_similarity=0.3, cache_size=10000):
+        super(UdiffIntraline, self).__init__()
+        if mode not in (INTRALINE_MODE_WORD, INTRALINE_MODE_CHAR):
+            raise ValueError('unknown intraline mode %r' % mode)
+
+        self.mode = mode
+        self.max_line_length = max_line_length
+        self.min_similarity = min_similarity
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+
+    def _arguments(self, old, new):
+        return old, new, self.mode, self.max_line_length, self.min_similarity
+
+    def _remember(self, key, spans):
+        self.cache[key] = spans
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def diff(self, old, new):
+        """Return the changed spans of two line texts, see diff_texts."""
+        key = (old, new)
+        try:
+            spans = self.cache.pop(key)
+        except KeyError:
+            spans = diff_texts(*self._arguments(old, new))
+
+        self._remember(key, spans)
+        return spans
+
+    def block(self, block):
+        """Return the line pairs of a block, changes are computed when first used."""
+        return [UdiffLinePair(removed, added, self) for removed, added in pair_lines(block)]
+
+    def file(self, file, processes=None):
+        """Return the line pairs of a whole file with their changes computed.
+
+        With `processes`, the pairs that are not cached yet are computed by a
+        pool of processes.
+        """
+        pairs = [pair for block in file for pair in self.block(block)]
+
+        if processes and processes > 1:
+            missing = OrderedDict()
+            for pair in pairs:
+                key = (pair.removed.content[1:], pair.added.content[1:])
+                if key not in self.cache:
+                    missing[key] = self._arguments(*key)
+
+            if missing:
+                from multiprocessing import Pool
+
+                pool = Pool(processes)
+                try:
+                    results = pool.map(_diff_texts_star, list(missing.values()),
+                                       chunksize=max(1, len(missing) // (processes * 4)))
+                finally:
+                    pool.close()
+                    pool.join()
+
+                for key, spans in zip(missing, results):
+                    self._remember(key, spans)
+
+        for pair in pairs:
+            pair.spans
+
+        return pairs
+
+
+_default_intraline = None
+
+
+def default_intraline():
+    """Return the UdiffIntraline shared by UdiffBlock.intraline and UdiffFile.intraline."""
+    global _default_intraline
+    if _default_intraline is None:
+        _default_intraline = UdiffIntraline()
+
+    return _default_intraline
@@ -0,0 +1,162 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Mapping line numbers between the two sides of a file diff."""
+
+from __future__ import unicode_literals
+
+from bisect import bisect_right
+
+from udiff.writer import is_hunk
+
+
+INFINITY = float('inf')
+
+
+class UdiffLineMap(object):
+    """Maps line numbers of the old file to the new one and back.
+
+    The map is a sorted list of segments of lines which are the same on both
+    sides: the lines between hunks and the context lines inside them. A line
+    outside of every segment was removed (or added, for the new side).
+    Lookups are binary searches, batch lookups a single merge of the sorted
+    line numbers with the segments.
+    """
+
+    def __init__(self, file):
+        super(UdiffLineMap, self).__init__()
+        if file.is_combined:
+            raise ValueError('combined diffs can not be mapped')
+
+        if file.is_too_big:
+            raise ValueError('the lines of a too big diff are not parsed')
+
+        # segment i maps old lines [old_starts[i], old_ends[i]) to new lines from new_starts[i]
+        self.old_starts = []
+        self.old_ends = []
+        self.new_starts = []
+
+        old_line = new_line = 1
+        for block in file:
+            if not is_hunk(block):
+                continue
+
+            for line in block:
+                if line.is_context:
+                    self._add(old_line, line.source_line_no, new_line)
+                    self._add(line.source_line_no, line.source_line_no + 1, line.target_line_no)
+                    old_line = line.source_line_no + 1
+                    new_line = line.target_line_no + 1
+
+                elif line.is_removed:
+                    self._add(old_line, line.source_line_no, new_line)
+                    new_line += line.source_line_no - old_line
+                    old_line = line.source_line_no + 1
+
+                else:
+                    self._add(old_line, old_line + line.target_line_no - new_line, new_line)
+                    old_line += line.target_line_no - new_line
+                    new_line = line.target_line_no + 1
+
+        self._add(old_line, INFINITY, new_line)
+        self.lengths = [old_end - old_start for old_start, old_end in zip(self.old_starts, self.old_ends)]
+
+    def _add(self, old_start, old_end, new_start):
+        if old_end <= old_start:
+            return
+
+        if self.old_ends and self.old_ends[-1] == old_start and \
+                self.new_starts[-1] + (old_start - self.old_starts[-1]) == new_start:
+            self.old_ends[-1] = old_end
+            return
+
+        self.old_starts.append(old_start)
+        self.old_ends.append(old_end)
+        self.new_starts.append(new_start)
+
+    def __repr__(self):
+        return '<UdiffLineMap: %d segments>' % len(self.old_starts)
+
+    def old_to_new(self, line_no):
+        """Return the new line number of an old line, None if it was removed."""
+        index = bisect_right(self.old_starts, line_no) - 1
+        if index < 0 or line_no >= self.old_ends[index]:
+            return None
+
+        return self.new_starts[index] + line_no - self.old_starts[index]
+
+    def new_to_old(self, line_no):
+        """Return the old line number of a new line, None if it was added."""
+        index = bisect_right(self.new_starts, line_no) - 1
+        if index < 0 or line_no - self.new_starts[index] >= self.lengths[index]:
+            return None
+
+        return self.old_starts[index] + line_no - self.new_starts[index]
+
+    def _ranges(self, starts, other_starts, start, end):
+        lengths = self.lengths
+        index = max(bisect_right(starts, start) - 1, 0)
+        ranges = []
+
+        while index < len(starts) and starts[index] <= end:
+            first = max(start, starts[index])
+            last = min(end, starts[index] + lengths[index] - 1)
+            if first <= last:
+                offset = other_starts[index] - starts[index]
+                ranges.append((first + offset, last + offset))
+            index += 1
+
+        return ranges
+
+    def old_range_to_new(self, start, end):
+        """Return the (first, last) new line ranges of the old lines start..end that were kept."""
+        return self._ranges(self.old_starts, self.new_starts, start, end)
+
+    def new_range_to_old(self, start, end):
+        """Return the (first, last) old line ranges of the new lines start..end that already existed."""
+        return self._ranges(self.new_starts, self.old_starts, start, end)
+
+    def _map_many(self, line_numbers, starts, other_starts):
+        results = [None] * len(line_numbers)
+        index = 0
+        count = len(starts)
+
+        # one pass over the segments for the sorted line numbers
+        for position in sorted(range(len(line_numbers)), key=line_numbers.__getitem__):
+            line_no = line_numbers[position]
+            while index + 1 < count and starts[index + 1] <= line_no:
+                index += 1
+
+            if count and starts[index] <= line_no < starts[index] + self.lengths[index]:
+                results[position] = other_starts[index] + line_no - starts[index]
+
+        return results
+
+    def old_to_new_many(self, line_numbers):
+        """Map a list of old line numbers at once, in the same order, None for removed lines."""
+        return self._map_many(list(line_numbers), self.old_starts, self.new_starts)
+
+    def new_to_old_many(self, line_numbers):
+        """Map a list of new line numbers at once, in the same order, None for added lines."""
+        return self._map_many(list(line_numbers), self.new_starts, self.old_starts)
@@ -0,0 +1,155 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Moved code detection, removed lines added back elsewhere in the diff as `git diff --color-moved` shows them."""
+
+from __future__ import unicode_literals
+
+from udiff.constants import LazyRegex
+from udiff.parser import make_str
+
+
+RE_ALPHANUMERIC = LazyRegex(r'(?u)[^\W_]')
+
+
+class UdiffMovedBlock(object):
+    """Consecutive removed lines added back as consecutive lines, in the same file or another one."""
+
+    def __init__(self, source_file, target_file, removed, added):
+        super(UdiffMovedBlock, self).__init__()
+        self.source_file = source_file
+        self.target_file = target_file
+        self.removed = removed
+        self.added = added
+
+    def __repr__(self):
+        return make_str('<UdiffMovedBlock: %s:%d-%d => %s:%d-%d>') % (
+            self.source_file.path, self.source_start, self.source_end,
+            self.target_file.path, self.target_start, self.target_end,
+        )
+
+    def __len__(self):
+        return len(self.added)
+
+    @property
+    def source_start(self):
+        return self.removed[0].source_line_no
+
+    @property
+    def source_end(self):
+        return self.removed[-1].source_line_no
+
+    @property
+    def target_start(self):
+        return self.added[0].target_line_no
+
+    @property
+    def target_end(self):
+        return self.added[-1].target_line_no
+
+
+def _key(line, ignore_whitespace):
+    text = line.content[1:]
+    return ''.join(text.split()) if ignore_whitespace else text
+
+
+def _follows(previous, current, attribute):
+    # both lines of a block are consecutive lines of the same file
+    return previous[0] is current[0] and getattr(current[1], attribute) == getattr(previous[1], attribute) + 1
+
+
+def detect_moves(files, min_chars=20, ignore_whitespace=False, max_candidates=64):
+    """Return the UdiffMovedBlock of removed lines added back in the diff files, and mark their lines.
+
+    The `moved` attribute of the removed and added lines of a block is its
+    index in the result. Removed lines are hashed once, added lines are looked
+    up and extend the blocks they continue, so the cost is linear in the
+    number of lines. A block needs at least `min_chars` alphanumeric
+    characters, a line without any doesn't start a block and a line starts at
+    most `max_candidates` blocks.
+    """
+    removed = []
+    added = []
+    for file in files:
+        if file.is_combined:
+            continue
+
+        for block in file:
+            for line in block:
+                if line.moved is not None:
+                    # from a previous detection
+                    del line.moved
+
+                if line.is_removed:
+                    removed.append((file, line, _key(line, ignore_whitespace)))
+                elif line.is_added:
+                    added.append((file, line, _key(line, ignore_whitespace)))
+
+    occurrences = {}
+    for index, (file, line, key) in enumerate(removed):
+        if RE_ALPHANUMERIC.search(key):
+            occurrences.setdefault(key, []).append(index)
+
+    moves = []
+
+    def finish(start, end, last):
+        lines = added[start:end]
+        chars = 0
+        for file, line, key in lines:
+            chars += len(RE_ALPHANUMERIC.findall(key))
+            if chars >= min_chars:
+                break
+        else:
+            return
+
+        source = removed[last - (end - start) + 1:last + 1]
+        move = UdiffMovedBlock(source[0][0], lines[0][0], [line for file, line, key in source],
+                               [line for file, line, key in lines])
+        for line in move.removed + move.added:
+            line.moved = len(moves)
+
+        moves.append(move)
+
+    # the removed lines ending the block being followed, all of them match the added lines since `start`
+    candidates = []
+    start = 0
+    for index, current in enumerate(added):
+        if candidates and _follows(added[index - 1], current, 'target_line_no'):
+            following = [candidate + 1 for candidate in candidates if candidate + 1 < len(removed) and
+                         removed[candidate + 1][2] == current[2] and
+                         _follows(removed[candidate], removed[candidate + 1], 'source_line_no')]
+            if following:
+                candidates = following
+                continue
+
+        if candidates:
+            finish(start, index, candidates[0])
+
+        candidates = occurrences.get(current[2], [])[:max_candidates]
+        start = index
+
+    if candidates:
+        finish(start, len(added), candidates[0])
+
+    return moves
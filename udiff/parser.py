@@ -27,15 +27,20 @@
 
 from __future__ import unicode_literals
 
-import codecs
 import sys
-import re
+from itertools import islice
 
 from udiff.constants import (
     DEFAULT_ENCODING,
+    IGNORE_WHITESPACE_ALL,
+    IGNORE_WHITESPACE_CHANGE,
     LINE_TYPE_ADDED,
     LINE_TYPE_CONTEXT,
     LINE_TYPE_REMOVED,
+    LINE_TYPE_NO_NEWLINE,
+    SKIP_FILE,
+    RE_LINE,
+    RE_SEPARATOR_LINE,
     RE_OLD_MODE,
     RE_NEW_MODE,
     RE_DELETED_FILE_MODE,
@@ -54,20 +59,26 @@ from udiff.constants import (
     RE_COMBINED_NEW_FILE,
     RE_COMBINED_DELETED_FILE,
     RE_GIT_DIFF_START,
-    RE_SPECIALS_RULE,
+    RE_FILENAME,
+    RE_FILENAME_TIMESTAMP,
+    RE_SPECIALS,
+    LazyRegex,
     BASE_DIFF_FILENAME_PREFIXES,
     OLD_FILE_NAME_HEADER,
     NEW_FILE_NAME_HEADER,
     RE_HUNK_HEADER_V1,
     RE_HUNK_HEADER_V2,
     HUNK_HEADER_PREFIX,
-    d
 )
 from udiff.errors import UdiffParseError
 
 
+DEV_NULL = '/dev/null'
+
 PY2 = sys.version_info[0] == 2
 if PY2:
+    import codecs
+
     open_file = codecs.open
     make_str = lambda x: x.encode(DEFAULT_ENCODING)
 
@@ -84,6 +95,66 @@ else:
     basestring = str
 
 
+_filename_regexes = {}
+
+# the extended header lines, with the kind given to UdiffHandler.on_header
+HEADERS = (
+    ('old_mode', RE_OLD_MODE),
+    ('new_mode', RE_NEW_MODE),
+    ('deleted_file_mode', RE_DELETED_FILE_MODE),
+    ('new_file_mode', RE_NEW_FILE_MODE),
+    ('copy_from', RE_COPY_FROM),
+    ('copy_to', RE_COPY_TO),
+    ('rename_from', RE_RENAME_FROM),
+    ('rename_to', RE_RENAME_TO),
+    ('similarity_index', RE_SIMILARITY_INDEX),
+    ('dissimilarity_index', RE_DISSIMILARITY_INDEX),
+    ('index', RE_INDEX),
+    ('binary_files', RE_BINARY_FILES),
+    ('binary_diff', RE_BINARY_DIFF),
+    ('combined_index', RE_COMBINED_INDEX),
+    ('combined_mode', RE_COMBINED_MODE),
+    ('combined_new_file', RE_COMBINED_NEW_FILE),
+    ('combined_deleted_file', RE_COMBINED_DELETED_FILE),
+)
+
+
+def filename_regex(line_prefix=None):
+    """Return the (cached) regex matching a file name after `line_prefix`."""
+    if not line_prefix:
+        return RE_FILENAME
+
+    regex = _filename_regexes.get(line_prefix)
+    if regex is None:
+        escaped = ''.join('\\' + char if char in RE_SPECIALS else char for char in line_prefix)
+        regex = _filename_regexes[line_prefix] = LazyRegex(r'^' + escaped + ' "?(.+?)"?$')
+
+    return regex
+
+
+def patch_id_line(line):
+    """Return the bytes a diff line adds to a patch id: the line without any whitespace."""
+    line = ''.join(line.split()) + '\n'
+    return line if isinstance(line, bytes) else line.encode(DEFAULT_ENCODING)
+
+
+def whitespace_key(text, mode=IGNORE_WHITESPACE_ALL):
+    """Return `text` without the whitespace differences ignored by `mode`, see IGNORE_WHITESPACE_*.
+
+    As `diff -w`, all the whitespace is ignored. As `diff -b`, the trailing
+    whitespace is ignored and the other whitespace runs are equivalent.
+    """
+    if mode == IGNORE_WHITESPACE_ALL:
+        return ''.join(text.split())
+
+    if mode != IGNORE_WHITESPACE_CHANGE:
+        raise ValueError('unknown ignore_whitespace mode %r, use %r or %r' % (
+            mode, IGNORE_WHITESPACE_ALL, IGNORE_WHITESPACE_CHANGE))
+
+    text = text.rstrip()
+    return (' ' if text[:1].isspace() else '') + ' '.join(text.split())
+
+
 def merge_two_dicts(x, y):
     z = x.copy()  # start with x's keys and values
     z.update(y)  # modifies z with y's keys and values & returns None
@@ -98,13 +169,16 @@ class UdiffLine(object):
     target_line_no = None
     line_type = None
     content = ''
+    no_newline = False
+    moved = None
 
-    def __init__(self, content, line_type=None, source_line_no=None, target_line_no=None):
+    def __init__(self, content, line_type=None, source_line_no=None, target_line_no=None, no_newline=False):
         super(UdiffLine, self).__init__()
         self.source_line_no = source_line_no
         self.target_line_no = target_line_no
         self.line_type = line_type
         self.content = content
+        self.no_newline = no_newline
 
     def __repr__(self):
         return make_str("<UdiffLine: %s%s>") % (self.line_type, self.content)
@@ -118,6 +192,13 @@ class UdiffLine(object):
                 self.line_type == other.line_type and
                 self.content == other.content)
 
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        # the attributes compared by __eq__, a line in a set or a dict key must not change
+        return hash((self.source_line_no, self.target_line_no, self.line_type, self.content))
+
     @property
     def is_added(self):
         return self.line_type == LINE_TYPE_ADDED
@@ -130,6 +211,19 @@ class UdiffLine(object):
     def is_context(self):
         return self.line_type == LINE_TYPE_CONTEXT
 
+    def invert(self):
+        """Swap the sides of the line in place.
+
+        `content` keeps the original diff line, `line_type` tells the new side.
+        """
+        if self.line_type == LINE_TYPE_ADDED:
+            self.line_type = LINE_TYPE_REMOVED
+        elif self.line_type == LINE_TYPE_REMOVED:
+            self.line_type = LINE_TYPE_ADDED
+
+        self.source_line_no, self.target_line_no = self.target_line_no, self.source_line_no
+        return self
+
 
 @implements_to_string
 class UdiffBlock(list):
@@ -139,6 +233,8 @@ class UdiffBlock(list):
     old_start_line_2 = None
     new_start_line = None
     header = ''
+    # the lines don't match the counts of the header, the block was read without them
+    malformed = False
 
     def __init__(self, header='', old_start_line=None, old_start_line_2=None, new_start_line=None):
         super(UdiffBlock, self).__init__()
@@ -170,6 +266,51 @@ class UdiffBlock(list):
     def modified(self):
         return sum([1 for l in self if l.is_context])
 
+    def invert(self, is_combined=False):
+        """Swap the sides of the block in place, removed lines are moved before added ones."""
+        from udiff.writer import hunk_header, is_hunk
+
+        if is_combined:
+            raise ValueError('combined diffs can not be inverted')
+
+        for line in self:
+            line.invert()
+
+        # git puts the removed lines of a change first
+        start = 0
+        while start < len(self):
+            if self[start].is_context:
+                start += 1
+                continue
+
+            end = start
+            while end < len(self) and not self[end].is_context:
+                end += 1
+
+            self[start:end] = [line for line in self[start:end] if line.is_removed] + \
+                              [line for line in self[start:end] if not line.is_removed]
+            start = end
+
+        self.old_start_line, self.new_start_line = self.new_start_line, self.old_start_line
+        if is_hunk(self):
+            self.header = hunk_header(self)
+
+        return self
+
+    def intraline(self, intraline=None):
+        """Return the (removed, added) UdiffLinePair of the block, their changes are computed on first access.
+
+        `intraline` is the UdiffIntraline computing and caching the changes,
+        a shared word level one by default.
+        """
+        from udiff.intraline import default_intraline
+        return (intraline or default_intraline()).block(self)
+
+    def write(self, out, is_combined=False):
+        """Write the block as a unified diff hunk to the file-like object `out`."""
+        from udiff.writer import write_block
+        write_block(self, out, is_combined)
+
 
 @implements_to_string
 class UdiffFile(list):
@@ -197,6 +338,10 @@ class UdiffFile(list):
     changed_percentage = 0
     checksum_before = None
     checksum_after = None
+    patch_id = None
+    added_lines_ignoring_whitespace = None
+    deleted_lines_ignoring_whitespace = None
+    scan_matches = None
 
     def __init__(self, deleted_lines=0, added_lines=0):
         super(UdiffFile, self).__init__()
@@ -224,6 +369,14 @@ class UdiffFile(list):
     def object(self):
         return merge_two_dicts(self.__dict__, {'blocks': [x.object for x in self]})
 
+    @property
+    def path(self):
+        """Return the path of the file after the change, before it for deleted files."""
+        if self.is_deleted or not self.new_name or self.new_name == DEV_NULL:
+            return self.old_name
+
+        return self.new_name
+
     @property
     def is_added_file(self):
         return self.is_new
@@ -236,6 +389,52 @@ class UdiffFile(list):
     def is_modified_file(self):
         return not self.is_new and not self.is_deleted
 
+    def invert(self):
+        """Swap the sides of the file diff in place, as `git diff -R` would show it."""
+        for block in self:
+            block.invert(self.is_combined)
+
+        self.old_name, self.new_name = self.new_name, self.old_name
+        self.is_new, self.is_deleted = self.is_deleted, self.is_new
+        self.new_file_mode, self.deleted_file_mode = self.deleted_file_mode, self.new_file_mode
+        self.old_mode, self.new_mode = self.new_mode, self.old_mode
+        self.checksum_before, self.checksum_after = self.checksum_after, self.checksum_before
+        self.added_lines, self.deleted_lines = self.deleted_lines, self.added_lines
+
+        return self
+
+    def intraline(self, intraline=None, processes=None):
+        """Return the UdiffLinePair of every block with their changes computed, by `processes` processes if given."""
+        from udiff.intraline import default_intraline
+        return (intraline or default_intraline()).file(self, processes=processes)
+
+    def line_map(self):
+        """Return a UdiffLineMap translating line numbers between the old and the new file."""
+        from udiff.linemap import UdiffLineMap
+        return UdiffLineMap(self)
+
+    def hunk_index(self):
+        """Return a UdiffHunkIndex finding the hunks touching line ranges of the old or the new file."""
+        from udiff.intervals import UdiffHunkIndex
+        return UdiffHunkIndex(self)
+
+    def write(self, out, src_prefix='a/', dst_prefix='b/'):
+        """Write the file diff, git extended headers included, to the file-like object `out`."""
+        from udiff.writer import write_file
+        write_file(self, out, src_prefix, dst_prefix)
+
+    def apply(self, source_text, fuzz=0, max_offset=None):
+        """Apply the hunks to `source_text`, return a UdiffApplyResult.
+
+        Hunks are looked for at `old_start_line`, shifted by the offset the
+        previous hunk was found at, then at the closest position within
+        `max_offset` lines (anywhere when None). `fuzz` is the number of context
+        lines that may be ignored at both ends of a hunk. Hunks that can't be
+        placed are reported in `rejects`, the others are applied.
+        """
+        from udiff.apply import apply_file
+        return apply_file(self, source_text, fuzz=fuzz, max_offset=max_offset)
+
 
 @implements_to_string
 class UdiffParser(list):
@@ -247,10 +446,24 @@ class UdiffParser(list):
         'src_prefix': None,
         'diff_max_changes': None,
         'diff_max_line_length': None,
-        'diff_too_big_message': ''
+        'diff_too_big_message': '',
+        'strip_separators': False,
+        'stat_only': False,
+        'patch_id': False,
+        'patch_id_context': False,
+        'ignore_whitespace': None,
+        'drop_whitespace_changes': False,
+        'scanner': None,
+        'intern': None
     }
 
     current_file = None
+    current_patch_id = None
+    whitespace_changes = None
+    whitespace_removed = 0
+    whitespace_matched = -1
+    handler = None
+    skip_file = False
     possible_old_name = None
     possible_new_name = None
 
@@ -258,6 +471,9 @@ class UdiffParser(list):
     old_start_line = None
     old_start_line_2 = None
     new_start_line = None
+    # the lines left on every side of the current hunk, as its header counts them: [old, new] or [old, old 2, new]
+    hunk_remaining = None
+    intern_pool = None
 
     def __init__(self, content, options=None):
         super(UdiffParser, self).__init__()
@@ -267,18 +483,6 @@ class UdiffParser(list):
         else:
             self._reset_options()
 
-        # convert string inputs to StringIO objects
-        if self._get_option('encoding'):
-            content = self._convert_string(content, self._get_option('encoding'))
-
-        content = re.sub(r'\\ No newline at end of file', '', content)
-        content = re.sub(r'\r\n?', '\n', content)
-
-        content = re.sub(r'[\-]{10,}', '', content)
-        content = re.sub(r'[=]{10,}', '', content)
-
-        content = content.splitlines()
-
         self._parse(content)
 
     def __repr__(self):
@@ -299,6 +503,12 @@ class UdiffParser(list):
 
         return None
 
+    @property
+    def patch_id(self):
+        """Return the patch id of the whole diff when parsed with the patch_id option, see udiff.patchid."""
+        from udiff.patchid import diff_patch_id
+        return diff_patch_id(self)
+
     @property
     def object(self):
         return {
@@ -313,6 +523,15 @@ class UdiffParser(list):
         # diff_max_changes — number of changed lines after which a file diff is deemed as too big and not displayed, default is undefined
         # diff_max_line_length — number of characters in a diff line after which a file diff is deemed as too big
         # diff_too_big_message — text for diff too big
+        # strip_separators — skip lines made only of 10+ '-' or '=' (svn log and "Index:" banners) outside
+        #   the hunks, default False
+        # stat_only — only count the added and deleted lines, the blocks are left empty, default False
+        # patch_id — compute the patch_id of every file, see udiff.patchid, default False
+        # patch_id_context — include the context lines in the patch ids, default False
+        # ignore_whitespace — also count the lines ignoring whitespace changes, 'all' as diff -w or 'change' as diff -b
+        # drop_whitespace_changes — with ignore_whitespace, show the lines only changed by whitespace as context lines
+        # scanner — a UdiffScanner searching the added lines, its matches are in UdiffFile.scan_matches
+        # intern — True to share the equal line contents and paths of the diff, or a UdiffInternPool shared by parsers
 
         self._reset_options()
 
@@ -331,8 +550,8 @@ class UdiffParser(list):
         self.options[key] = value
 
     def _reset_options(self):
-        for key, value in self.options.items():
-            self.options[key] = None
+        # class level options are the defaults, every parser gets its own copy
+        self.options = dict(UdiffParser.options)
 
     @staticmethod
     def _get_extension(filename):
@@ -342,11 +561,8 @@ class UdiffParser(list):
     @staticmethod
     def _get_filename(line, line_prefix=None, extra_prefix=None):
         prefixes = BASE_DIFF_FILENAME_PREFIXES if not extra_prefix else BASE_DIFF_FILENAME_PREFIXES + [extra_prefix]
-        filename_exp = re.compile(
-            r'^' + re.sub(RE_SPECIALS_RULE, '\\\\\g<1>', line_prefix) + ' "?(.+?)"?$') if line_prefix else re.compile(
-            r'^"?(.+?)"?$')
 
-        filename = filename_exp.match(line)
+        filename = filename_regex(line_prefix).match(line)
         if filename:
             filename = filename.group(1)
 
@@ -362,7 +578,7 @@ class UdiffParser(list):
             # https://www.gnu.org/software/diffutils/manual/html_node/Detailed-Unified.html
             # Ie: 2016-10-25 11:37:14.000000000 +0200
 
-            return re.sub(r'\s+\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(?:\.\d+)? [+-]\d{4}.*$', '', filename_without_prefix)
+            return RE_FILENAME_TIMESTAMP.sub('', filename_without_prefix)
 
         return ''
 
@@ -379,6 +595,7 @@ class UdiffParser(list):
 
     def _start_block(self, line):
         self._save_block()
+        self.hunk_remaining = None
 
         if self.current_file is not None:
             is_hunk_header_v1 = RE_HUNK_HEADER_V1.match(line)
@@ -387,13 +604,15 @@ class UdiffParser(list):
             if is_hunk_header_v1:
                 self.current_file.is_combined = False
                 self.old_start_line = int(is_hunk_header_v1.group(1))
-                self.new_start_line = int(is_hunk_header_v1.group(2))
+                self.new_start_line = int(is_hunk_header_v1.group(3))
+                self.hunk_remaining = [int(is_hunk_header_v1.group(2) or 1), int(is_hunk_header_v1.group(4) or 1)]
 
             elif is_hunk_header_v2:
                 self.current_file.is_combined = True
                 self.old_start_line = int(is_hunk_header_v2.group(1))
-                self.old_start_line_2 = int(is_hunk_header_v2.group(2))
-                self.new_start_line = int(is_hunk_header_v2.group(3))
+                self.old_start_line_2 = int(is_hunk_header_v2.group(3))
+                self.new_start_line = int(is_hunk_header_v2.group(5))
+                self.hunk_remaining = [int(is_hunk_header_v2.group(index) or 1) for index in (2, 4, 6)]
 
             else:
                 if line.startswith(HUNK_HEADER_PREFIX):
@@ -407,8 +626,19 @@ class UdiffParser(list):
 
         self.current_block = UdiffBlock(old_start_line=self.old_start_line, old_start_line_2=self.old_start_line_2,
                                         new_start_line=self.new_start_line, header=line)
+        self._reset_whitespace_changes()
+
+        if self.handler is not None and line.startswith(HUNK_HEADER_PREFIX):
+            self._notify('on_hunk', self.current_block)
+
+    def _notify(self, event, *args):
+        if getattr(self.handler, event)(*args) == SKIP_FILE:
+            self.skip_file = True
 
     def _save_file(self):
+        saved_file = None
+        ended = self.current_file is not None
+
         if self.current_file is not None:
             if not self.current_file.old_name and self.possible_old_name is not None:
                 self.current_file.old_name = self.possible_old_name
@@ -416,33 +646,50 @@ class UdiffParser(list):
             if not self.current_file.new_name and self.possible_new_name is not None:
                 self.current_file.new_name = self.possible_new_name
 
+            if self.intern_pool is not None:
+                if self.current_file.old_name:
+                    self.current_file.old_name = self.intern_pool.intern(self.current_file.old_name)
+                if self.current_file.new_name:
+                    self.current_file.new_name = self.intern_pool.intern(self.current_file.new_name)
+
             if self.current_file.new_name:
-                self.append(self.current_file)
+                saved_file = self.current_file
                 self.current_file = None
 
+                if self.current_patch_id is not None and not saved_file.is_too_big:
+                    from udiff.patchid import file_patch_id
+                    saved_file.patch_id = file_patch_id(saved_file, self.current_patch_id)
+
         self.possible_old_name = None
         self.possible_new_name = None
 
+        if ended and self.handler is not None:
+            self.handler.on_file_end(saved_file)
+
+        return saved_file
+
     def _start_file(self):
         self._save_block()
-        self._save_file()
+        saved_file = self._save_file()
         self.current_file = UdiffFile(deleted_lines=0, added_lines=0)
 
-    def _exist_hunk_header(self, line, line_no):
-        idx = line_no
+        self.current_patch_id = None
+        if self._get_option('patch_id'):
+            import hashlib
+            self.current_patch_id = hashlib.sha1()
 
-        while idx < len(self.diff) - 3:
-            if line.startswith('diff'):
-                return False
+        if self._get_option('ignore_whitespace'):
+            self.current_file.added_lines_ignoring_whitespace = 0
+            self.current_file.deleted_lines_ignoring_whitespace = 0
 
-            if self.diff[idx].startswith(OLD_FILE_NAME_HEADER) and \
-                self.diff[idx + 1].startswith(NEW_FILE_NAME_HEADER) and \
-                self.diff[idx + 2].startswith(HUNK_HEADER_PREFIX):
-                return True
+        if self._get_option('scanner') is not None:
+            self.current_file.scan_matches = []
 
-            idx += 1
+        self.skip_file = False
+        if self.handler is not None:
+            self._notify('on_file_start')
 
-        return False
+        return saved_file
 
     def _starts_with_any(self, line, prefixes):
         for prefix in prefixes:
@@ -458,53 +705,415 @@ class UdiffParser(list):
                 self.new_start_line is None:
             return
 
-        current_line = UdiffLine(content=line)
+        if self.intern_pool is not None and not self._get_option('stat_only'):
+            line = self.intern_pool.intern(line)
+
         added_prefixes = ['+ ', ' +', '++'] if self.current_file.is_combined else ['+']
         delete_prefixes = ['- ', ' -', '--'] if self.current_file.is_combined else ['-']
 
         if self._starts_with_any(line, added_prefixes):
+            line_type = LINE_TYPE_ADDED
             self.current_file.added_lines += 1
 
-            current_line.line_type = LINE_TYPE_ADDED
-            current_line.source_line_no = None
-            current_line.target_line_no = self.new_start_line
-            self.new_start_line += 1
-
         elif self._starts_with_any(line, delete_prefixes):
+            line_type = LINE_TYPE_REMOVED
             self.current_file.deleted_lines += 1
 
-            current_line.line_type = LINE_TYPE_REMOVED
-
-            current_line.source_line_no = self.old_start_line
-            self.old_start_line += 1
-            current_line.target_line_no = None
-
         else:
-            current_line.line_type = LINE_TYPE_CONTEXT
+            line_type = LINE_TYPE_CONTEXT
+
+        if self.current_patch_id is not None and (line_type != LINE_TYPE_CONTEXT or self._get_option('patch_id_context')):
+            self.current_patch_id.update(patch_id_line(line))
 
-            current_line.source_line_no = self.old_start_line
+        source_line_no = target_line_no = None
+        if line_type != LINE_TYPE_ADDED:
+            source_line_no = self.old_start_line
             self.old_start_line += 1
-            current_line.target_line_no = self.new_start_line
+
+        if line_type != LINE_TYPE_REMOVED:
+            target_line_no = self.new_start_line
             self.new_start_line += 1
 
-        self.current_block.append(current_line)
+        if self.handler is not None:
+            self._notify('on_line', line_type, source_line_no, target_line_no,
+                         line[2:] if self.current_file.is_combined else line[1:])
+
+        scanner = self._get_option('scanner')
+        if scanner is not None and line_type == LINE_TYPE_ADDED:
+            for pattern_id in scanner.scan_line(line[2:] if self.current_file.is_combined else line[1:]):
+                self.current_file.scan_matches.append((target_line_no, pattern_id))
+
+        current_line = None
+        if not self._get_option('stat_only'):
+            current_line = UdiffLine(content=line, line_type=line_type, source_line_no=source_line_no,
+                                     target_line_no=target_line_no)
+
+        if self._get_option('ignore_whitespace') and not self.current_file.is_combined:
+            current_line = self._ignore_whitespace(line, line_type, current_line)
+
+        if current_line is not None:
+            self.current_block.append(current_line)
+
+    def _too_big(self, line, max_changes, max_line_length):
+        """Whether the current file is too big with `line`, its lines are then replaced by the too big message."""
+        if not (max_changes and self.current_file.added_lines + self.current_file.deleted_lines > max_changes) and \
+                not (max_line_length and len(line) > max_line_length):
+            return False
+
+        self.current_file.is_too_big = True
+        self.current_file.added_lines = 0
+        self.current_file.deleted_lines = 0
+        self.current_file[:] = []
+        self.current_block = None
+
+        self._start_block(self._get_option('diff_too_big_message') if self._get_option(
+            'diff_too_big_message') else 'Diff too big to be displayed')
+        return True
+
+    def _malformed_hunk(self):
+        # the rest of the hunk is read line by line, as diffs without counts
+        self.current_block.malformed = True
+        self.hunk_remaining = None
+
+    def _read_hunk(self, lookahead, lines, max_changes, max_line_length):
+        """Read the lines of the current hunk as its header counts them.
+
+        Lines are only told apart by their first characters. Return the last
+        line read (None when the first line doesn't fit), and the line that
+        doesn't fit the counts (or None), left to the line by line parsing with
+        the block marked as malformed.
+        """
+        if self.current_file.is_combined or self.current_file.is_too_big or self.skip_file or \
+                max_changes or max_line_length:
+            return self._read_hunk_lines(lookahead, lines, max_changes, max_line_length)
+
+        old_remaining, new_remaining = self.hunk_remaining
+        old_line_no, new_line_no = self.old_start_line, self.new_start_line
+        block = None if self._get_option('stat_only') else self.current_block
+        intern = self.intern_pool.intern if self.intern_pool is not None and block is not None else None
+        added = deleted = 0
+        line = pending = None
+
+        # the options working on every line, as _create_line does, looked up once
+        handler = self.handler
+        patch_id = self.current_patch_id
+        patch_id_context = self._get_option('patch_id_context')
+        scanner = self._get_option('scanner')
+        ignore_whitespace = self._get_option('ignore_whitespace')
+        per_line = handler is not None or patch_id is not None or scanner is not None or bool(ignore_whitespace)
+
+        while old_remaining or new_remaining:
+            next_line = lookahead.pop(0) if lookahead else next(lines, None)
+            if next_line is None:
+                break
+
+            first = next_line[:1]
+            if first == LINE_TYPE_NO_NEWLINE:
+                self._mark_no_newline()
+                continue
+
+            if intern is not None:
+                next_line = intern(next_line)
+
+            if first == LINE_TYPE_CONTEXT or not next_line:
+                # empty context lines, when trailing whitespace was stripped
+                if not old_remaining or not new_remaining:
+                    pending = next_line
+                    break
+
+                line = next_line or LINE_TYPE_CONTEXT
+                line_type, source_line_no, target_line_no = LINE_TYPE_CONTEXT, old_line_no, new_line_no
+                old_line_no += 1
+                new_line_no += 1
+                old_remaining -= 1
+                new_remaining -= 1
+
+            elif first == LINE_TYPE_REMOVED and old_remaining and \
+                    not self._file_header_follows(next_line, lookahead, lines):
+                line = next_line
+                line_type, source_line_no, target_line_no = LINE_TYPE_REMOVED, old_line_no, None
+                old_line_no += 1
+                old_remaining -= 1
+                deleted += 1
+
+            elif first == LINE_TYPE_ADDED and new_remaining:
+                line = next_line
+                line_type, source_line_no, target_line_no = LINE_TYPE_ADDED, None, new_line_no
+                new_line_no += 1
+                new_remaining -= 1
+                added += 1
+
+            else:
+                pending = next_line
+                break
+
+            if not per_line:
+                if block is not None:
+                    block.append(UdiffLine(line, line_type, source_line_no, target_line_no))
+                continue
+
+            if patch_id is not None and (line_type != LINE_TYPE_CONTEXT or patch_id_context):
+                patch_id.update(patch_id_line(line))
+
+            if handler is not None:
+                self._notify('on_line', line_type, source_line_no, target_line_no, line[1:])
+
+            if scanner is not None and line_type == LINE_TYPE_ADDED:
+                for pattern_id in scanner.scan_line(line[1:]):
+                    self.current_file.scan_matches.append((target_line_no, pattern_id))
+
+            current_line = None if block is None else UdiffLine(line, line_type, source_line_no, target_line_no)
+            if ignore_whitespace:
+                current_line = self._ignore_whitespace(line, line_type, current_line)
+
+            if current_line is not None:
+                block.append(current_line)
+
+            if self.skip_file:
+                break
+
+        self.old_start_line, self.new_start_line = old_line_no, new_line_no
+        self.current_file.added_lines += added
+        self.current_file.deleted_lines += deleted
+        self.hunk_remaining = [old_remaining, new_remaining]
+
+        if self.skip_file and pending is None and (old_remaining or new_remaining):
+            # the handler skips the rest of the file, the rest of the hunk is read without keeping it
+            read_line, pending = self._read_hunk_lines(lookahead, lines, max_changes, max_line_length)
+            return line if read_line is None else read_line, pending
+
+        if old_remaining or new_remaining:
+            self._malformed_hunk()
+
+        return line, pending
+
+    @staticmethod
+    def _file_header_follows(line, lookahead, lines):
+        # "--- name", "+++ name" then "@@": the next file, a hunk line can't start with @@
+        if not line.startswith(OLD_FILE_NAME_HEADER):
+            return False
+
+        if len(lookahead) < 2:
+            lookahead.extend(islice(lines, 2 - len(lookahead)))
+
+        return len(lookahead) == 2 and lookahead[0].startswith(NEW_FILE_NAME_HEADER) and \
+            lookahead[1].startswith(HUNK_HEADER_PREFIX)
+
+    def _read_hunk_lines(self, lookahead, lines, max_changes, max_line_length):
+        # as _read_hunk, for combined diffs and the options working line by line
+        remaining = self.hunk_remaining
+        columns = len(remaining) - 1
+        line = pending = None
+
+        while any(remaining):
+            next_line = lookahead.pop(0) if lookahead else next(lines, None)
+            if next_line is None:
+                break
+
+            if next_line.startswith(LINE_TYPE_NO_NEWLINE):
+                self._mark_no_newline()
+                continue
+
+            # the sides holding the line: a removed line is in the parents marked with '-', any other line
+            # in the parents where it isn't marked as added, and in the new file
+            prefix = next_line[:columns] or LINE_TYPE_CONTEXT * columns
+            if LINE_TYPE_REMOVED in prefix:
+                sides = [column == LINE_TYPE_REMOVED for column in prefix] + [False]
+            else:
+                sides = [column != LINE_TYPE_ADDED for column in prefix] + [True]
+
+            if len(prefix) < columns or prefix.strip(' +-') or \
+                    any(side and not count for side, count in zip(sides, remaining)) or \
+                    self._file_header_follows(next_line, lookahead, lines):
+                pending = next_line
+                break
+
+            remaining = [count - side for count, side in zip(remaining, sides)]
+            line = next_line or prefix
+            if not (self.current_file.is_too_big or self.skip_file or
+                    self._too_big(line, max_changes, max_line_length)):
+                self._create_line(line)
+
+        if self.hunk_remaining is not None:
+            self.hunk_remaining = remaining
+            if any(remaining):
+                self._malformed_hunk()
+
+        return line, pending
+
+    def _ignore_whitespace(self, line, line_type, current_line):
+        """Count the line ignoring whitespace changes, return the line to add to the block.
+
+        The removed lines of a change come first, an added line equal to one of
+        them once normalized cancels it out. Pairs keep the order of the lines:
+        an added line is only paired with a removed line after the last paired
+        one, reordered lines stay changes.
+        """
+        if line_type == LINE_TYPE_CONTEXT:
+            self._reset_whitespace_changes()
+            return current_line
+
+        key = whitespace_key(line[1:], self._get_option('ignore_whitespace'))
+        if line_type == LINE_TYPE_REMOVED:
+            self.current_file.deleted_lines_ignoring_whitespace += 1
+            self.whitespace_changes.setdefault(key, []).append((self.whitespace_removed, current_line))
+            self.whitespace_removed += 1
+            return current_line
+
+        # (position, line) pairs in the order of the removed lines
+        removed_lines = self.whitespace_changes.get(key)
+        while removed_lines and removed_lines[0][0] < self.whitespace_matched:
+            removed_lines.pop(0)
+
+        if not removed_lines:
+            self.current_file.added_lines_ignoring_whitespace += 1
+            return current_line
+
+        self.whitespace_matched, removed_line = removed_lines.pop(0)
+        self.current_file.deleted_lines_ignoring_whitespace -= 1
+        if removed_line is None or not self._get_option('drop_whitespace_changes'):
+            return current_line
+
+        # the removed line becomes a context line with the new content: the lines added since the removed
+        # line go before it and the lines removed after it go after it, both line numbers stay in order
+        block = self.current_block
+        for index in range(len(block) - 1, -1, -1):
+            if block[index] is removed_line:
+                tail = block[index + 1:]
+                block[index:] = [tail_line for tail_line in tail if tail_line.line_type == LINE_TYPE_ADDED]
+                block.append(UdiffLine(content=LINE_TYPE_CONTEXT + line[1:], line_type=LINE_TYPE_CONTEXT,
+                                       source_line_no=removed_line.source_line_no,
+                                       target_line_no=current_line.target_line_no))
+                block.extend(tail_line for tail_line in tail if tail_line.line_type != LINE_TYPE_ADDED)
+                break
+
+        return None
+
+    def _reset_whitespace_changes(self):
+        self.whitespace_changes = {}
+        self.whitespace_removed = 0
+        self.whitespace_matched = -1
+
+    def _scan(self, content):
+        """Yield the diff lines one by one with line endings normalized.
+
+        `content` is either a string or an iterable of string chunks (a file
+        object for instance), so the parser never needs the whole diff split in
+        memory.
+        """
+        return self._split_lines(content)
+
+    def _split_lines(self, content):
+        encoding = self._get_option('encoding')
+        decode = None
+        if encoding:
+            import codecs
+            decode = codecs.getincrementaldecoder(encoding)().decode
+
+        chunks = [content] if isinstance(content, (bytes, basestring)) else content
+        pending = ''
+
+        for chunk in chunks:
+            if decode is not None and isinstance(chunk, bytes):
+                chunk = decode(chunk)
+
+            if pending:
+                chunk = pending + chunk
+                pending = ''
+
+            if '\r' not in chunk:
+                # the rest of the last line may come with the next chunk
+                lines = chunk.split('\n')
+                pending = lines.pop()
+                for line in lines:
+                    yield line
+
+                continue
+
+            size = len(chunk)
+            for match in RE_LINE.finditer(chunk):
+                line, line_end = match.groups()
+
+                # chunks don't have to end on a line break, the rest of the line
+                # (or the \n of a \r\n) may come with the next one
+                if not line_end or (line_end == '\r' and match.end() == size):
+                    pending = line + line_end
+                    break
+
+                yield line
+
+        if pending:
+            yield pending.rstrip('\r')
+
+    def _mark_no_newline(self):
+        if self.current_block:
+            self.current_block[-1].no_newline = True
 
     def _parse(self, diff):
-        self.diff = diff
+        for file in self._iter_parse(diff):
+            self.append(file)
+
+        return self
+
+    def _iter_parse(self, diff):
+        """Parse the diff, yielding every file as soon as it is complete."""
+        lines = self._scan(diff)
+        lookahead = []
+        line = ''
+
+        # looked up once, not for every line
+        max_changes = self._get_option('diff_max_changes')
+        max_line_length = self._get_option('diff_max_line_length')
+        strip_separators = self._get_option('strip_separators')
+
+        ignore_whitespace = self._get_option('ignore_whitespace')
+        if ignore_whitespace and ignore_whitespace not in (IGNORE_WHITESPACE_ALL, IGNORE_WHITESPACE_CHANGE):
+            # checked before parsing, a diff without changed lines would hide the mistake
+            whitespace_key('', ignore_whitespace)
+
+        self.intern_pool = self._get_option('intern')
+        if self.intern_pool is False:
+            self.intern_pool = None
+        elif self.intern_pool is True:
+            from udiff.interning import UdiffInternPool
+            self.intern_pool = UdiffInternPool()
+
+        while True:
+            # keep the current line and the two following ones for the header checks
+            if len(lookahead) < 3:
+                lookahead.extend(islice(lines, 3 - len(lookahead)))
+
+            if not lookahead:
+                break
+
+            prev_line, line = line, lookahead.pop(0)
+            next_line = lookahead[0] if lookahead else ''
+            after_next_line = lookahead[1] if len(lookahead) > 1 else ''
 
-        for line_no, line in enumerate(self.diff):
             if not line or line.startswith('*'):
                 continue
 
-            prev_line = diff[line_no - 1] if line_no - 1 >= 0 else ''
-            next_line = diff[line_no + 1] if line_no + 1 <= len(diff) - 1 else ''
-            after_next_line = diff[line_no + 2] if line_no + 2 <= len(diff) - 1 else ''
+            # banners only, a removed '---------' line in a hunk body is content
+            if strip_separators and line[:1] in ('-', '=') and \
+                    (self.current_block is None or self.hunk_remaining is not None) and \
+                    RE_SEPARATOR_LINE.match(line):
+                continue
+
+            # \ No newline at end of file
+            if line.startswith(LINE_TYPE_NO_NEWLINE):
+                self._mark_no_newline()
+                continue
 
             if line.startswith('diff'):
-                self._start_file()
+                saved_file = self._start_file()
+                if saved_file is not None:
+                    yield saved_file
 
                 # diff --git a / blocked_delta_results.png b / blocked_delta_results.png
                 is_git_diff_start = RE_GIT_DIFF_START.match(line)
+                if is_git_diff_start and self.handler is not None:
+                    self._notify('on_header', 'git_diff', is_git_diff_start)
+
                 if is_git_diff_start:
                     self.possible_old_name = self._get_filename(is_git_diff_start.group(1), extra_prefix=self._get_option('dst_prefix'))
                     self.possible_new_name = self._get_filename(is_git_diff_start.group(2), extra_prefix=self._get_option('src_prefix'))
@@ -524,28 +1133,14 @@ class UdiffParser(list):
                         after_next_line.startswith(HUNK_HEADER_PREFIX)
                     ):
 
-                self._start_file()
+                saved_file = self._start_file()
+                if saved_file is not None:
+                    yield saved_file
 
-            if self.current_file.is_too_big:
+            if self.current_file.is_too_big or self.skip_file:
                 continue
 
-            if self.current_file is not None and (
-                    (
-                        self._get_option('diff_max_changes') and
-                        self.current_file.added_lines + self.current_file.deleted_lines > self._get_option(
-                        'diff_max_changes')
-                    ) or (
-                        self._get_option('diff_max_line_length') and len(line) > self._get_option(
-                        'diff_max_line_length')
-                    )):
-                self.current_file.is_too_big = True
-                self.current_file.added_lines = 0
-                self.current_file.deleted_lines = 0
-                self.current_file[:] = []
-                self.current_block = None
-
-                self._start_block(self._get_option('diff_too_big_message') if self._get_option(
-                    'diff_too_big_message') else 'Diff too big to be displayed')
+            if self.current_file is not None and self._too_big(line, max_changes, max_line_length):
                 continue
 
             # We need to make sure that we have the three lines of the header.
@@ -559,6 +1154,9 @@ class UdiffParser(list):
                 # --- 2002-02-21 23:30:39.942229878 -0800
                 if self.current_file is not None and not self.current_file.old_name and line.startswith(
                         OLD_FILE_NAME_HEADER) and src_filename:
+                    if self.handler is not None:
+                        self._notify('on_header', 'old_file', filename_regex('---').match(line))
+
                     self.current_file.old_name = src_filename
                     self.current_file.language = self._get_extension(self.current_file.old_name)
                     continue
@@ -567,6 +1165,9 @@ class UdiffParser(list):
                 # +++ 2002-02-21 23:30:39.942229878 -0800
                 if self.current_file is not None and not self.current_file.new_name and line.startswith(
                         NEW_FILE_NAME_HEADER) and dst_filename:
+                    if self.handler is not None:
+                        self._notify('on_header', 'new_file', filename_regex('+++').match(line))
+
                     self.current_file.new_name = dst_filename
                     self.current_file.language = self._get_extension(self.current_file.new_name)
                     continue
@@ -582,6 +1183,15 @@ class UdiffParser(list):
                         )
                     ):
                 self._start_block(line)
+
+                # the body of the hunk as its header counts it, without looking for file headers
+                if self.hunk_remaining and any(self.hunk_remaining):
+                    read_line, pending = self._read_hunk(lookahead, lines, max_changes, max_line_length)
+                    if read_line is not None:
+                        line = read_line
+                    if pending is not None:
+                        lookahead.insert(0, pending)
+
                 continue
 
             # There are three types of diff lines. These lines are defined by the way they start.
@@ -590,35 +1200,24 @@ class UdiffParser(list):
             # 3. Context line starts with: <SPACE>
             if self.current_block is not None and \
                     (line.startswith('+') or line.startswith('-') or line.startswith(' ')):
+                if self.hunk_remaining is not None:
+                    # more lines than the header counts
+                    self._malformed_hunk()
+
                 self._create_line(line)
                 continue
 
-            is_hunk_header_does_not_exist = not self._exist_hunk_header(line, line_no)
-
             if self.current_file is None:
                 raise UdiffParseError('Where is my file !!!')
 
             # Git diffs provide more information regarding files modes, renames, copies,
             # commits between changes and similarity indexes
-            for exp in [RE_OLD_MODE,
-                        RE_NEW_MODE,
-                        RE_DELETED_FILE_MODE,
-                        RE_NEW_FILE_MODE,
-                        RE_COPY_FROM,
-                        RE_COPY_TO,
-                        RE_RENAME_FROM,
-                        RE_RENAME_TO,
-                        RE_SIMILARITY_INDEX,
-                        RE_DISSIMILARITY_INDEX,
-                        RE_INDEX,
-                        RE_BINARY_FILES,
-                        RE_BINARY_DIFF,
-                        RE_COMBINED_INDEX,
-                        RE_COMBINED_MODE,
-                        RE_COMBINED_NEW_FILE,
-                        RE_COMBINED_DELETED_FILE]:
+            for kind, exp in HEADERS:
                 matches = exp.match(line)
                 if matches:
+                    if self.handler is not None:
+                        self._notify('on_header', kind, matches)
+
                     if exp == RE_OLD_MODE:
                         self.current_file.old_mode = matches.group(1)
 
@@ -634,23 +1233,21 @@ class UdiffParser(list):
                         self.current_file.is_new = True
 
                     elif exp == RE_COPY_FROM:
-                        if is_hunk_header_does_not_exist:
-                            self.current_file.old_name = matches.group(1)
+                        # names from the ---/+++ headers take precedence, see _save_file
+                        self.possible_old_name = matches.group(1)
                         self.current_file.is_copy = True
 
                     elif exp == RE_COPY_TO:
-                        if is_hunk_header_does_not_exist:
-                            self.current_file.new_name = matches.group(1)
+                        self.possible_new_name = matches.group(1)
                         self.current_file.is_copy = True
 
                     elif exp == RE_RENAME_FROM:
-                        if is_hunk_header_does_not_exist:
-                            self.current_file.old_name = matches.group(1)
+                        # names from the ---/+++ headers take precedence, see _save_file
+                        self.possible_old_name = matches.group(1)
                         self.current_file.is_rename = True
 
                     elif exp == RE_RENAME_TO:
-                        if is_hunk_header_does_not_exist:
-                            self.current_file.new_name = matches.group(1)
+                        self.possible_new_name = matches.group(1)
                         self.current_file.is_rename = True
 
                     elif exp == RE_BINARY_FILES:
@@ -678,12 +1275,12 @@ class UdiffParser(list):
                             self.current_file.mode = matches.group(3)
 
                     elif exp == RE_COMBINED_INDEX:
-                        self.current_file.checksum_before = [matches.group(2), matches.group(3)]
-                        self.current_file.checksum_after = matches.group(1)
+                        self.current_file.checksum_before = [matches.group(1), matches.group(2)]
+                        self.current_file.checksum_after = matches.group(3)
 
                     elif exp == RE_COMBINED_MODE:
-                        self.current_file.old_mode = [matches.group(2), matches.group(3)]
-                        self.current_file.new_mode = matches.group(1)
+                        self.current_file.old_mode = [matches.group(1), matches.group(2)]
+                        self.current_file.new_mode = matches.group(3)
 
                     elif exp == RE_COMBINED_NEW_FILE:
                         self.current_file.new_file_mode = matches.group(1)
@@ -693,10 +1290,17 @@ class UdiffParser(list):
                         self.current_file.deleted_file_mode = matches.group(1)
                         self.current_file.is_deleted = True
 
-        self._save_block()
-        self._save_file()
+                    # "new file mode" also matches the combined diff regex, it says the same
+                    break
 
-        return self
+        self._save_block()
+        saved_file = self._save_file()
+        # the parsed lines keep their strings, the pool of the parser isn't needed anymore
+        self.intern_pool = None
+        # nor the hash of the last file, which can't be pickled back from a process pool
+        self.current_patch_id = None
+        if saved_file is not None:
+            yield saved_file
 
     @staticmethod
     def _convert_string(data, encoding=None, errors='strict'):
@@ -707,17 +1311,101 @@ class UdiffParser(list):
         return data
 
     @classmethod
-    def from_filename(cls, filename, encoding=DEFAULT_ENCODING, options=None, errors=None):
-        """Return a UdiffParser instance given a diff filename."""
-        with open_file(filename, 'r', encoding=encoding, errors=errors) as f:
-            instance = cls(f.read(), options=options)
-        return instance
+    def from_filename(cls, filename, encoding=DEFAULT_ENCODING, options=None, errors=None, background=False):
+        """Return a UdiffParser instance given a diff filename.
+
+        gzip, bz2 and xz compressed files are decompressed while they are
+        parsed, by another thread with `background`.
+        """
+        from udiff.streams import iter_diff_text
+        return cls(iter_diff_text(filename, encoding, errors or 'strict', background), options=options)
+
+    @classmethod
+    def iter_filename(cls, filename, encoding=DEFAULT_ENCODING, options=None, errors=None, background=False):
+        """Yield the UdiffFile instances of a diff file one by one, as `iter_files`, see `from_filename`."""
+        from udiff.streams import iter_diff_text
+        return cls.iter_files(iter_diff_text(filename, encoding, errors or 'strict', background), options=options)
 
     @classmethod
     def from_string(cls, data, encoding=None, options=None, errors='strict'):
         """Return a UdiffParser instance given a diff string."""
         return cls(cls._convert_string(data, encoding, errors), options=options)
 
+    @classmethod
+    def iter_files(cls, content, options=None):
+        """Yield the UdiffFile instances of a diff one by one, without keeping them.
+
+        `content` is a string or an iterable of string chunks, memory stays
+        bounded by the biggest file of the diff.
+        """
+        parser = cls([], options=options)
+        return parser._iter_parse(content)
+
+    def to_sqlite(self, conn, diff_id=None, lines=False):
+        """Insert the diff into the SQLite connection `conn` as `diff_id`, return its id in the diffs table.
+
+        See `udiff.sqlite`, `load_diffs` loads many diffs at once.
+        """
+        from udiff.sqlite import load_diffs
+        return load_diffs(conn, [(diff_id, self)], lines=lines)
+
+    def directories(self):
+        """Return a UdiffDirectoryTree of the statistics of the files by directory."""
+        from udiff.directories import UdiffDirectoryTree
+        return UdiffDirectoryTree(self)
+
+    def moved_blocks(self, min_chars=20, ignore_whitespace=False):
+        """Return the UdiffMovedBlock of the removed lines added back elsewhere, see udiff.moved.detect_moves."""
+        from udiff.moved import detect_moves
+        return detect_moves(self, min_chars=min_chars, ignore_whitespace=ignore_whitespace)
+
+    def find_renames(self, threshold=50, copies=False):
+        """Pair the deleted and added files by content in place, see udiff.renames.find_renames."""
+        from udiff.renames import find_renames
+        self[:] = find_renames(self, threshold=threshold, copies=copies)
+        return self
+
+    @classmethod
+    def parse_events(cls, content, handler, options=None):
+        """Parse a diff calling the methods of a UdiffHandler, return the handler.
+
+        Neither the files nor, unless `handler.build_lines` is set, their lines
+        are kept, memory stays constant.
+        """
+        options = dict(options or {})
+        options.setdefault('stat_only', not handler.build_lines)
+
+        parser = cls([], options=options)
+        parser.handler = handler
+        for file in parser._iter_parse(content):
+            pass
+
+        return handler
+
+    def invert(self):
+        """Swap the sides of every file diff in place, for reverts."""
+        for file in self:
+            file.invert()
+
+        return self
+
+    def write(self, out, src_prefix='a/', dst_prefix='b/'):
+        """Write the diff as unified diff text to the file-like object `out`."""
+        from udiff.writer import write_diff
+        write_diff(self, out, src_prefix, dst_prefix)
+
+    def apply_to(self, directory, fuzz=0, max_offset=None, workers=None, encoding=DEFAULT_ENCODING):
+        """Apply the diff to the files under `directory`, return a UdiffApplyResult per file.
+
+        Files are read, patched and written by a pool of `workers` threads,
+        files touching the same paths are handled in order by the same worker.
+        A file is only written when all of its hunks applied, see
+        UdiffFile.apply for `fuzz` and `max_offset`.
+        """
+        from udiff.apply import apply_to_directory
+        return apply_to_directory(self, directory, fuzz=fuzz, max_offset=max_offset, workers=workers,
+                                  encoding=encoding)
+
     @property
     def added_files(self):
         """Return added files as a list."""
@@ -0,0 +1,103 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Stable patch ids, to find the same change in different commits (cherry-picks, backports).
+
+As `git patch-id --stable`, the id of a file diff only depends on its paths
+and its added and removed lines without whitespace, line numbers and hunk
+boundaries are ignored. The id of a diff is the sum of the ids of its files,
+so it doesn't depend on the file order either.
+"""
+
+from __future__ import unicode_literals
+
+import hashlib
+
+from udiff.commits import iter_log_commits
+from udiff.parser import DEFAULT_ENCODING, UdiffParser
+
+
+PATCH_ID_BITS = 160
+
+
+def _bytes(value):
+    return value if isinstance(value, bytes) else value.encode(DEFAULT_ENCODING)
+
+
+def file_patch_id(file, lines_hash):
+    """Return the patch id of a file diff given the hash of its lines, see `patch_id_line`."""
+    digest = hashlib.sha1()
+    digest.update(_bytes(file.old_name or '') + b'\0' + _bytes(file.new_name or '') + b'\0')
+
+    if file.is_binary:
+        # the content of binary files is only known by its checksums
+        for checksum in (file.checksum_before, file.checksum_after):
+            checksum = ','.join(checksum) if isinstance(checksum, list) else checksum or ''
+            digest.update(_bytes(checksum) + b'\0')
+
+    digest.update(lines_hash.digest())
+    return digest.hexdigest()
+
+
+def diff_patch_id(files):
+    """Return the patch id of a diff given its UdiffFile instances, None when none of them has one."""
+    total = None
+    for file in files:
+        if file.patch_id is not None:
+            total = ((total or 0) + int(file.patch_id, 16)) % (1 << PATCH_ID_BITS)
+
+    return '%040x' % total if total is not None else None
+
+
+def commit_patch_id(arguments):
+    """Return the (sha, patch id) of a (sha, diff text, with context) commit."""
+    sha, diff, context = arguments
+    parser = UdiffParser(diff, options={'stat_only': True, 'patch_id': True, 'patch_id_context': context})
+    return sha, parser.patch_id
+
+
+def iter_patch_ids(content, context=False, processes=None, encoding=None, chunksize=64):
+    """Yield the (sha, patch id) of every commit of a `git log -p` output, in order.
+
+    `content` is a string or an iterable of string chunks (a file object, the
+    stdout of git). The patch id of a commit without diff is None. When
+    `processes` is given the commits are hashed by a pool of processes.
+    """
+    commits = ((commit.sha, diff, context) for commit, diff in iter_log_commits(content, encoding))
+
+    if not processes:
+        for commit in commits:
+            yield commit_patch_id(commit)
+
+        return
+
+    from multiprocessing import Pool
+
+    pool = Pool(processes)
+    try:
+        for result in pool.imap(commit_patch_id, commits, chunksize=chunksize):
+            yield result
+    finally:
+        pool.terminate()
+        pool.join()
@@ -0,0 +1,225 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Rename and copy detection for diffs without git metadata (`diff -ruN`, other version control systems).
+
+Deleted and added files are paired by the similarity of their lines: files
+with the same content first, then candidates found by locality sensitive
+hashing of MinHash sketches, verified by counting their common lines.
+"""
+
+from __future__ import unicode_literals
+
+import hashlib
+import posixpath
+import struct
+from collections import Counter
+
+from udiff.constants import DEFAULT_ENCODING, LINE_TYPE_ADDED, LINE_TYPE_CONTEXT, LINE_TYPE_REMOVED
+from udiff.files import cut_hunks, is_added_file, is_deleted_file, make_block, set_attribute
+from udiff.parser import UdiffFile, UdiffParser
+
+
+HASH = struct.Struct('<Q')
+
+
+def _lines(file, line_type):
+    return [line for block in file for line in block if line.line_type == line_type]
+
+
+def _hash(text):
+    # the same in every process, hash() of a string changes with PYTHONHASHSEED
+    return HASH.unpack_from(hashlib.md5(text.encode(DEFAULT_ENCODING)).digest())[0]
+
+
+def _sketch(texts, bands, rows):
+    # one permutation MinHash: the hash of a line picks a bin and keeps its minimum
+    size = bands * rows
+    bins = [None] * size
+    for text in set(texts):
+        value = _hash(text)
+        index, value = value % size, value // size
+        if bins[index] is None or value < bins[index]:
+            bins[index] = value
+
+    if None not in bins:
+        return [tuple(bins[band * rows:(band + 1) * rows]) for band in range(bands)]
+
+    # small files leave bins empty, they borrow the next filled one so that they don't all match each other
+    sketch = list(bins)
+    nearest = None
+    for position in range(2 * size - 1, -1, -1):
+        if bins[position % size] is not None:
+            nearest = position
+        elif position < size and nearest is not None:
+            sketch[position] = (bins[nearest % size], nearest - position)
+
+    return [tuple(sketch[band * rows:(band + 1) * rows]) for band in range(bands)]
+
+
+def similarity(old_texts, new_texts):
+    """Return the percentage of the lines of the biggest side found on the other one."""
+    if not old_texts or not new_texts:
+        return 0
+
+    old_counts, new_counts = Counter(old_texts), Counter(new_texts)
+    if len(old_counts) > len(new_counts):
+        old_counts, new_counts = new_counts, old_counts
+
+    common = sum(min(count, new_counts[text]) for text, count in old_counts.items())
+    return common * 100 // max(len(old_texts), len(new_texts))
+
+
+def _paired_file(deleted, added, score, is_copy, context):
+    old_lines = _lines(deleted, LINE_TYPE_REMOVED)
+    new_lines = _lines(added, LINE_TYPE_ADDED)
+
+    from difflib import SequenceMatcher
+
+    def ops():
+        matcher = SequenceMatcher(None, [line.content[1:] for line in old_lines],
+                                  [line.content[1:] for line in new_lines], autojunk=False)
+        for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+            if tag == 'equal':
+                for line in new_lines[new_start:new_end]:
+                    yield LINE_TYPE_CONTEXT, line.content[1:], 1, line.no_newline
+                continue
+
+            for line in old_lines[old_start:old_end]:
+                yield LINE_TYPE_REMOVED, line.content[1:], 1, line.no_newline
+            for line in new_lines[new_start:new_end]:
+                yield LINE_TYPE_ADDED, line.content[1:], 1, line.no_newline
+
+    result = UdiffFile()
+    for lines in cut_hunks(ops(), context):
+        result.append(make_block(lines))
+
+    result.added_lines = sum(block.added for block in result)
+    result.deleted_lines = sum(block.removed for block in result)
+
+    set_attribute(result, 'old_name', deleted.old_name)
+    set_attribute(result, 'new_name', added.new_name)
+    set_attribute(result, 'language', UdiffParser._get_extension(added.new_name))
+    set_attribute(result, 'is_git_diff', deleted.is_git_diff or added.is_git_diff)
+    set_attribute(result, 'is_copy', is_copy)
+    set_attribute(result, 'is_rename', not is_copy)
+    set_attribute(result, 'unchanged_percentage', score)
+
+    if deleted.deleted_file_mode != added.new_file_mode:
+        set_attribute(result, 'old_mode', deleted.deleted_file_mode)
+        set_attribute(result, 'new_mode', added.new_file_mode)
+
+    return result
+
+
+def _candidates(deleted, added, bands, rows, max_bucket):
+    buckets = {}
+    for index, (file, texts) in enumerate(deleted):
+        for band, key in enumerate(_sketch(texts, bands, rows)):
+            bucket = buckets.setdefault((band, key), [])
+            # files sharing most of their lines are in the same buckets, a crowded one isn't worth more pairs
+            if len(bucket) < max_bucket:
+                bucket.append(index)
+
+    pairs = set()
+    for new_index, (file, texts) in enumerate(added):
+        for band, key in enumerate(_sketch(texts, bands, rows)):
+            for old_index in buckets.get((band, key), ()):
+                pairs.add((old_index, new_index))
+
+    return pairs
+
+
+def find_renames(files, threshold=50, copies=False, context=3, bands=32, rows=3, max_bucket=64):
+    """Pair the deleted and added files of a diff by content, return the list of files with the pairs merged.
+
+    A pair needs `threshold` percent of the lines of its biggest file in
+    common, see `similarity`. Every deleted file is renamed to at most one
+    added file, the most similar one (then the one with the same base name).
+    With `copies`, the other added files similar enough to a deleted file are
+    copies of it. The merged files have `is_rename` or `is_copy` and the
+    `unchanged_percentage` set, their hunks are computed from the lines of the
+    pair with `context` lines of context.
+
+    `bands` bands of `rows` MinHash values find the candidate pairs, 32 bands
+    of 3 values find most pairs with a third of their distinct lines in
+    common; a band shared by more than `max_bucket` files only pairs the
+    first ones.
+    """
+    files = list(files)
+    deleted = []
+    added = []
+    for file in files:
+        if file.is_combined or file.is_binary or file.is_too_big:
+            continue
+
+        if is_deleted_file(file):
+            texts = [line.content[1:] for line in _lines(file, LINE_TYPE_REMOVED)]
+            if texts:
+                deleted.append((file, texts))
+
+        elif is_added_file(file):
+            texts = [line.content[1:] for line in _lines(file, LINE_TYPE_ADDED)]
+            if texts:
+                added.append((file, texts))
+
+    # the files with the same content don't need sketches
+    scores = []
+    by_content = {}
+    for index, (file, texts) in enumerate(deleted):
+        by_content.setdefault(tuple(texts), []).append(index)
+
+    exact = set()
+    for new_index, (file, texts) in enumerate(added):
+        for old_index in by_content.get(tuple(texts), ())[:max_bucket]:
+            scores.append((100, old_index, new_index))
+            exact.add(new_index)
+
+    remaining = [(index, item) for index, item in enumerate(added) if index not in exact]
+    for old_index, new_index in _candidates(deleted, [item for index, item in remaining], bands, rows, max_bucket):
+        new_index = remaining[new_index][0]
+        score = similarity(deleted[old_index][1], added[new_index][1])
+        if score >= threshold:
+            scores.append((score, old_index, new_index))
+
+    def same_basename(score):
+        return posixpath.basename(deleted[score[1]][0].old_name) == posixpath.basename(added[score[2]][0].new_name)
+
+    scores.sort(key=lambda score: (-score[0], not same_basename(score), score[1], score[2]))
+
+    renamed = {}
+    sources = {}
+    for score, old_index, new_index in scores:
+        if new_index in sources or (old_index in renamed and not copies):
+            continue
+
+        sources[new_index] = (old_index, score, old_index in renamed)
+        renamed.setdefault(old_index, new_index)
+
+    replaced = {}
+    for new_index, (old_index, score, is_copy) in sources.items():
+        replaced[id(added[new_index][0])] = _paired_file(deleted[old_index][0], added[new_index][0], score, is_copy, context)
+
+    gone = set(id(deleted[old_index][0]) for old_index in renamed)
+    return [replaced.get(id(file), file) for file in files if id(file) not in gone]
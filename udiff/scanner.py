@@ -0,0 +1,208 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Scanning the added lines of a diff for many patterns at once, secrets or banned APIs for instance."""
+
+from __future__ import unicode_literals
+
+import re
+
+
+def _repeat_minimum(pattern, index):
+    # {m}, {m,} or {m,n} after a token, return its minimum and the index after it
+    end = pattern.find('}', index)
+    if end == -1:
+        return None, index
+
+    minimum = pattern[index + 1:end].split(',')[0]
+    return (int(minimum) if minimum.isdigit() else 0), end + 1
+
+
+def required_literals(pattern):
+    """Return the texts every match of the regex `pattern` contains, in the order of the pattern.
+
+    Only the top level of the pattern is looked at, groups and character
+    classes end a literal; an alternation or inline flags at the top level
+    leave no literal.
+    """
+    literals = []
+    run = ''
+    depth = 0
+    index = 0
+
+    while index < len(pattern):
+        char = pattern[index]
+        token = None
+
+        if char == '\\':
+            escaped = pattern[index + 1:index + 2]
+            index += 2
+            if escaped and not escaped.isalnum():
+                token = escaped
+
+        elif char == '[':
+            index += 1
+            if pattern[index:index + 1] == '^':
+                index += 1
+            if pattern[index:index + 1] == ']':
+                index += 1
+            while index < len(pattern) and pattern[index] != ']':
+                index += 2 if pattern[index] == '\\' else 1
+            index += 1
+
+        elif char == '(':
+            if depth == 0 and pattern[index + 1:index + 2] == '?' and pattern[index + 2:index + 3].isalpha():
+                # (?i), (?x)...
+                return []
+            depth += 1
+            index += 1
+
+        elif char == ')':
+            depth -= 1
+            index += 1
+
+        elif char == '|':
+            if depth == 0:
+                return []
+            index += 1
+
+        elif char in '.^$*+?{}':
+            index += 1
+
+        else:
+            token = char
+            index += 1
+
+        if token is None or depth:
+            # the repeat of a class, an escape, '.' or a group holds no literal, its digits neither
+            if pattern[index:index + 1] == '{':
+                index = _repeat_minimum(pattern, index)[1]
+            literals.append(run)
+            run = ''
+            continue
+
+        quantifier = pattern[index:index + 1]
+        if quantifier in ('*', '?'):
+            literals.append(run)
+            run = ''
+        elif quantifier == '{':
+            minimum, index = _repeat_minimum(pattern, index)
+            literals.append(run + token if minimum else run)
+            run = ''
+        elif quantifier == '+':
+            literals.append(run + token)
+            run = ''
+        else:
+            run += token
+
+    literals.append(run)
+    return [literal for literal in literals if literal]
+
+
+def required_literal(pattern):
+    """Return the longest text every match of the regex `pattern` contains, '' when none is found."""
+    return max(required_literals(pattern) or [''], key=len)
+
+
+def trie_regex(literals):
+    """Return a regex matching any of `literals`, with the branches shared as in a trie.
+
+    The regex engine only follows the branches matching the text, one search
+    costs about the same with 5 or 500 literals.
+    """
+    trie = {}
+    for literal in literals:
+        node = trie
+        for char in literal:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def node_regex(node):
+        branches = [re.escape(char) + node_regex(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+
+        regex = branches[0] if len(branches) == 1 else '(?:%s)' % '|'.join(branches)
+        return '(?:%s)?' % regex if '' in node else regex
+
+    return node_regex(trie)
+
+
+class UdiffScanner(object):
+    """A set of regexes compiled once, to scan diff lines for all of them at once.
+
+    The text every match of a regex contains is looked for first: a single
+    search for all of them tells which lines need the regexes. Regexes
+    without such a text (shorter than `min_literal` characters) are searched
+    in every line.
+    """
+
+    def __init__(self, patterns, min_literal=3):
+        super(UdiffScanner, self).__init__()
+        self.patterns = []
+        self.literals = {}
+        self.unfiltered = []
+
+        for pattern_id, pattern in (patterns.items() if hasattr(patterns, 'items') else patterns):
+            regex = pattern if hasattr(pattern, 'search') else re.compile(pattern)
+            literal = '' if regex.flags & (re.IGNORECASE | re.VERBOSE) else required_literal(regex.pattern)
+
+            if len(literal) >= min_literal:
+                self.literals.setdefault(literal, []).append(len(self.patterns))
+            else:
+                self.unfiltered.append(len(self.patterns))
+
+            self.patterns.append((pattern_id, regex))
+
+        self.prefilter = re.compile(trie_regex(self.literals)) if self.literals else None
+
+    def __repr__(self):
+        return '<UdiffScanner: %d patterns>' % len(self.patterns)
+
+    def scan_line(self, text):
+        """Return the ids of the patterns found in `text`, in the order of the patterns."""
+        found = [index for index in self.unfiltered if self.patterns[index][1].search(text)]
+
+        if self.prefilter is not None and self.prefilter.search(text):
+            for literal, indexes in self.literals.items():
+                if literal in text:
+                    found.extend(index for index in indexes if self.patterns[index][1].search(text))
+
+            found.sort()
+
+        return [self.patterns[index][0] for index in found]
+
+    def scan(self, content, options=None):
+        """Yield the (path, target line number, pattern id) of the patterns found in the added lines of a diff.
+
+        `content` is parsed file by file, without creating the diff lines.
+        """
+        from udiff.parser import UdiffParser
+
+        options = dict(options or {}, scanner=self)
+        options.setdefault('stat_only', True)
+
+        for file in UdiffParser.iter_files(content, options=options):
+            for target_line_no, pattern_id in file.scan_matches:
+                yield file.path, target_line_no, pattern_id
@@ -0,0 +1,291 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+"""A trigram index over the added and removed lines of many diffs, for searching code changes.
+
+Every indexed line is stored with its diff id, path, type and line number,
+and listed under every trigram of its lowercased text. A regex query only
+reads the lines containing all the trigrams of the literals the regex
+requires, then checks them with the regex itself.
+
+The index is a directory of segments, each `add` is buffered and `flush`
+writes the buffer as a new segment, so an index can grow while it is
+searched. A segment is only visible once its terms table is written.
+"""
+
+from __future__ import unicode_literals
+
+import json
+import mmap
+import os
+import struct
+import zlib
+from array import array
+from collections import namedtuple
+
+from udiff.constants import DEFAULT_ENCODING, LINE_TYPE_ADDED, LINE_TYPE_REMOVED
+
+
+SEGMENT_PREFIX = 'segment-'
+OFFSET = struct.Struct('<Q')
+MAX_QUERY_TRIGRAMS = 8
+
+UdiffSearchHit = namedtuple('UdiffSearchHit', ['diff_id', 'path', 'line_type', 'line_no', 'text'])
+
+
+def trigrams(text):
+    """Return the set of trigrams of the lowercased `text`."""
+    text = text.lower()
+    return set(text[index:index + 3] for index in range(len(text) - 2))
+
+
+def encode_postings(line_ids):
+    """Compress an ascending list of line ids, as zlib compressed deltas."""
+    deltas = array('I', [line_ids[0]])
+    deltas.extend(line_id - previous for previous, line_id in zip(line_ids, line_ids[1:]))
+    return zlib.compress(deltas.tobytes() if hasattr(deltas, 'tobytes') else deltas.tostring())
+
+
+def decode_postings(data):
+    """Return the list of line ids compressed by `encode_postings`."""
+    deltas = array('I')
+    data = zlib.decompress(data)
+    deltas.frombytes(data) if hasattr(deltas, 'frombytes') else deltas.fromstring(data)
+
+    total = 0
+    line_ids = []
+    for delta in deltas:
+        total += delta
+        line_ids.append(total)
+
+    return line_ids
+
+
+def _write(path, data):
+    with open(path + '.tmp', 'wb') as out:
+        out.write(data)
+        out.flush()
+        os.fsync(out.fileno())
+
+    os.rename(path + '.tmp', path)
+
+
+class _Segment(object):
+    # a flushed segment: its lines, their offsets, the posting lists and the terms table
+
+    def __init__(self, path):
+        self.path = path
+        with open(path + '.terms', 'rb') as terms:
+            # trigram: (offset, length, count) in the postings file
+            self.terms = json.loads(terms.read().decode(DEFAULT_ENCODING))
+
+        self.files = [open(path + extension, 'rb') for extension in ('.lines', '.offsets', '.postings')]
+        self.lines, self.offsets, self.postings = [
+            mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(file.name) else b''
+            for file in self.files
+        ]
+
+    def close(self):
+        for data in (self.lines, self.offsets, self.postings):
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+        for file in self.files:
+            file.close()
+
+    def __len__(self):
+        return len(self.offsets) // OFFSET.size
+
+    def line(self, line_id):
+        start = OFFSET.unpack_from(self.offsets, line_id * OFFSET.size)[0]
+        end = self.lines.find(b'\n', start)
+        return json.loads(self.lines[start:end].decode(DEFAULT_ENCODING))
+
+    def iter_lines(self):
+        for line_id in range(len(self)):
+            yield self.line(line_id)
+
+    def candidates(self, query):
+        """Return the ids of the lines containing all the `query` trigrams, in order."""
+        terms = []
+        for trigram in query:
+            term = self.terms.get(trigram)
+            if term is None:
+                return []
+            terms.append(term)
+
+        # the rarest trigrams cut the most, reading the common ones costs more than it saves
+        terms.sort(key=lambda term: term[2])
+        line_ids = None
+        for offset, length, count in terms[:MAX_QUERY_TRIGRAMS]:
+            postings = decode_postings(self.postings[offset:offset + length])
+            line_ids = postings if line_ids is None else sorted(set(line_ids).intersection(postings))
+            if not line_ids:
+                return []
+
+        return line_ids
+
+
+class UdiffTrigramIndex(object):
+    """An on disk trigram index of the added and removed lines of diffs.
+
+    >>> with UdiffTrigramIndex('changes.index') as index:
+    ...     index.add('4f2a1c', UdiffParser.from_filename('4f2a1c.diff'))
+    >>> for hit in UdiffTrigramIndex('changes.index').search(r'eval\\('):
+    ...     print(hit.diff_id, hit.path, hit.line_no, hit.text)
+    """
+
+    def __init__(self, directory, buffer_lines=1000000):
+        self.directory = directory
+        self.buffer_lines = buffer_lines
+        self.segments = []
+        self.pending_lines = []
+        self.pending_postings = {}
+
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        self.reload()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return sum(len(segment) for segment in self.segments) + len(self.pending_lines)
+
+    def reload(self):
+        """Open the segments flushed since the index was opened, by this or another writer."""
+        known = set(segment.path for segment in self.segments)
+        for name in sorted(os.listdir(self.directory)):
+            if name.startswith(SEGMENT_PREFIX) and name.endswith('.terms'):
+                path = os.path.join(self.directory, name[:-len('.terms')])
+                if path not in known:
+                    self.segments.append(_Segment(path))
+
+    def add(self, diff_id, files):
+        """Index the added and removed lines of `files` (a UdiffParser or UdiffFile instances) as `diff_id`.
+
+        `diff_id` is a string or a number, a commit sha for instance.
+        """
+        for file in files:
+            path = file.path
+            for block in file:
+                for line in block:
+                    if line.line_type == LINE_TYPE_ADDED:
+                        line_no = line.target_line_no
+                    elif line.line_type == LINE_TYPE_REMOVED:
+                        line_no = line.source_line_no
+                    else:
+                        continue
+
+                    line_id = len(self.pending_lines)
+                    text = line.content[1:]
+                    self.pending_lines.append([diff_id, path, line.line_type, line_no, text])
+                    for trigram in trigrams(text):
+                        self.pending_postings.setdefault(trigram, []).append(line_id)
+
+        if len(self.pending_lines) >= self.buffer_lines:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered lines as a new segment."""
+        if not self.pending_lines:
+            return
+
+        self.reload()
+        numbers = [int(os.path.basename(segment.path)[len(SEGMENT_PREFIX):]) for segment in self.segments]
+        path = os.path.join(self.directory, '%s%06d' % (SEGMENT_PREFIX, max(numbers or [0]) + 1))
+
+        lines = []
+        offsets = []
+        position = 0
+        for line in self.pending_lines:
+            data = json.dumps(line, ensure_ascii=False).encode(DEFAULT_ENCODING) + b'\n'
+            offsets.append(OFFSET.pack(position))
+            lines.append(data)
+            position += len(data)
+
+        postings = []
+        terms = {}
+        position = 0
+        for trigram in sorted(self.pending_postings):
+            line_ids = self.pending_postings[trigram]
+            data = encode_postings(line_ids)
+            terms[trigram] = (position, len(data), len(line_ids))
+            postings.append(data)
+            position += len(data)
+
+        _write(path + '.lines', b''.join(lines))
+        _write(path + '.offsets', b''.join(offsets))
+        _write(path + '.postings', b''.join(postings))
+        # the terms table makes the segment visible, it is written last
+        _write(path + '.terms', json.dumps(terms, ensure_ascii=False).encode(DEFAULT_ENCODING))
+
+        self.segments.append(_Segment(path))
+        self.pending_lines = []
+        self.pending_postings = {}
+
+    def close(self):
+        """Flush the buffered lines and close the segments."""
+        self.flush()
+        for segment in self.segments:
+            segment.close()
+
+        self.segments = []
+
+    def search(self, pattern, line_types=(LINE_TYPE_ADDED, LINE_TYPE_REMOVED), diff_ids=None):
+        """Yield an UdiffSearchHit for every indexed line `pattern` (a regex string or object) matches.
+
+        Hits come in the order the lines were added, only flushed lines are
+        searched. A pattern without a literal of three characters at its top
+        level, or with flags other than IGNORECASE, reads every line.
+        """
+        import re
+        from udiff.scanner import required_literals
+
+        regex = pattern if hasattr(pattern, 'search') else re.compile(pattern)
+        query = set()
+        if not regex.flags & re.VERBOSE:
+            for literal in required_literals(regex.pattern):
+                query.update(trigrams(literal))
+
+        if diff_ids is not None:
+            diff_ids = set(diff_ids)
+
+        for segment in list(self.segments):
+            if query:
+                lines = (segment.line(line_id) for line_id in segment.candidates(query))
+            else:
+                lines = segment.iter_lines()
+
+            for diff_id, path, line_type, line_no, text in lines:
+                if line_type not in line_types or (diff_ids is not None and diff_id not in diff_ids):
+                    continue
+
+                if regex.search(text):
+                    yield UdiffSearchHit(diff_id, path, line_type, line_no, text)
@@ -0,0 +1,410 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Operations on series of diffs: the net diff of patches applied one after the other
+and the changes between two revisions of a patch."""
+
+from __future__ import unicode_literals
+
+from udiff.constants import LINE_TYPE_ADDED, LINE_TYPE_CONTEXT, LINE_TYPE_REMOVED
+from udiff.files import cut_hunks, make_block, path_after, path_before, set_attribute
+from udiff.parser import DEV_NULL, UdiffFile, UdiffParser
+from udiff.writer import is_hunk
+
+
+# a hunk found as is in both diffs, (_SAME, None, old count, new count)
+_SAME = '='
+
+
+def _hunk_key(block):
+    return block.old_start_line, tuple((line.content, line.no_newline) for line in block)
+
+
+def _ops(file, same=()):
+    """Yield the (line_type, text, count, no_newline) edit operations of a file diff.
+
+    The unchanged lines between the hunks are a single context operation with
+    an unknown (None) text, the last one has an unknown (None) count as well.
+    The blocks in `same` are a single _SAME operation.
+    """
+    position = 1
+    for block in file:
+        if not is_hunk(block):
+            continue
+
+        old_count = sum(1 for line in block if not line.is_added)
+        first = (block.old_start_line or 0) + (0 if old_count else 1)
+        if first > position:
+            yield LINE_TYPE_CONTEXT, None, first - position, False
+
+        position = first + old_count
+        if id(block) in same:
+            yield _SAME, None, old_count, sum(1 for line in block if not line.is_removed)
+            continue
+
+        for line in block:
+            yield line.line_type, line.content[1:], 1, line.no_newline
+
+    yield LINE_TYPE_CONTEXT, None, None, False
+
+
+def _advance(op, ops, count):
+    if op[2] is None:
+        return op
+
+    if op[2] > count:
+        return op[0], op[1], op[2] - count, op[3]
+
+    return next(ops)
+
+
+def _compose_ops(first, second):
+    """Merge the operations of X -> Y and Y -> Z diffs into the ones of X -> Z.
+
+    Both walk the lines of Y, the lines only removed from X and only added to Z
+    are emitted as soon as they are met.
+    """
+    first_ops, second_ops = _ops(first), _ops(second)
+    a, b = next(first_ops), next(second_ops)
+
+    while True:
+        if a[0] == LINE_TYPE_REMOVED:
+            yield a
+            a = next(first_ops)
+            continue
+
+        if b[0] == LINE_TYPE_ADDED:
+            yield b
+            b = next(second_ops)
+            continue
+
+        if a[2] is None and b[2] is None:
+            return
+
+        if a[1] is not None and b[1] is not None and a[1] != b[1]:
+            raise ValueError('%s: the diffs do not apply one after the other' % (second.new_name or second.old_name))
+
+        count = min(count for count in (a[2], b[2]) if count is not None)
+        if a[0] == LINE_TYPE_ADDED:
+            if b[0] != LINE_TYPE_REMOVED:
+                yield LINE_TYPE_ADDED, a[1], 1, b[3] if b[1] is not None else a[3]
+
+        elif b[0] == LINE_TYPE_REMOVED:
+            yield b
+
+        else:
+            known = b if b[1] is not None else a
+            yield LINE_TYPE_CONTEXT, known[1], count, known[3]
+
+        a = _advance(a, first_ops, count)
+        b = _advance(b, second_ops, count)
+
+
+def _changes(changes):
+    removed = [change for change in changes if change[0] == LINE_TYPE_REMOVED]
+    added = [change for change in changes if change[0] == LINE_TYPE_ADDED]
+    if not removed or not added:
+        return changes
+
+    from difflib import SequenceMatcher
+
+    # lines removed by a diff and added back by another one are unchanged,
+    # git puts the removed lines of a change first
+    result = []
+    matcher = SequenceMatcher(None, [change[1:] for change in removed], [change[1:] for change in added], autojunk=False)
+    for tag, removed_start, removed_end, added_start, added_end in matcher.get_opcodes():
+        if tag == 'equal':
+            result.extend((LINE_TYPE_CONTEXT,) + change[1:] for change in added[added_start:added_end])
+        else:
+            result.extend(removed[removed_start:removed_end])
+            result.extend(added[added_start:added_end])
+
+    return result
+
+
+def _normalize(ops):
+    changes = []
+    for op in ops:
+        if op[0] == LINE_TYPE_CONTEXT:
+            for change in _changes(changes):
+                yield change
+            changes = []
+            yield op
+        else:
+            changes.append(op)
+
+    for change in _changes(changes):
+        yield change
+
+
+def _interdiff_ops(first, second, same):
+    """Merge the operations of X -> Y and X -> Z diffs into the ones of Y -> Z.
+
+    Both walk the lines of X, the hunks found in both diffs are skipped.
+    """
+    first_ops, second_ops = _ops(first, same), _ops(second, same)
+    a, b = next(first_ops), next(second_ops)
+
+    while True:
+        if a[0] == LINE_TYPE_ADDED:
+            yield LINE_TYPE_REMOVED, a[1], 1, a[3]
+            a = next(first_ops)
+            continue
+
+        if b[0] == LINE_TYPE_ADDED:
+            yield b
+            b = next(second_ops)
+            continue
+
+        if a[0] == _SAME or b[0] == _SAME:
+            if a[0] != b[0]:
+                raise ValueError('%s: the diffs are not against the same file' % (second.old_name or first.old_name))
+
+            # the lines are the same on both sides, but unknown
+            yield LINE_TYPE_CONTEXT, None, a[3], False
+            a, b = next(first_ops), next(second_ops)
+            continue
+
+        if a[2] is None and b[2] is None:
+            return
+
+        if a[1] is not None and b[1] is not None and a[1] != b[1]:
+            raise ValueError('%s: the diffs are not against the same file' % (second.old_name or first.old_name))
+
+        count = min(count for count in (a[2], b[2]) if count is not None)
+        if a[0] == LINE_TYPE_REMOVED:
+            if b[0] != LINE_TYPE_REMOVED:
+                yield LINE_TYPE_ADDED, a[1], 1, b[3] if b[1] is not None else a[3]
+
+        elif b[0] == LINE_TYPE_REMOVED:
+            yield LINE_TYPE_REMOVED, b[1], 1, a[3] if a[1] is not None else b[3]
+
+        else:
+            known = b if b[1] is not None else a
+            yield LINE_TYPE_CONTEXT, known[1], count, known[3]
+
+        a = _advance(a, first_ops, count)
+        b = _advance(b, second_ops, count)
+
+
+def compose_files(first, second, context=3):
+    """Return the UdiffFile of `second` applied after `first`, None when nothing is left of it.
+
+    The old side of `second` must be the new side of `first`.
+    """
+    for file in (first, second):
+        if file.is_combined or file.is_binary or file.is_too_big:
+            raise ValueError('%s: combined, binary or too big diffs can not be composed' % (file.new_name or file.old_name))
+
+    result = UdiffFile()
+    for block in cut_hunks(_normalize(_compose_ops(first, second)), context):
+        result.append(make_block(block))
+
+    result.added_lines = sum(block.added for block in result)
+    result.deleted_lines = sum(block.removed for block in result)
+
+    set_attribute(result, 'old_name', first.old_name)
+    set_attribute(result, 'new_name', second.new_name)
+    set_attribute(result, 'language', UdiffParser._get_extension(result.new_name or result.old_name or ''))
+    set_attribute(result, 'is_git_diff', first.is_git_diff or second.is_git_diff)
+    set_attribute(result, 'is_new', first.is_new)
+    set_attribute(result, 'new_file_mode', first.new_file_mode)
+    set_attribute(result, 'is_deleted', second.is_deleted)
+    set_attribute(result, 'deleted_file_mode', second.deleted_file_mode)
+    set_attribute(result, 'checksum_before', first.checksum_before)
+    set_attribute(result, 'checksum_after', second.checksum_after)
+    set_attribute(result, 'mode', second.mode or first.mode)
+
+    old_mode = first.old_mode or second.old_mode
+    new_mode = second.new_mode or first.new_mode
+    if old_mode != new_mode:
+        set_attribute(result, 'old_mode', old_mode)
+        set_attribute(result, 'new_mode', new_mode)
+
+    before, after = path_before(first), path_after(second)
+    if before is None and after is None:
+        # created then deleted
+        return None
+
+    if before is not None and after is not None and before != after:
+        set_attribute(result, 'is_copy', first.is_copy or second.is_copy)
+        set_attribute(result, 'is_rename', not result.is_copy)
+
+    if not (len(result) or result.is_new or result.is_deleted or result.is_rename or result.is_copy or result.old_mode):
+        # the second diff reverted the first one
+        return None
+
+    return result
+
+
+def _compose_two(first, second, context):
+    result = UdiffParser('', options=first.options)
+    pending = {}
+    for file in second:
+        pending.setdefault(path_before(file), []).append(file)
+
+    composed_files = set()
+    for file in first:
+        path = path_after(file)
+        later = pending.get(path, []) if path is not None else []
+        # a copy keeps its source, the other diffs of the path replace it
+        if not later or all(other.is_copy for other in later):
+            result.append(file)
+
+        for other in later:
+            composed_files.add(id(other))
+            composed = compose_files(file, other, context)
+            if composed is not None:
+                result.append(composed)
+
+    result.extend(file for file in second if id(file) not in composed_files)
+
+    return result
+
+
+def compose(*parsers, **kwargs):
+    """Return a UdiffParser of the net changes of diffs applied one after the other.
+
+    Files are followed by path, renames and copies included; the lines of the
+    later hunks are renumbered through the earlier ones. The hunks have up to
+    `context` context lines, the ones known from the diffs, 3 by default.
+    Raises ValueError for diffs that don't apply after each other.
+    """
+    context = kwargs.pop('context', 3)
+    if kwargs:
+        raise TypeError('unexpected keyword arguments: %s' % ', '.join(sorted(kwargs)))
+
+    if not parsers:
+        return UdiffParser('')
+
+    result = parsers[0]
+    for parser in parsers[1:]:
+        result = _compose_two(result, parser, context)
+
+    return result
+
+
+def _hunk_keys(file):
+    return [_hunk_key(block) for block in file]
+
+
+def interdiff_files(first, second, context=3):
+    """Return the UdiffFile of the changes from the new side of `first` to the new side of `second`.
+
+    Both diffs have the same old side, one of them may be None when the other
+    diff doesn't change the file. Returns None when both diffs change the file
+    the same way.
+    """
+    if first is None:
+        return second
+
+    first_keys = _hunk_keys(first)
+    second_keys = _hunk_keys(second) if second is not None else []
+    if second is not None and first_keys == second_keys and first.new_name == second.new_name and \
+            first.new_mode == second.new_mode and first.checksum_after == second.checksum_after:
+        return None
+
+    if second is None:
+        second = UdiffFile()
+        second.old_name = first.old_name
+        second.new_name = first.old_name if path_before(first) is not None else None
+
+    for file in (first, second):
+        if file.is_combined or file.is_binary or file.is_too_big:
+            raise ValueError('%s: combined, binary or too big diffs can not be compared' % (file.new_name or file.old_name))
+
+    # the hunks both diffs have are skipped, their hash is cheaper than their lines
+    common = set(first_keys) & set(second_keys)
+    same = set(id(block) for block in first if _hunk_key(block) in common)
+    same.update(id(block) for block in second if _hunk_key(block) in common)
+
+    result = UdiffFile()
+    for block in cut_hunks(_normalize(_interdiff_ops(first, second, same)), context):
+        result.append(make_block(block))
+
+    result.added_lines = sum(block.added for block in result)
+    result.deleted_lines = sum(block.removed for block in result)
+
+    before, after = path_after(first), path_after(second)
+    set_attribute(result, 'old_name', before or DEV_NULL)
+    set_attribute(result, 'new_name', after or DEV_NULL)
+    set_attribute(result, 'language', UdiffParser._get_extension(after or before or ''))
+    set_attribute(result, 'is_git_diff', first.is_git_diff or second.is_git_diff)
+    set_attribute(result, 'is_new', before is None)
+    set_attribute(result, 'new_file_mode',
+                  (second.new_file_mode or second.new_mode or first.deleted_file_mode) if before is None else None)
+    set_attribute(result, 'is_deleted', after is None)
+    set_attribute(result, 'deleted_file_mode',
+                  (first.new_file_mode or first.new_mode or second.deleted_file_mode) if after is None else None)
+    set_attribute(result, 'checksum_before', first.checksum_after)
+    set_attribute(result, 'checksum_after', second.checksum_after)
+
+    old_mode = first.new_mode or second.old_mode
+    new_mode = second.new_mode or first.old_mode
+    if before is not None and after is not None and old_mode != new_mode:
+        set_attribute(result, 'old_mode', old_mode)
+        set_attribute(result, 'new_mode', new_mode)
+
+    if before is not None and after is not None and before != after:
+        set_attribute(result, 'is_rename', True)
+
+    if not (len(result) or result.is_new or result.is_deleted or result.is_rename or result.old_mode):
+        return None
+
+    return result
+
+
+def _file_key(file):
+    before = path_before(file)
+    return (True, before) if before is not None else (False, path_after(file))
+
+
+def interdiff(old, new, context=3):
+    """Return a UdiffParser of the changes between two revisions of a patch.
+
+    `old` and `new` are diffs of the same files, the result goes from the files
+    patched by `old` to the files patched by `new`. Files are matched by their
+    old path (new path for created files), renames included. Hunks found
+    as is in both revisions are skipped without looking at their lines, the
+    others are compared line by line. Raises ValueError for diffs against
+    different files.
+    """
+    result = UdiffParser('', options=new.options)
+
+    new_files = {}
+    for file in new:
+        new_files.setdefault(_file_key(file), file)
+
+    matched = set()
+    for file in old:
+        other = new_files.get(_file_key(file))
+        if other is not None:
+            matched.add(id(other))
+
+        changes = interdiff_files(file, other, context)
+        if changes is not None:
+            result.append(changes)
+
+    result.extend(file for file in new if id(file) not in matched)
+    return result
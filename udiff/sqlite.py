@@ -0,0 +1,183 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+"""Loading parsed diffs into SQLite, to query them with SQL.
+
+The schema is normalized: diffs, their files, the hunks of the files and
+optionally the lines of the hunks. Rows are inserted by batches with
+`executemany` in one transaction, the indexes are created once the rows are
+in. For instance, the churn of every file by author and month:
+
+    SELECT d.author, strftime('%Y-%m', d.timestamp, 'unixepoch') AS month, f.path,
+           SUM(f.added_lines + f.deleted_lines) AS churn
+    FROM files f JOIN diffs d ON d.id = f.diff
+    GROUP BY 1, 2, 3 ORDER BY churn DESC
+"""
+
+from __future__ import unicode_literals
+
+from udiff.directories import file_status
+from udiff.writer import is_hunk
+
+
+SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS diffs ('
+    'id INTEGER PRIMARY KEY, diff_id TEXT, author TEXT, date TEXT, timestamp INTEGER, subject TEXT, '
+    'files INTEGER, added_lines INTEGER, deleted_lines INTEGER, patch_id TEXT)',
+
+    'CREATE TABLE IF NOT EXISTS files ('
+    'id INTEGER PRIMARY KEY, diff INTEGER REFERENCES diffs (id), position INTEGER, path TEXT, '
+    'old_name TEXT, new_name TEXT, status TEXT, language TEXT, added_lines INTEGER, deleted_lines INTEGER, '
+    'is_binary INTEGER, is_combined INTEGER, is_too_big INTEGER, old_mode TEXT, new_mode TEXT, '
+    'unchanged_percentage INTEGER, checksum_before TEXT, checksum_after TEXT, patch_id TEXT)',
+
+    'CREATE TABLE IF NOT EXISTS hunks ('
+    'id INTEGER PRIMARY KEY, file INTEGER REFERENCES files (id), position INTEGER, header TEXT, '
+    'old_start_line INTEGER, new_start_line INTEGER, added INTEGER, removed INTEGER)',
+
+    'CREATE TABLE IF NOT EXISTS lines ('
+    'hunk INTEGER REFERENCES hunks (id), position INTEGER, line_type TEXT, '
+    'source_line_no INTEGER, target_line_no INTEGER, content TEXT)',
+]
+
+INDEXES = [
+    'CREATE INDEX IF NOT EXISTS diffs_diff_id ON diffs (diff_id)',
+    'CREATE INDEX IF NOT EXISTS files_diff ON files (diff)',
+    'CREATE INDEX IF NOT EXISTS files_path ON files (path)',
+    'CREATE INDEX IF NOT EXISTS hunks_file ON hunks (file)',
+    'CREATE INDEX IF NOT EXISTS lines_hunk ON lines (hunk)',
+]
+
+INSERTS = {
+    'diffs': 'INSERT INTO diffs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+    'files': 'INSERT INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+    'hunks': 'INSERT INTO hunks VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+    'lines': 'INSERT INTO lines VALUES (?, ?, ?, ?, ?, ?)',
+}
+
+
+def create_schema(conn):
+    """Create the tables, the indexes are created by `load_diffs` once the rows are in."""
+    for statement in SCHEMA:
+        conn.execute(statement)
+
+
+def create_indexes(conn):
+    for statement in INDEXES:
+        conn.execute(statement)
+
+
+def _timestamp(date):
+    # the dates of git log and of emails
+    from email.utils import mktime_tz, parsedate_tz
+
+    parsed = parsedate_tz(date) if date else None
+    return mktime_tz(parsed) if parsed else None
+
+
+def _text(value):
+    # the modes and checksums of combined diffs are lists, one per parent
+    return ','.join(value) if isinstance(value, list) else value
+
+
+def _next_id(conn, table):
+    return conn.execute('SELECT COALESCE(MAX(id), 0) FROM %s' % table).fetchone()[0] + 1
+
+
+def load_diffs(conn, diffs, lines=False, batch_size=10000, wal=True):
+    """Insert `diffs`, (diff id, UdiffParser) pairs, into the SQLite connection `conn`, return the id of the last one.
+
+    A diff id can be a UdiffCommit, as `udiff.commits.iter_log` yields them,
+    its author, date and subject are then kept too. The lines are only
+    inserted with `lines`, parse with `stat_only` otherwise (the hunks of
+    such diffs are empty, they count no added or removed lines). With `wal`
+    the database is switched to write-ahead logging first, readers aren't
+    blocked by the load.
+    """
+    if wal:
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+
+    create_schema(conn)
+    diff_row_id, file_row_id, hunk_row_id = [_next_id(conn, table) for table in ('diffs', 'files', 'hunks')]
+    rows = dict((table, []) for table in INSERTS)
+    last = None
+
+    with conn:
+        for key, parser in diffs:
+            if hasattr(key, 'sha'):
+                diff = (diff_row_id, key.sha, key.author, key.date, _timestamp(key.date), key.subject)
+            else:
+                diff = (diff_row_id, key, None, None, None, None)
+
+            added = deleted = 0
+            for position, file in enumerate(parser):
+                added += file.added_lines
+                deleted += file.deleted_lines
+                rows['files'].append((
+                    file_row_id, diff_row_id, position, file.path, file.old_name, file.new_name, file_status(file),
+                    file.language, file.added_lines, file.deleted_lines, file.is_binary, file.is_combined,
+                    file.is_too_big, _text(file.old_mode), _text(file.new_mode), file.unchanged_percentage,
+                    _text(file.checksum_before), _text(file.checksum_after), file.patch_id,
+                ))
+
+                for hunk_position, block in enumerate(file):
+                    if not is_hunk(block):
+                        continue
+
+                    rows['hunks'].append((
+                        hunk_row_id, file_row_id, hunk_position, block.header, block.old_start_line,
+                        block.new_start_line, block.added, block.removed,
+                    ))
+                    if lines:
+                        rows['lines'].extend(
+                            (hunk_row_id, line_position, line.line_type, line.source_line_no, line.target_line_no,
+                             line.content)
+                            for line_position, line in enumerate(block)
+                        )
+                    hunk_row_id += 1
+
+                file_row_id += 1
+
+            rows['diffs'].append(diff + (len(parser), added, deleted, getattr(parser, 'patch_id', None)))
+            last = diff_row_id
+            diff_row_id += 1
+
+            if len(rows['files']) + len(rows['hunks']) + len(rows['lines']) >= batch_size:
+                _insert(conn, rows)
+
+        _insert(conn, rows)
+
+    with conn:
+        create_indexes(conn)
+
+    return last
+
+
+def _insert(conn, rows):
+    for table in ('diffs', 'files', 'hunks', 'lines'):
+        if rows[table]:
+            conn.executemany(INSERTS[table], rows[table])
+            del rows[table][:]
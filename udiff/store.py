@@ -0,0 +1,453 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+"""An append-only store of parsed diffs, indexed by path, to read the history of a file without reparsing a log.
+
+Every file diff is a record of a segment file: a header with its length,
+checksum and the flags the diff text can't tell (a binary file without git
+headers, a file too big to be kept), then its zlib compressed diff text. The
+other attributes the diff text can't tell (the counts of a stat_only or too
+big file, its patch id, whitespace counts and scanner matches) are a JSON line
+before the diff text, with FLAG_ATTRIBUTES. The index log lists where the
+records of every diff and path are, it is only appended to once the records
+it points at are synced, so a crash loses at most the unflushed diffs: a
+truncated record or index entry at the end of a file is dropped when the
+store is opened.
+
+Compaction rewrites the sealed segments without the records of removed diffs
+(and of diffs added but never flushed), it can run in a background thread
+while diffs are added and read.
+"""
+
+from __future__ import unicode_literals
+
+import io
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+
+from udiff.constants import DEFAULT_ENCODING, LINE_TYPE_ADDED, LINE_TYPE_REMOVED
+from udiff.errors import UdiffParseError
+
+
+SEGMENT_PREFIX = 'segment-'
+SEGMENT_SUFFIX = '.data'
+INDEX_NAME = 'index.log'
+RECORD_MAGIC = b'UDR1'
+RECORD_HEADER = struct.Struct('<4sIIB')  # magic, length, crc32 of the flags and compressed diff text, flags
+FLAG_BINARY = 1
+FLAG_TOO_BIG = 2
+FLAG_ATTRIBUTES = 4
+# the UdiffFile attributes set by parser options, kept when they are set
+STORED_ATTRIBUTES = (
+    'patch_id',
+    'added_lines_ignoring_whitespace',
+    'deleted_lines_ignoring_whitespace',
+    'scan_matches',
+)
+ENTRY_ADD = '+'
+ENTRY_REMOVE = '-'
+
+
+def _fsync(file):
+    file.flush()
+    os.fsync(file.fileno())
+
+
+def _checksum(flags, payload):
+    return zlib.crc32(payload, flags) & 0xffffffff
+
+
+def _attributes(file):
+    # the attributes of a file its diff text doesn't tell
+    attributes = dict((name, getattr(file, name)) for name in STORED_ATTRIBUTES if getattr(file, name) is not None)
+
+    line_types = [line.line_type for block in file for line in block]
+    if (line_types.count(LINE_TYPE_ADDED), line_types.count(LINE_TYPE_REMOVED)) != \
+            (file.added_lines, file.deleted_lines):
+        # parsed with stat_only, or too big: the lines aren't kept, nor the line counts of the hunk headers
+        attributes['added_lines'] = file.added_lines
+        attributes['deleted_lines'] = file.deleted_lines
+        attributes['block_headers'] = [block.header for block in file]
+
+    return attributes
+
+
+def _valid_length(path):
+    # the length of the complete records at the start of a segment
+    position = 0
+    with open(path, 'rb') as segment:
+        while True:
+            header = segment.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return position
+
+            magic, length, checksum, flags = RECORD_HEADER.unpack(header)
+            payload = segment.read(length)
+            if magic != RECORD_MAGIC or len(payload) < length or _checksum(flags, payload) != checksum:
+                return position
+
+            position += RECORD_HEADER.size + length
+
+
+class UdiffCorpusStore(object):
+    """A directory of segment files holding file diffs, and the index of their diffs and paths.
+
+    >>> with UdiffCorpusStore('history.store') as store:
+    ...     store.add('4f2a1c', UdiffParser(diff))
+    ...     for diff_id, file in store.history('src/app.py'):
+    ...         print(diff_id, file.added_lines, file.deleted_lines)
+    """
+
+    def __init__(self, directory, segment_size=64 * 1024 * 1024):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.lock = threading.RLock()
+        # diff id: [(path, segment number, offset), ...], and path: [(diff id, segment number, offset), ...]
+        self.diffs = OrderedDict()
+        self.paths = {}
+        self.pending = []
+        self.maps = {}
+        self.compacting = threading.Lock()
+
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        self._load_index()
+        self._open_active()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return len(self.diffs)
+
+    def __contains__(self, diff_id):
+        return diff_id in self.diffs
+
+    def _segment_path(self, number):
+        return os.path.join(self.directory, '%s%06d%s' % (SEGMENT_PREFIX, number, SEGMENT_SUFFIX))
+
+    def _segment_numbers(self):
+        return sorted(
+            int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]) for name in os.listdir(self.directory)
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+        )
+
+    def _load_index(self):
+        path = os.path.join(self.directory, INDEX_NAME)
+        valid = 0
+        if os.path.exists(path):
+            with open(path, 'rb') as index:
+                for line in index:
+                    try:
+                        entry = json.loads(line.decode(DEFAULT_ENCODING))
+                    except ValueError:
+                        # an entry cut by a crash, it and anything after it is dropped
+                        break
+
+                    if not line.endswith(b'\n'):
+                        break
+
+                    self._apply_entry(entry)
+                    valid += len(line)
+
+            with open(path, 'ab') as index:
+                index.truncate(valid)
+
+        self.index = open(path, 'ab')
+
+    def _apply_entry(self, entry):
+        if entry[0] == ENTRY_ADD:
+            kind, diff_id, locations = entry
+            self.diffs[diff_id] = [tuple(location) for location in locations]
+            for path, segment, offset in locations:
+                self.paths.setdefault(path, []).append((diff_id, segment, offset))
+
+        elif entry[0] == ENTRY_REMOVE:
+            diff_id = entry[1]
+            for path, segment, offset in self.diffs.pop(diff_id, ()):
+                self.paths[path] = [location for location in self.paths[path] if location[0] != diff_id]
+                if not self.paths[path]:
+                    del self.paths[path]
+
+    def _open_active(self):
+        for name in os.listdir(self.directory):
+            if name.startswith(SEGMENT_PREFIX) and name.endswith('.tmp'):
+                os.remove(os.path.join(self.directory, name))
+
+        numbers = self._segment_numbers()
+        used = set(segment for locations in self.diffs.values() for path, segment, offset in locations)
+        for number in numbers[:-1]:
+            if number not in used:
+                # left by a compaction interrupted before its index was written
+                os.remove(self._segment_path(number))
+
+        self.active_number = self.last_number = numbers[-1] if numbers else 1
+        path = self._segment_path(self.active_number)
+        if os.path.exists(path):
+            with open(path, 'ab') as segment:
+                segment.truncate(_valid_length(path))
+
+        self.active = open(path, 'ab')
+
+    def _allocate(self):
+        # segment numbers only grow, the highest one is the active segment when the store is opened
+        self.last_number += 1
+        return self.last_number
+
+    def _roll(self):
+        _fsync(self.active)
+        self.active.close()
+        self.active_number = self._allocate()
+        self.active = open(self._segment_path(self.active_number), 'ab')
+
+    def _map(self, number, size):
+        data = self.maps.get(number)
+        if data is None or len(data) < size:
+            # not mapped yet, or appended to since it was
+            if data is not None:
+                data.close()
+
+            with open(self._segment_path(number), 'rb') as segment:
+                data = self.maps[number] = mmap.mmap(segment.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return data
+
+    def _read(self, number, offset):
+        # the record at `offset` of a segment, its header included
+        data = self._map(number, offset + RECORD_HEADER.size)
+        magic, length, checksum, flags = RECORD_HEADER.unpack_from(data, offset)
+        end = offset + RECORD_HEADER.size + length
+        record = self._map(number, end)[offset:end]
+
+        if magic != RECORD_MAGIC or _checksum(flags, record[RECORD_HEADER.size:]) != checksum:
+            raise UdiffParseError('corrupted record at %s:%d' % (self._segment_path(number), offset))
+
+        return record
+
+    @staticmethod
+    def _file(record):
+        from udiff.parser import UdiffParser
+
+        flags = RECORD_HEADER.unpack_from(record)[3]
+        text = zlib.decompress(record[RECORD_HEADER.size:]).decode(DEFAULT_ENCODING)
+        attributes = {}
+        if flags & FLAG_ATTRIBUTES:
+            line, text = text.split('\n', 1)
+            attributes = json.loads(line)
+
+        # the lines as they were written, a removed '----------' line included
+        file = UdiffParser(text, options={'strip_separators': False})[0]
+        if flags & FLAG_BINARY:
+            file.is_binary = True
+        if flags & FLAG_TOO_BIG:
+            file.is_too_big = True
+
+        for block, header in zip(file, attributes.pop('block_headers', ())):
+            block.header = header
+        if 'scan_matches' in attributes:
+            attributes['scan_matches'] = [tuple(match) for match in attributes['scan_matches']]
+        for name, value in attributes.items():
+            setattr(file, name, value)
+
+        return file
+
+    def add(self, diff_id, files):
+        """Append the UdiffFile instances `files` (a UdiffParser for instance) as the diff `diff_id`.
+
+        `diff_id` is a string or a number, a commit sha for instance. The diff
+        is readable at once and durable after `flush`.
+        """
+        with self.lock:
+            if diff_id in self.diffs:
+                raise ValueError('%s: the diff is already in the store' % diff_id)
+
+            locations = []
+            for file in files:
+                out = io.StringIO()
+                attributes = _attributes(file)
+                if attributes:
+                    out.write('%s\n' % json.dumps(attributes, ensure_ascii=False, sort_keys=True))
+
+                file.write(out)
+                payload = zlib.compress(out.getvalue().encode(DEFAULT_ENCODING))
+                flags = (FLAG_BINARY if file.is_binary else 0) | (FLAG_TOO_BIG if file.is_too_big else 0) | \
+                    (FLAG_ATTRIBUTES if attributes else 0)
+
+                if self.active.tell() and self.active.tell() + len(payload) > self.segment_size:
+                    self._roll()
+
+                offset = self.active.tell()
+                self.active.write(RECORD_HEADER.pack(RECORD_MAGIC, len(payload), _checksum(flags, payload), flags))
+                self.active.write(payload)
+                locations.append((file.path, self.active_number, offset))
+
+            self.active.flush()
+            entry = [ENTRY_ADD, diff_id, locations]
+            self._apply_entry(entry)
+            self.pending.append(entry)
+
+    def remove(self, diff_id):
+        """Remove the diff `diff_id`, its records are dropped by the next compaction."""
+        with self.lock:
+            if diff_id not in self.diffs:
+                raise KeyError(diff_id)
+
+            entry = [ENTRY_REMOVE, diff_id]
+            self._apply_entry(entry)
+            self.pending.append(entry)
+
+    def flush(self):
+        """Sync the added records, then the index entries pointing at them."""
+        with self.lock:
+            if not self.pending:
+                return
+
+            _fsync(self.active)
+            for entry in self.pending:
+                self.index.write(json.dumps(entry, ensure_ascii=False).encode(DEFAULT_ENCODING) + b'\n')
+
+            _fsync(self.index)
+            self.pending = []
+
+    def close(self):
+        """Flush the store and close its files."""
+        with self.lock:
+            self.flush()
+            self.active.close()
+            self.index.close()
+            for data in self.maps.values():
+                data.close()
+
+            self.maps = {}
+
+    def diff(self, diff_id):
+        """Return the UdiffFile instances of the diff `diff_id`."""
+        with self.lock:
+            records = [self._read(segment, offset) for path, segment, offset in self.diffs[diff_id]]
+
+        return [self._file(record) for record in records]
+
+    def history(self, path):
+        """Yield the (diff id, UdiffFile) changes to `path` in the order they were added, only reading their records."""
+        # the records are copied at once, a compaction may remove their segments while the files are parsed
+        with self.lock:
+            records = [(diff_id, self._read(segment, offset)) for diff_id, segment, offset in self.paths.get(path, ())]
+
+        for diff_id, record in records:
+            yield diff_id, self._file(record)
+
+    def paths_like(self, prefix=''):
+        """Return the sorted paths starting with `prefix` that have a history."""
+        with self.lock:
+            return sorted(path for path in self.paths if path.startswith(prefix))
+
+    def compact(self, background=False):
+        """Rewrite the sealed segments with the records of the diffs in the store only.
+
+        With `background` the compaction runs in a thread, which is returned.
+        Diffs can be added, removed and read while it runs.
+        """
+        if background:
+            thread = threading.Thread(target=self.compact)
+            thread.daemon = True
+            thread.start()
+            return thread
+
+        with self.compacting:
+            with self.lock:
+                self.flush()
+                self._roll()
+                sealed = set(self._segment_numbers()) - set([self.active_number])
+                live = sorted(
+                    (segment, offset) for locations in self.diffs.values()
+                    for path, segment, offset in locations if segment in sealed
+                )
+
+            # sealed segments are never written to, the records are copied without holding the lock
+            moved = {}
+            out = None
+            for segment, offset in live:
+                with self.lock:
+                    record = self._read(segment, offset)
+
+                if out is None or (out.tell() and out.tell() + len(record) > self.segment_size):
+                    self._seal(out)
+                    with self.lock:
+                        number = self._allocate()
+
+                    out = open(self._segment_path(number) + '.tmp', 'wb')
+
+                moved[(segment, offset)] = (number, out.tell())
+                out.write(record)
+
+            self._seal(out)
+
+            with self.lock:
+                self.flush()
+                self._rewrite_index(moved)
+
+                for segment in sealed:
+                    if segment in self.maps:
+                        self.maps.pop(segment).close()
+
+                    os.remove(self._segment_path(segment))
+
+    @staticmethod
+    def _seal(out):
+        # a compacted segment is named as a segment once it is complete
+        if out is not None:
+            _fsync(out)
+            out.close()
+            os.rename(out.name, out.name[:-len('.tmp')])
+
+    def _rewrite_index(self, moved):
+        # the diffs removed during the compaction aren't in self.diffs anymore, nothing points at their records
+        diffs = self.diffs
+        self.diffs = OrderedDict()
+        self.paths = {}
+        index_path = os.path.join(self.directory, INDEX_NAME)
+
+        with open(index_path + '.tmp', 'wb') as index:
+            for diff_id, locations in diffs.items():
+                entry = [ENTRY_ADD, diff_id, [
+                    (path, ) + moved.get((segment, offset), (segment, offset)) for path, segment, offset in locations
+                ]]
+                self._apply_entry(entry)
+                index.write(json.dumps(entry, ensure_ascii=False).encode(DEFAULT_ENCODING) + b'\n')
+
+            _fsync(index)
+
+        self.index.close()
+        os.rename(index_path + '.tmp', index_path)
+        self.index = open(index_path, 'ab')
@@ -0,0 +1,360 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Reading diffs from files, pipes and compressed archives."""
+
+from __future__ import unicode_literals
+
+import codecs
+import io
+import sys
+
+from udiff.constants import DEFAULT_ENCODING
+from udiff.errors import UdiffParseError
+from udiff.parser import PY2
+
+
+CHUNK_SIZE = 64 * 1024
+
+COMPRESSION_MAGIC_NUMBERS = [
+    (b'\x1f\x8b', 'gzip'),
+    (b'BZh', 'bz2'),
+    (b'\xfd7zXZ\x00', 'xz'),
+]
+
+
+HEAD_SIZE = 6
+
+
+def detect_compression(head):
+    """Return the compression of a file starting with the bytes `head` (or None), see COMPRESSION_MAGIC_NUMBERS."""
+    for magic_number, compression in COMPRESSION_MAGIC_NUMBERS:
+        if head.startswith(magic_number):
+            return compression
+
+    return None
+
+
+def _read_head(stream, size=HEAD_SIZE):
+    """Read the first `size` bytes of a binary stream, a pipe may return them in several reads."""
+    head = b''
+    while len(head) < size:
+        data = stream.read(size - len(head))
+        if not data:
+            break
+
+        head += data
+
+    return head
+
+
+class _PrefixedStream(object):
+    """A binary stream returning the bytes already read from it to detect the compression, then the rest of it."""
+
+    def __init__(self, head, stream):
+        self.head = head
+        self.stream = stream
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+    def _read(self, read, size):
+        head = self.head
+        if not head:
+            return read(size)
+
+        if size is None or size < 0:
+            self.head = b''
+            return head + read()
+
+        self.head = head[size:]
+        return head[:size]
+
+    def read(self, size=-1):
+        return self._read(self.stream.read, size)
+
+    def read1(self, size=-1):
+        return self._read(getattr(self.stream, 'read1', self.stream.read), size)
+
+
+class _Unclosed(object):
+    """A binary stream the module didn't open, closing it leaves it open."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+    def close(self):
+        pass
+
+
+class _IncrementalDecompressor(object):
+    """A decompressing reader made of decompressor objects, one per concatenated compressed member.
+
+    On Python 2 BZ2File needs a filename and GzipFile a seekable file, so
+    pipes are decompressed with zlib and bz2 decompressor objects instead.
+    """
+
+    def __init__(self, stream, decompressor):
+        self.stream = stream
+        self.decompressor = decompressor
+        self.current = decompressor()
+        self.data = b''
+
+    def _decompress(self, chunk):
+        data = []
+        while chunk:
+            try:
+                data.append(self.current.decompress(chunk))
+            except EOFError:
+                # the bz2 member ended with the previous chunk
+                self.current = self.decompressor()
+                continue
+
+            chunk = self.current.unused_data
+            if chunk:
+                self.current = self.decompressor()
+
+        return b''.join(data)
+
+    def read1(self, size=-1):
+        read = getattr(self.stream, 'read1', self.stream.read)
+        while not self.data:
+            chunk = read(CHUNK_SIZE)
+            if not chunk:
+                return b''
+
+            self.data = self._decompress(chunk)
+
+        if size is None or size < 0:
+            size = len(self.data)
+
+        data, self.data = self.data[:size], self.data[size:]
+        return data
+
+    def read(self, size=-1):
+        data = []
+        while size != 0:
+            chunk = self.read1(size)
+            if not chunk:
+                break
+
+            data.append(chunk)
+            if size is not None and size > 0:
+                size -= len(chunk)
+
+        return b''.join(data)
+
+    def close(self):
+        self.current = None
+        self.data = b''
+
+
+class _DecompressedStream(object):
+    """A decompressing reader over a binary stream, closing it closes the stream under it too.
+
+    GzipFile, BZ2File and LZMAFile leave the file objects they are given open.
+    """
+
+    def __init__(self, reader, stream):
+        self.reader = reader
+        self.stream = stream
+
+    def __getattr__(self, name):
+        return getattr(self.reader, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        try:
+            self.reader.close()
+        finally:
+            self.stream.close()
+
+
+def decompress(stream):
+    """Wrap a buffered binary stream so that reads return decompressed data, closing the wrapper closes `stream`."""
+    head = _read_head(stream)
+    compression = detect_compression(head)
+    if head:
+        stream = _PrefixedStream(head, stream)
+
+    if compression == 'gzip':
+        if PY2:
+            import zlib
+            return _DecompressedStream(
+                _IncrementalDecompressor(stream, lambda: zlib.decompressobj(16 + zlib.MAX_WBITS)), stream)
+
+        import gzip
+        return _DecompressedStream(gzip.GzipFile(fileobj=stream, mode='rb'), stream)
+
+    elif compression == 'bz2':
+        import bz2
+        if PY2:
+            return _DecompressedStream(_IncrementalDecompressor(stream, bz2.BZ2Decompressor), stream)
+
+        return _DecompressedStream(bz2.BZ2File(stream, mode='rb'), stream)
+
+    elif compression == 'xz':
+        try:
+            import lzma
+        except ImportError:
+            raise UdiffParseError('xz compressed diffs need the lzma module')
+
+        return _DecompressedStream(lzma.LZMAFile(stream, mode='rb'), stream)
+
+    return stream
+
+
+def open_diff(filename=None):
+    """Open a diff file, or stdin for None and '-', as a decompressed binary stream."""
+    if filename is None or filename == '-':
+        buffer = getattr(sys.stdin, 'buffer', None)
+        # closing the diff leaves stdin open
+        stream = _Unclosed(buffer) if buffer is not None else io.open(sys.stdin.fileno(), 'rb', closefd=False)
+    else:
+        stream = io.open(filename, 'rb')
+
+    return decompress(stream)
+
+
+def iter_chunks(stream, chunk_size=CHUNK_SIZE):
+    """Yield the content of a binary stream by chunks.
+
+    Whatever data is available is returned as soon as possible, so a slow
+    producer at the other end of a pipe doesn't delay the output.
+    """
+    read = getattr(stream, 'read1', stream.read)
+
+    while True:
+        try:
+            chunk = read(chunk_size)
+        except (AttributeError, io.UnsupportedOperation):
+            # GzipFile of Python 2 has a read1 which always raises
+            if read == stream.read:
+                raise
+
+            read = stream.read
+            continue
+
+        if not chunk:
+            break
+
+        yield chunk
+
+
+def iter_text(stream, encoding=DEFAULT_ENCODING, errors='strict', chunk_size=CHUNK_SIZE):
+    """Yield the content of a binary stream decoded by chunks."""
+    decoder = codecs.getincrementaldecoder(encoding)(errors)
+
+    for chunk in iter_chunks(stream, chunk_size):
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+
+    text = decoder.decode(b'', True)
+    if text:
+        yield text
+
+
+def iter_background(iterable, max_items=16):
+    """Yield the items of `iterable`, produced by a background thread up to `max_items` ahead.
+
+    Decompression releases the GIL, so a compressed diff is read and
+    decompressed while the previous chunks are parsed. An exception of the
+    thread is raised where the next item would be yielded.
+    """
+    import threading
+    try:
+        from queue import Full, Queue
+    except ImportError:
+        from Queue import Full, Queue
+
+    items = Queue(max_items)
+    stop = threading.Event()
+    end = object()
+
+    def put(item):
+        # give up when the consumer is gone
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except Full:
+                pass
+
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except Exception as error:
+            put((end, error))
+        else:
+            put((end, None))
+
+    thread = threading.Thread(target=produce)
+    thread.daemon = True
+    thread.start()
+
+    try:
+        while True:
+            item, error = items.get()
+            if item is end:
+                if error is not None:
+                    raise error
+                return
+
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def iter_diff_text(filename=None, encoding=DEFAULT_ENCODING, errors='strict', background=False,
+                   chunk_size=CHUNK_SIZE):
+    """Yield the decoded content of a diff file by chunks, decompressing gzip, bz2 and xz files on the fly.
+
+    `filename` is None or '-' for stdin. With `background` the file is read,
+    decompressed and decoded by another thread.
+    """
+    stream = open_diff(filename)
+    chunks = iter_text(stream, encoding, errors, chunk_size)
+    if background:
+        chunks = iter_background(chunks)
+
+    try:
+        for chunk in chunks:
+            yield chunk
+    finally:
+        chunks.close()
+        stream.close()
@@ -0,0 +1,185 @@
+# encoding: utf-8
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Dmitrii Tinigin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+# OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Writing parsed diffs back as unified diff text."""
+
+from __future__ import unicode_literals
+
+from udiff.constants import (
+    HUNK_HEADER_PREFIX,
+    LINE_TYPE_ADDED,
+    LINE_TYPE_NO_NEWLINE,
+    LINE_TYPE_REMOVED,
+    LINE_VALUE_NO_NEWLINE,
+)
+from udiff.parser import DEV_NULL
+
+
+def _format_range(start, count):
+    if count == 1:
+        return '%d' % start
+
+    return '%d,%d' % (start, count)
+
+
+def _in_parent(content, parent):
+    # a removed line only exists in the parents marked with '-', any other
+    # line exists in the parents where it isn't marked as added
+    column = content[parent:parent + 1]
+    if LINE_TYPE_REMOVED in content[:2]:
+        return column == LINE_TYPE_REMOVED
+
+    return column != LINE_TYPE_ADDED
+
+
+def is_hunk(block):
+    """Whether a block holds diff lines, binary and "too big" blocks don't."""
+    return block.header.startswith(HUNK_HEADER_PREFIX)
+
+
+def hunk_header(block, is_combined=False):
+    """Return the hunk header of a block with counts computed from its lines."""
+    marker = '@@@' if is_combined else '@@'
+
+    # keep the section heading (the function name for instance) after the marker
+    end = block.header.find(' ' + marker, len(marker))
+    section = block.header[end + len(marker) + 1:] if end != -1 else ''
+
+    if is_combined:
+        old_count = sum(1 for line in block if _in_parent(line.content, 0))
+        old_count_2 = sum(1 for line in block if _in_parent(line.content, 1))
+        new_count = sum(1 for line in block if LINE_TYPE_REMOVED not in line.content[:2])
+
+        return '@@@ -%s -%s +%s @@@%s' % (
+            _format_range(block.old_start_line or 0, old_count),
+            _format_range(block.old_start_line_2 or 0, old_count_2),
+            _format_range(block.new_start_line or 0, new_count),
+            section
+        )
+
+    old_count = sum(1 for line in block if not line.is_added)
+    new_count = sum(1 for line in block if not line.is_removed)
+
+    return '@@ -%s +%s @@%s' % (
+        _format_range(block.old_start_line or 0, old_count),
+        _format_range(block.new_start_line or 0, new_count),
+        section
+    )
+
+
+def file_header(file, src_prefix='a/', dst_prefix='b/'):
+    """Return the header lines of a file diff, git extended headers included."""
+    old_name = file.old_name if file.old_name != DEV_NULL else None
+    new_name = file.new_name if file.new_name != DEV_NULL else None
+    old_path = src_prefix + (old_name or new_name) if (old_name and not file.is_new) else DEV_NULL
+    new_path = dst_prefix + (new_name or old_name) if (new_name and not file.is_deleted) else DEV_NULL
+
+    if not file.is_git_diff:
+        return ['--- ' + old_path, '+++ ' + new_path]
+
+    lines = []
+    if file.is_combined:
+        lines.append('diff --cc %s' % (new_name or old_name))
+    else:
+        lines.append('diff --git %s%s %s%s' % (src_prefix, old_name or new_name, dst_prefix, new_name or old_name))
+
+    if isinstance(file.old_mode, list):
+        lines.append('mode %s..%s' % (','.join(file.old_mode), file.new_mode))
+    else:
+        if file.old_mode:
+            lines.append('old mode %s' % file.old_mode)
+        if file.new_mode:
+            lines.append('new mode %s' % file.new_mode)
+
+    if file.deleted_file_mode:
+        lines.append('deleted file mode %s' % file.deleted_file_mode)
+    if file.new_file_mode:
+        lines.append('new file mode %s' % file.new_file_mode)
+
+    if (file.is_rename or file.is_copy) and file.unchanged_percentage:
+        lines.append('similarity index %d%%' % file.unchanged_percentage)
+    if file.changed_percentage:
+        lines.append('dissimilarity index %d%%' % file.changed_percentage)
+
+    if file.is_rename:
+        lines.append('rename from %s' % old_name)
+        lines.append('rename to %s' % new_name)
+    elif file.is_copy:
+        lines.append('copy from %s' % old_name)
+        lines.append('copy to %s' % new_name)
+
+    if isinstance(file.checksum_before, list):
+        lines.append('index %s..%s' % (','.join(file.checksum_before), file.checksum_after))
+    elif file.checksum_before:
+        lines.append('index %s..%s%s' % (file.checksum_before, file.checksum_after,
+                                         ' ' + file.mode if file.mode else ''))
+
+    if file.is_binary:
+        lines.append('Binary files %s and %s differ' % (old_path, new_path))
+    elif any(is_hunk(block) for block in file):
+        lines.append('--- ' + old_path)
+        lines.append('+++ ' + new_path)
+
+    return lines
+
+
+def write_block(block, out, is_combined=False):
+    """Write a hunk to the file-like object `out`."""
+    if not is_hunk(block):
+        return
+
+    out.write(hunk_header(block, is_combined))
+    out.write('\n')
+
+    for line in block:
+        content = line.content
+        if is_combined or content[:1] == line.line_type:
+            out.write(content)
+        else:
+            # an inverted line, the content still starts with the other side marker
+            out.write(line.line_type)
+            out.write(content[1:])
+        out.write('\n')
+
+        if line.no_newline:
+            out.write(LINE_TYPE_NO_NEWLINE + LINE_VALUE_NO_NEWLINE + '\n')
+
+
+def write_file(file, out, src_prefix='a/', dst_prefix='b/'):
+    """Write a file diff to the file-like object `out`."""
+    for line in file_header(file, src_prefix, dst_prefix):
+        out.write(line)
+        out.write('\n')
+
+    if file.is_binary:
+        return
+
+    for block in file:
+        write_block(block, out, file.is_combined)
+
+
+def write_diff(files, out, src_prefix='a/', dst_prefix='b/'):
+    """Write the file diffs of any iterable (a UdiffParser for instance) to `out`."""
+    for file in files:
+        write_file(file, out, src_prefix, dst_prefix)